@@ -0,0 +1,11 @@
+"""
+Shared helpers for the analysis scripts in this repository.
+
+Scripts live next to the analyses they belong to and put the repository root
+on ``sys.path`` before importing from here, e.g.:
+
+    REPO_ROOT = Path(__file__).resolve().parents[2]
+    sys.path.insert(0, str(REPO_ROOT))
+
+    from analysis_tools.aggregation import aggregate_by_region
+"""
@@ -0,0 +1,394 @@
+"""
+Offline benchmark of the analysis pipeline on synthetic microdata.
+
+The analysis scripts read private local files or download enhanced CPS from
+Hugging Face, so their timings can't be compared between machines or runs.
+This benchmark builds a synthetic dataset with the entity structure and
+input variables of an enhanced CPS file instead, at any size from 1k to 10M
+persons, and times the stages every script goes through:
+
+- ``build``: generate the person and group-entity input arrays,
+- ``simulate``: baseline and reformed ``Microsimulation`` over them
+  (household net income, tax and benefits),
+- ``aggregate``: the state table (``analysis_tools.aggregation``),
+- ``render``: a chart of it written as a single-file report
+  (``analysis_tools.report``).
+
+Each stage records its wall time (best of ``--repeat``) and the memory it
+adds: peak resident memory while it runs minus resident memory when it
+starts. Nothing is downloaded.
+
+    python -m analysis_tools.benchmark --persons 1k 100k 1M
+    python -m analysis_tools.benchmark --persons 1M --save-baseline
+    python -m analysis_tools.benchmark --persons 1M  # exits non-zero on regression
+
+Baselines are stored per (stage, persons) in ``benchmarks/baselines.json``.
+A stage regresses when it is more than ``--tolerance`` slower or heavier than
+its baseline, ignoring differences below ``MIN_SECONDS`` and ``MIN_MB``.
+Stages whose dependencies are not installed (``policyengine-us`` for
+``simulate``, plotly for ``render``) are reported as skipped; ``aggregate``
+then totals synthetic market income instead of simulated changes.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Callable, NamedTuple
+
+import numpy as np
+
+from analysis_tools.manifest import PeakRSS
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_BASELINES = REPO_ROOT / "benchmarks" / "baselines.json"
+DEFAULT_REFORM = (
+    REPO_ROOT
+    / "us/state_dependent_exemptions/repeal_state_dependent_exemptions.json"
+)
+STAGES = ("build", "simulate", "aggregate", "render")
+
+MIN_SECONDS = 0.05
+MIN_MB = 50.0
+
+# 50 states and DC.
+STATE_FIPS = np.array(
+    [1, 2, 4, 5, 6, 8, 9, 10, 11, 12, 13, 15, 16, 17, 18, 19, 20, 21, 22, 23,
+     24, 25, 26, 27, 28, 29, 30, 31, 32, 33, 34, 35, 36, 37, 38, 39, 40, 41,
+     42, 44, 45, 46, 47, 48, 49, 50, 51, 53, 54, 55, 56]
+)
+GROUP_ENTITIES = ("household", "tax_unit", "family", "spm_unit", "marital_unit")
+US_HOUSEHOLDS = 131e6
+
+
+def synthetic_dataset(n_persons: int, year: int = 2024, seed: int = 0) -> dict:
+    """Synthetic ``{variable: {period: array}}`` inputs for ``n_persons``.
+
+    Households have one or two adults (sharing a tax unit, family, SPM unit
+    and marital unit) and up to four children, each child in their own
+    marital unit. Adults have log-normal earnings and investment income,
+    households a state and a weight summing to the number of US households.
+    The result can be served with ``fork_pool.in_memory_dataset``.
+    """
+    rng = np.random.default_rng(seed)
+    # Draw enough households for n_persons (mean size ~2.1), then cut the
+    # last one short so the total is exact. Adults come first in each
+    # household, so a cut household still has its head.
+    n_draw = n_persons // 2 + 16
+    adults = 1 + (rng.random(n_draw) < 0.5)
+    size = adults + np.minimum(rng.poisson(0.6, n_draw), 4)
+    end = np.cumsum(size)
+    n_households = int(np.searchsorted(end, n_persons)) + 1
+    size = size[:n_households]
+    size[-1] -= end[n_households - 1] - n_persons
+    adults = np.minimum(adults[:n_households], size)
+
+    household = np.repeat(np.arange(n_households), size)
+    start = np.concatenate([[0], np.cumsum(size)[:-1]])
+    position = np.arange(n_persons) - start[household]
+    is_adult = position < adults[household]
+
+    # Adults share their household's marital unit; each child has their own.
+    marital_key = household * 8 + np.where(is_adult, 0, position)
+    marital_unit = np.concatenate(
+        [[0], np.cumsum(marital_key[1:] != marital_key[:-1])]
+    )
+
+    age = np.where(
+        is_adult, rng.integers(18, 86, n_persons), rng.integers(0, 18, n_persons)
+    )
+    employed = is_adult & (rng.random(n_persons) < 0.7)
+    self_employed = is_adult & (rng.random(n_persons) < 0.1)
+    investor = is_adult & (rng.random(n_persons) < 0.3)
+
+    def amounts(mask, mean_log, sigma):
+        return np.where(mask, rng.lognormal(mean_log, sigma, n_persons), 0.0)
+
+    weight = rng.uniform(0.5, 1.5, n_households)
+    weight *= US_HOUSEHOLDS / weight.sum()
+
+    person_ids = np.arange(n_persons)
+    household_ids = np.arange(n_households)
+    marital_ids = np.arange(marital_unit[-1] + 1)
+    period = str(year)
+    arrays = {
+        "person_id": person_ids,
+        "age": age,
+        "is_male": rng.random(n_persons) < 0.49,
+        "employment_income": amounts(employed, 10.6, 0.9),
+        "self_employment_income": amounts(self_employed, 9.8, 1.1),
+        "taxable_interest_income": amounts(investor, 6.0, 1.5),
+        "qualified_dividend_income": amounts(investor, 6.5, 1.8),
+        "state_fips": rng.choice(STATE_FIPS, n_households),
+        "household_weight": weight,
+        "marital_unit_id": marital_ids,
+        "person_marital_unit_id": marital_unit,
+    }
+    # One tax unit, family and SPM unit per household.
+    for entity in GROUP_ENTITIES:
+        if entity != "marital_unit":
+            arrays[f"{entity}_id"] = household_ids
+            arrays[f"person_{entity}_id"] = household
+    return {variable: {period: values} for variable, values in arrays.items()}
+
+
+def parse_persons(text: str) -> int:
+    """'1k' -> 1_000, '2.5M' -> 2_500_000, '500' -> 500."""
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(text[-1].lower(), 1)
+    number = text[:-1] if multiplier > 1 else text
+    return int(float(number) * multiplier)
+
+
+class StageResult(NamedTuple):
+    stage: str
+    persons: int
+    status: str  # "ok" or "skipped: <reason>"
+    seconds: float = float("nan")
+    memory_mb: float = float("nan")
+    peak_rss_mb: float = float("nan")
+
+
+def time_stage(stage: str, persons: int, fn: Callable, repeat: int = 1):
+    """Run ``fn`` ``repeat`` times; return (StageResult, last output).
+
+    Time is the fastest run, memory the largest.
+    """
+    seconds, memory, peak = [], [], []
+    output = None
+    for _ in range(repeat):
+        with PeakRSS() as rss:
+            start = time.perf_counter()
+            output = fn()
+            seconds.append(time.perf_counter() - start)
+        memory.append(rss.peak - rss.start)
+        peak.append(rss.peak)
+    result = StageResult(stage, persons, "ok", min(seconds), max(memory), max(peak))
+    return result, output
+
+
+def _simulate(arrays: dict, reform: dict | None, year: int) -> dict:
+    from policyengine_us import Microsimulation
+
+    from analysis_tools.fork_pool import in_memory_dataset
+    from analysis_tools.reforms import build_reform
+
+    dataset = in_memory_dataset(arrays, str(year))
+    baseline = Microsimulation(dataset=dataset)
+    reformed = Microsimulation(dataset=dataset, reform=build_reform(reform))
+    changes = {}
+    for variable in ("household_net_income", "household_tax", "household_benefits"):
+        before = np.asarray(baseline.calculate(variable, period=year).values)
+        after = np.asarray(reformed.calculate(variable, period=year).values)
+        changes[variable] = after - before
+    return changes
+
+
+def _aggregate(arrays: dict, changes: dict | None, year: int):
+    from analysis_tools.aggregation import aggregate_by_region
+
+    period = str(year)
+    if changes is None:
+        # No simulation: total synthetic market income instead.
+        person_household = arrays["person_household_id"][period]
+        n_households = len(arrays["household_id"][period])
+        income = sum(
+            arrays[v][period]
+            for v in ("employment_income", "self_employment_income")
+        )
+        changes = {
+            "household_market_income": np.bincount(
+                person_household, weights=income, minlength=n_households
+            )
+        }
+    first = next(iter(changes.values()))
+    return aggregate_by_region(
+        arrays["state_fips"][period],
+        arrays["household_weight"][period],
+        changes,
+        affected=np.abs(first) > 0.01,
+    )
+
+
+def _render(table, directory: Path) -> Path:
+    import plotly.graph_objects as go
+
+    from analysis_tools.report import write_report
+
+    states = table.drop(index="TOTAL")
+    column = next(c for c in table.columns if c.endswith("_sum"))
+    figure = go.Figure(go.Bar(x=[str(s) for s in states.index], y=states[column]))
+    return write_report(
+        directory / "benchmark.html", "Benchmark", [("states", column, figure)]
+    )
+
+
+def run_benchmark(
+    persons: int,
+    reform: dict | None = None,
+    year: int = 2024,
+    stages: tuple[str, ...] = STAGES,
+    repeat: int = 1,
+    seed: int = 0,
+) -> list[StageResult]:
+    """Time each requested stage on a synthetic dataset of ``persons``."""
+    results = []
+
+    def run(stage, fn):
+        if stage not in stages:
+            return None
+        try:
+            result, output = time_stage(stage, persons, fn, repeat)
+        except ImportError as e:
+            results.append(StageResult(stage, persons, f"skipped: {e.name or e}"))
+            return None
+        results.append(result)
+        return output
+
+    def build():
+        return synthetic_dataset(persons, year, seed)
+
+    # Later stages need the dataset even when "build" isn't being timed.
+    arrays = run("build", build)
+    if arrays is None:
+        arrays = build()
+    changes = run("simulate", lambda: _simulate(arrays, reform, year))
+    table = run("aggregate", lambda: _aggregate(arrays, changes, year))
+    if table is None and "render" in stages:
+        table = _aggregate(arrays, changes, year)
+    with tempfile.TemporaryDirectory() as directory:
+        run("render", lambda: _render(table, Path(directory)))
+    return results
+
+
+def _key(result: StageResult) -> str:
+    return f"{result.stage}@{result.persons}"
+
+
+def load_baselines(path: Path) -> dict:
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+def save_baselines(path: Path, results: list[StageResult]) -> None:
+    """Record ``results`` as the baselines, keeping other stages and sizes."""
+    baselines = load_baselines(path)
+    try:
+        model = version("policyengine-us")
+    except PackageNotFoundError:
+        model = None
+    for result in results:
+        if result.status == "ok":
+            baselines[_key(result)] = {
+                "seconds": round(result.seconds, 4),
+                "memory_mb": round(result.memory_mb, 1),
+                "policyengine_us": model,
+                "recorded": time.strftime("%Y-%m-%d"),
+            }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(dict(sorted(baselines.items())), indent=2) + "\n")
+
+
+def regressions(
+    results: list[StageResult], baselines: dict, tolerance: float
+) -> list[str]:
+    """Descriptions of every stage over its baseline by more than ``tolerance``."""
+    found = []
+    for result in results:
+        baseline = baselines.get(_key(result))
+        if result.status != "ok" or baseline is None:
+            continue
+        for field, unit, floor in (
+            ("seconds", "s", MIN_SECONDS),
+            ("memory_mb", " MB", MIN_MB),
+        ):
+            value, reference = getattr(result, field), baseline[field]
+            if value > reference * (1 + tolerance) and value - reference > floor:
+                # A stage that added no memory has no relative change.
+                change = (
+                    f"+{value / reference - 1:.0%}"
+                    if reference > 0
+                    else f"+{value - reference:,.2f}{unit}"
+                )
+                found.append(
+                    f"{_key(result)} {field}: {value:,.2f}{unit} "
+                    f"vs baseline {reference:,.2f}{unit} ({change})"
+                )
+    return found
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--persons",
+        nargs="+",
+        type=parse_persons,
+        default=[1_000, 100_000],
+        help="Dataset sizes, e.g. 1k 100k 1M 10M.",
+    )
+    parser.add_argument("--stage", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument(
+        "--reform",
+        default=str(DEFAULT_REFORM),
+        help="Reform file simulated against the baseline.",
+    )
+    parser.add_argument("--year", type=int, default=2024)
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per stage.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baselines", type=Path, default=DEFAULT_BASELINES)
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Store these results as the baselines instead of checking them.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Allowed slowdown or memory growth over baseline (default: 0.2).",
+    )
+    parser.add_argument("--output", type=Path, help="Also write results as JSON.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    from analysis_tools.reforms import load_reform_file
+
+    args = parse_args()
+    reform = load_reform_file(args.reform)
+
+    results = []
+    for persons in args.persons:
+        for result in run_benchmark(
+            persons, reform, args.year, tuple(args.stage), args.repeat, args.seed
+        ):
+            results.append(result)
+            if result.status == "ok":
+                print(
+                    f"{result.persons:>12,} {result.stage:<10} "
+                    f"{result.seconds:9.3f}s {result.memory_mb:9.1f} MB "
+                    f"(peak RSS {result.peak_rss_mb:,.0f} MB)"
+                )
+            else:
+                print(f"{result.persons:>12,} {result.stage:<10} {result.status}")
+
+    if args.output:
+        args.output.write_text(
+            json.dumps([r._asdict() for r in results], indent=2) + "\n"
+        )
+        print(f"Wrote: {args.output}")
+    if args.save_baseline:
+        save_baselines(args.baselines, results)
+        print(f"Wrote: {args.baselines}")
+        return
+
+    found = regressions(results, load_baselines(args.baselines), args.tolerance)
+    if found:
+        sys.exit("Regressions:\n  " + "\n  ".join(found))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""
+Location of on-disk caches shared by the analysis scripts.
+
+Defaults to ``$XDG_CACHE_HOME/policyengine-analysis`` (``~/.cache/...``) and
+can be moved with the ``ANALYSIS_CACHE_DIR`` environment variable, e.g. to a
+shared scratch disk on the batch nodes.
+"""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+
+def cache_dir(*parts: str) -> Path:
+    """Return (and create) a subdirectory of the analysis cache."""
+    root = os.environ.get("ANALYSIS_CACHE_DIR")
+    if root is None:
+        xdg = os.environ.get("XDG_CACHE_HOME", str(Path.home() / ".cache"))
+        root = str(Path(xdg) / "policyengine-analysis")
+    path = Path(root).joinpath(*parts)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
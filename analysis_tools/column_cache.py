@@ -0,0 +1,210 @@
+"""
+Memory-mapped columnar cache of dataset inputs.
+
+``Microsimulation(dataset="enhanced_cps_2024")`` reads and decodes the HDF5
+file into fresh arrays every time, and scripts build several simulations per
+run. ``convert`` does that decode once per dataset and ``policyengine-us``
+version, writing every loaded input as an uncompressed ``.npy`` file with a
+``manifest.json``:
+
+    <cache>/columns/<dataset>-<hash>-policyengine_us-<version>/
+        manifest.json
+        employment_income/2024.npy
+        ...
+
+``open_dataset`` serves those files to policyengine-core through
+``np.load(mmap_mode="r")``: only the columns a simulation touches are paged
+in, and concurrent processes on the same machine share them through the OS
+page cache instead of each holding its own decoded copy.
+
+    from analysis_tools.column_cache import microsimulation
+
+    sim = microsimulation("enhanced_cps_2024", reform=reform)
+
+Local files are keyed on their size and modification time, and so are
+hf:// URLs without an ``@revision`` pin (on the file downloaded now), so a
+regenerated file or a new upload is converted again.
+
+Conversion takes a file lock per dataset, so processes that need the same
+dataset at once convert it once and the rest wait for it. Pre-convert
+datasets, e.g. on a batch node before fanning out:
+
+    python -m analysis_tools.column_cache enhanced_cps_2024 cps_2023
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from contextlib import contextmanager
+from importlib.metadata import version
+from pathlib import Path
+
+import numpy as np
+
+from analysis_tools.cache import cache_dir
+from analysis_tools.fork_pool import in_memory_dataset, load_input_arrays
+from analysis_tools.manifest import record_cache
+
+MANIFEST = "manifest.json"
+
+
+def _local_file(dataset: str) -> Path | None:
+    """The file behind a local path or unpinned hf:// URL, else None."""
+    if dataset.startswith("hf://"):
+        from policyengine_core.tools.hugging_face import (
+            download_huggingface_dataset,
+            parse_hf_url,
+        )
+
+        owner, repo, file_path, revision = parse_hf_url(dataset)
+        if revision is not None:
+            return None  # A pinned revision never changes.
+        # Unpinned means whatever is uploaded now. huggingface_hub caches the
+        # download, and Microsimulation reuses it when it loads the URL.
+        return Path(download_huggingface_dataset(f"{owner}/{repo}", file_path))
+    path = Path(dataset).expanduser()
+    return path if path.is_file() else None
+
+
+def cache_path(dataset: str) -> Path:
+    """Cache directory for a dataset name, file or URL under the installed model."""
+    stem = re.sub(r"[^A-Za-z0-9_.-]+", "_", Path(dataset.split("@")[0]).stem)
+    key = dataset
+    local = _local_file(dataset)
+    if local is not None:
+        # A rewritten local file or a new upload gets a new cache.
+        stat = local.stat()
+        key = f"{local.resolve()}:{stat.st_size}:{stat.st_mtime_ns}"
+    digest = hashlib.sha256(key.encode()).hexdigest()[:8]
+    model = f"policyengine_us-{version('policyengine-us')}"
+    return cache_dir("columns") / f"{stem}-{digest}-{model}"
+
+
+def _storable(values) -> np.ndarray:
+    """Plain ndarray that ``np.load`` can memory-map (no object dtype)."""
+    values = np.asarray(values)
+    if values.dtype == object:
+        values = values.astype(str)
+    return values
+
+
+@contextmanager
+def _locked(path: Path):
+    """Hold an exclusive lock on ``path``'s conversion."""
+    import fcntl
+
+    with open(path.with_name(f"{path.name}.lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def convert(dataset: str, force: bool = False) -> Path:
+    """Write a dataset's loaded inputs as column files; return the directory."""
+    path = cache_path(dataset)
+    if (path / MANIFEST).exists() and not force:
+        record_cache("column_cache", True)
+        return path
+    with _locked(path):
+        # Whoever held the lock may have just converted it.
+        hit = (path / MANIFEST).exists() and not force
+        record_cache("column_cache", hit)
+        if not hit:
+            _write_columns(dataset, path)
+    return path
+
+
+def _write_columns(dataset: str, path: Path) -> None:
+    arrays, time_period = load_input_arrays(dataset)
+    staging = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+    columns = {}
+    for variable, periods in arrays.items():
+        (staging / variable).mkdir(parents=True)
+        columns[variable] = {}
+        for period, values in periods.items():
+            values = _storable(values)
+            file = f"{variable}/{period}.npy"
+            np.save(staging / file, values)
+            columns[variable][period] = {
+                "file": file,
+                "dtype": values.dtype.str,
+                "shape": list(values.shape),
+            }
+    manifest = {
+        "dataset": dataset,
+        "time_period": str(time_period),
+        "policyengine_us": version("policyengine-us"),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "columns": columns,
+    }
+    (staging / MANIFEST).write_text(json.dumps(manifest, indent=1))
+    # Readers only ever see a complete directory.
+    shutil.rmtree(path, ignore_errors=True)
+    try:
+        staging.rename(path)
+    except OSError:
+        # Another converter got there first (e.g. a host whose lock we
+        # can't see on a shared disk); its columns are the same.
+        shutil.rmtree(staging, ignore_errors=True)
+        if not (path / MANIFEST).exists():
+            raise
+
+
+def open_dataset(dataset: str):
+    """Dataset serving memory-mapped columns, converting on first use.
+
+    DataFrames and other non-string datasets are returned unchanged.
+    """
+    if not isinstance(dataset, str):
+        return dataset
+    path = convert(dataset)
+    manifest = json.loads((path / MANIFEST).read_text())
+    arrays = {
+        variable: {
+            period: np.load(path / column["file"], mmap_mode="r")
+            for period, column in periods.items()
+        }
+        for variable, periods in manifest["columns"].items()
+    }
+    # The directory is named for the dataset file's state and the model.
+    return in_memory_dataset(arrays, manifest["time_period"], source=str(path))
+
+
+def microsimulation(dataset, reform=None):
+    """``Microsimulation`` over the memory-mapped columns of ``dataset``."""
+    from policyengine_us import Microsimulation
+
+    return Microsimulation(dataset=open_dataset(dataset), reform=reform)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Convert datasets to memory-mappable column files."
+    )
+    parser.add_argument("datasets", nargs="+", help="Dataset names or URLs.")
+    parser.add_argument(
+        "--force", action="store_true", help="Rebuild even if already converted."
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    for dataset in args.datasets:
+        start = time.perf_counter()
+        path = convert(dataset, force=args.force)
+        size = sum(f.stat().st_size for f in path.rglob("*.npy")) / 1e6
+        print(f"{dataset}: {path} ({size:,.0f} MB, {time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
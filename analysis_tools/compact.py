@@ -0,0 +1,113 @@
+"""
+Compact dtypes for large result tables.
+
+Result tables are built as float64 and object columns: every dollar amount
+takes eight bytes and every repeated ``state_code``, filing status or reform
+name is a separate Python string. ``compact`` stores the same table in
+smaller dtypes:
+
+- float columns as float32 where every value survives the round trip to
+  within ``precision`` (one cent by default), else left as float64,
+- integer (and whole-number float, if finite and within int64) columns such
+  as ids in the smallest integer type that holds them,
+- repeated strings and enums as categoricals (integer codes plus one copy of
+  each label).
+
+The original dtypes are kept in ``frame.attrs["compact"]``, so ``expand``
+returns the original frame: labels, ids and integers exactly, floats to
+within ``precision``.
+
+    results = compact(results)           # several times smaller
+    write_compact(results, "results.parquet")
+    results = expand(read_compact("results.parquet"))
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ATTR = "compact"
+
+
+def _smallest_int(values: pd.Series) -> pd.Series:
+    return pd.to_numeric(values, downcast="integer")
+
+
+def compact(
+    frame: pd.DataFrame,
+    precision: float = 0.01,
+    max_category_share: float = 0.5,
+) -> pd.DataFrame:
+    """Copy of ``frame`` in compact dtypes; see the module docstring.
+
+    Args:
+        precision: Largest absolute change allowed when storing a float
+            column as float32.
+        max_category_share: String columns become categoricals when their
+            distinct values number at most this share of the rows.
+    """
+    out = frame.copy()
+    original = dict(frame.attrs.get(ATTR, {}))
+    for column in frame.columns:
+        values = frame[column]
+        dtype = values.dtype
+        new = None
+        if pd.api.types.is_bool_dtype(dtype):
+            continue
+        elif pd.api.types.is_integer_dtype(dtype):
+            new = _smallest_int(values)
+        elif pd.api.types.is_float_dtype(dtype) and dtype.itemsize > 4:
+            finite = np.isfinite(values)
+            if (
+                finite.all()
+                and np.array_equal(values, np.round(values))
+                # 2.0**63 itself is out of range.
+                and ((values >= -(2.0**63)) & (values < 2.0**63)).all()
+            ):
+                new = _smallest_int(values.astype(np.int64))
+            else:
+                with np.errstate(over="ignore"):
+                    single = values.astype(np.float32)
+                # NaN and inf are kept as they are; finite values too large
+                # for float32 become inf and fail the check.
+                error = (single.astype(np.float64) - values)[finite].abs().max()
+                if not error > precision:  # also true for all-NaN columns
+                    new = single
+        elif pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+            if values.nunique(dropna=True) <= max_category_share * len(values):
+                new = values.astype("category")
+        if new is not None and new.dtype != dtype:
+            out[column] = new
+            original.setdefault(str(column), str(dtype))
+    out.attrs[ATTR] = original
+    return out
+
+
+def expand(frame: pd.DataFrame) -> pd.DataFrame:
+    """Restore the dtypes ``compact`` replaced."""
+    out = frame.copy()
+    original = out.attrs.pop(ATTR, {})
+    for column in out.columns:
+        dtype = original.get(str(column))
+        if dtype is None:
+            continue
+        out[column] = out[column].astype(dtype)
+    return out
+
+
+def memory_mb(frame: pd.DataFrame) -> float:
+    """Deep in-memory size of a frame, in MB."""
+    return frame.memory_usage(deep=True).sum() / 1e6
+
+
+def write_compact(frame: pd.DataFrame, path: str | Path) -> None:
+    """Write a compacted frame to Parquet, keeping its dtypes and attrs."""
+    frame.to_parquet(path, index=False)
+
+
+def read_compact(path: str | Path) -> pd.DataFrame:
+    """Read a frame written by ``write_compact``, still compact."""
+    return pd.read_parquet(path)
@@ -0,0 +1,144 @@
+"""
+Integer-coded county index and county-level aggregation.
+
+``data/county_fips_2020.csv.gz`` lists the ~3,200 counties (``us/medicaid/data``
+holds the same file, for policyengine-us's relative ``data/`` lookup). The
+index loads it once per process into plain arrays, ordered by FIPS code, so
+a county is identified by its position (a dense ``int``) rather than by
+string:
+
+    counties = load_counties()
+    counties.fips_of("Austin County", "TX")      # "48015"
+    counties.codes(["48015", "AUSTIN_COUNTY_TX"]) # array([2531, 2531])
+
+Households carry their county as the ``county`` enum name
+(``AUSTIN_COUNTY_TX``) or a ``county_fips`` string. ``codes`` matches each
+distinct value once and broadcasts the result, and ``aggregate_by_county``
+then rolls household results up to every county with one ``np.bincount``
+per statistic:
+
+    aggregate_by_county(
+        baseline["county"],
+        baseline["household_weight"],
+        {"net_income_change": change},
+        affected=np.abs(change) > 0.01,
+    )
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from analysis_tools.aggregation import aggregate_by_code
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+COUNTY_FILE = REPO_ROOT / "data" / "county_fips_2020.csv.gz"
+UNKNOWN = "UNKNOWN"
+
+
+def _enum_key(name: str, state: str) -> str:
+    """The policyengine-us ``County`` member name, e.g. AUSTIN_COUNTY_TX."""
+    for old, new in ((" ", "_"), ("-", "_"), (".", ""), ("'", "_")):
+        name = name.replace(old, new)
+    return f"{name.strip().upper()}_{state}"
+
+
+class CountyIndex(NamedTuple):
+    # One entry per county, ordered by FIPS code; a county's code is its
+    # position in these arrays.
+    fips: np.ndarray  # int32, e.g. 48015
+    state: np.ndarray  # two-letter state code
+    name: np.ndarray  # e.g. "Austin County"
+    key: np.ndarray  # County enum name, e.g. "AUSTIN_COUNTY_TX"
+
+    def __len__(self) -> int:
+        return len(self.fips)
+
+    def fips_str(self) -> np.ndarray:
+        """Five-digit FIPS strings, as policyengine-us's ``county_fips``."""
+        return np.char.zfill(self.fips.astype(str), 5)
+
+    def fips_of(self, name: str, state: str) -> str:
+        matches = np.flatnonzero((self.name == name) & (self.state == state))
+        if not len(matches):
+            raise KeyError(f"No county {name!r} in {state}.")
+        return self.fips_str()[matches[0]]
+
+    def codes(self, counties) -> np.ndarray:
+        """Dense code per record; -1 where the county is unknown.
+
+        Accepts ``County`` enum names or FIPS codes (strings or integers).
+        """
+        records, distinct = pd.factorize(np.asarray(counties), use_na_sentinel=True)
+        distinct = pd.Index(distinct).astype(str)
+        is_fips = distinct.str.fullmatch(r"\d{1,5}")
+        lookup = np.full(len(distinct), -1, dtype=np.int32)
+
+        fips = np.where(is_fips, distinct, "0").astype(np.int64)
+        position = np.minimum(np.searchsorted(self.fips, fips), len(self) - 1)
+        found = is_fips & (self.fips[position] == fips)
+        lookup[found] = position[found]
+
+        by_key = pd.Index(self.key).get_indexer(distinct)
+        lookup[~is_fips] = by_key[~is_fips]
+
+        codes = np.full(len(records), -1, dtype=np.int32)
+        known = records >= 0
+        codes[known] = lookup[records[known]]
+        return codes
+
+
+@lru_cache(maxsize=None)
+def load_counties(path: str | Path = COUNTY_FILE) -> CountyIndex:
+    """The county index, read once per process."""
+    table = pd.read_csv(path, dtype={"county_fips": str}, usecols=range(1, 4))
+    table = table.assign(fips=table["county_fips"].astype(np.int32)).sort_values("fips")
+    state = table["state"].to_numpy(dtype=str)
+    name = table["county_name"].to_numpy(dtype=str)
+    return CountyIndex(
+        fips=table["fips"].to_numpy(),
+        state=state,
+        name=name,
+        key=np.array([_enum_key(n, s) for n, s in zip(name, state)]),
+    )
+
+
+def aggregate_by_county(
+    counties,
+    weights,
+    values: dict[str, np.ndarray],
+    affected=None,
+    total_label: str = "TOTAL",
+    index: CountyIndex | None = None,
+) -> pd.DataFrame:
+    """Weighted per-county statistics for every county, in one grouped pass.
+
+    Args:
+        counties: County per record (``County`` enum names or FIPS codes).
+        weights, values, affected, total_label: As ``aggregate_by_region``.
+        index: County index; defaults to ``load_counties()``.
+
+    Returns:
+        DataFrame indexed by five-digit FIPS with ``state`` and
+        ``county_name`` columns and ``aggregate_by_region``'s statistics.
+        Records with an unknown county are kept in an ``UNKNOWN`` row (when
+        there are any) and in the ``total_label`` row.
+    """
+    index = index or load_counties()
+    codes = index.codes(counties)
+    labels = list(index.fips_str())
+    unknown = codes < 0
+    if unknown.any():
+        codes = np.where(unknown, len(index), codes)
+        labels.append(UNKNOWN)
+    table = aggregate_by_code(codes, labels, weights, values, affected, total_label)
+    table.index.name = "county_fips"
+    extra = len(table) - len(index)
+    table.insert(0, "state", np.concatenate([index.state, [""] * extra]))
+    table.insert(1, "county_name", np.concatenate([index.name, [""] * extra]))
+    return table
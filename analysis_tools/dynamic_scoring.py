@@ -0,0 +1,184 @@
+"""
+Static and dynamic (labor-supply) scores from one reformed simulation.
+
+Scoring a reform statically and with behavioral responses usually means
+three simulations (baseline, static reform, dynamic reform), and the dynamic
+one builds two more internally: policyengine-us measures each person's
+income and marginal-rate change by recalculating the reform and the baseline
+with responses switched off. Those two are the static reform and the
+baseline again.
+
+``combined_score`` runs the dynamic reform once and takes everything else
+from it. For each period it runs policyengine-us's own measurement
+(``get_behavioral_response_measurements``), which builds the two branches,
+stores the measurements where the labor-supply formulas read them and then
+drops the branches. They are kept instead and scored:
+
+- the reform branch, with the behavioral responses neutralized, gives the
+  static values,
+- the baseline measurement branch gives the baseline values,
+
+so the static score is read from values the measurement already calculated,
+and the dynamic one starts from the stored measurements.
+
+    simulation = microsimulation(DATASET, reform=reform_dynamic)
+    combined_score(simulation, "income_tax", range(2026, 2036), map_to="household")
+    # DataFrame by year: baseline, static, dynamic, static_impact, dynamic_impact
+
+The reform must include the policy change and the response elasticities,
+like any dynamic reform. The measurement function and its branch names are
+private to
+``policyengine_us.variables.gov.simulation.behavioral_response_measurements``,
+so scoring refuses policyengine-us releases outside ``TESTED_POLICYENGINE_US``
+and raises if the measurement stops creating those branches. For the first
+period it also scores the static reform on a fresh simulation with the
+responses neutralized, and raises unless that matches the kept branch.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    from policyengine_us import Microsimulation
+
+
+# [first, last) policyengine-us releases the branch bookkeeping is checked on.
+TESTED_POLICYENGINE_US = ((2, 42), (2, 43))
+
+
+def _check_policyengine_us() -> None:
+    from importlib.metadata import version
+
+    installed = version("policyengine-us")
+    release = tuple(int(part) for part in re.findall(r"\d+", installed)[:2])
+    first, last = TESTED_POLICYENGINE_US
+    if not first <= release < last:
+        raise RuntimeError(
+            f"combined_score is tested with policyengine-us "
+            f">={'.'.join(map(str, first))},<{'.'.join(map(str, last))}, not "
+            f"{installed}: it relies on the private behavioral response "
+            "measurement. Check its branches still match, then widen "
+            "TESTED_POLICYENGINE_US."
+        )
+
+
+class _KeptBranches(dict):
+    """A ``branches`` dict that keeps what is popped from it."""
+
+    def __init__(self, branches: dict):
+        super().__init__(branches)
+        self.popped = {}
+
+    def pop(self, name, *default):
+        if name in self:
+            self.popped[name] = self[name]
+        return super().pop(name, *default)
+
+
+def measurement_branches(
+    simulation: Microsimulation, period, _retried: bool = False
+) -> tuple[Microsimulation, Microsimulation]:
+    """Measure ``simulation``'s responses for ``period``; return (static, baseline).
+
+    The branches are the ones policyengine-us measured on: the reform with
+    responses neutralized, and baseline policy, both on the pre-response
+    inputs for ``period``. A period measured earlier (say by a previous
+    ``calculate``) is measured again on a clone, whose branches match.
+    """
+    from importlib.metadata import version
+
+    from policyengine_us.variables.gov.simulation import (
+        behavioral_response_measurements as measurements,
+    )
+
+    _check_policyengine_us()
+    branches = simulation.branches
+    kept = _KeptBranches(branches)
+    simulation.branches = kept
+    try:
+        measurements.get_behavioral_response_measurements(
+            simulation.populations["person"], period
+        )
+    finally:
+        # Same dict as before, with any branches the measurement left.
+        simulation.branches = branches
+        branches.clear()
+        branches.update(kept)
+    names = (
+        measurements.BEHAVIORAL_RESPONSE_MEASUREMENT_BRANCH,
+        measurements.BASELINE_BEHAVIORAL_RESPONSE_MEASUREMENT_BRANCH,
+    )
+    if all(name in kept.popped for name in names):
+        return tuple(kept.popped[name] for name in names)
+    if not kept.popped and not _retried:
+        return measurement_branches(simulation.clone(), period, _retried=True)
+    raise RuntimeError(
+        f"policyengine-us {version('policyengine-us')} measured behavioral "
+        f"responses without the branches {names}; combined_score needs updating."
+    )
+
+
+def fresh_static_total(
+    simulation: Microsimulation, variable: str, period, map_to: str | None = None
+) -> float:
+    """Total of ``variable`` on a new simulation of the reform, responses off."""
+    from policyengine_us.variables.gov.simulation import (
+        behavioral_response_measurements as measurements,
+    )
+
+    fresh = type(simulation)(dataset=simulation.dataset, reform=simulation.reform)
+    for name in measurements.NEUTRALIZED_BEHAVIORAL_RESPONSE_VARIABLES:
+        fresh.tax_benefit_system.neutralize_variable(name)
+    return fresh.calculate(variable, period=period, map_to=map_to).sum()
+
+
+def combined_score(
+    simulation: Microsimulation,
+    variable: str,
+    periods,
+    map_to: str | None = None,
+    check_static: bool = True,
+) -> pd.DataFrame:
+    """Weighted totals of ``variable`` under baseline, static and dynamic policy.
+
+    Args:
+        simulation: Microsimulation of the dynamic reform (policy change plus
+            response elasticities).
+        variable: Variable to total, e.g. ``income_tax``.
+        periods: Periods to score, e.g. ``range(2026, 2036)``.
+        map_to: Entity to map ``variable`` to before summing.
+        check_static: Score the first period's static reform again on a
+            fresh simulation and raise unless it matches.
+
+    Returns:
+        DataFrame indexed by period with ``baseline``, ``static`` and
+        ``dynamic`` totals and the ``static_impact`` and ``dynamic_impact``
+        against baseline.
+    """
+    if simulation.baseline is None:
+        raise ValueError("combined_score needs a reformed simulation.")
+    rows = {}
+    for period in periods:
+        static, baseline = measurement_branches(simulation, period)
+        rows[period] = {
+            "baseline": baseline.calculate(variable, period=period, map_to=map_to).sum(),
+            "static": static.calculate(variable, period=period, map_to=map_to).sum(),
+            "dynamic": simulation.calculate(variable, period=period, map_to=map_to).sum(),
+        }
+        if check_static and len(rows) == 1:
+            expected = fresh_static_total(simulation, variable, period, map_to)
+            if not np.isclose(rows[period]["static"], expected, rtol=1e-6):
+                raise RuntimeError(
+                    f"Static {variable} for {period} from the measurement branch "
+                    f"({rows[period]['static']:,.0f}) differs from a fresh run "
+                    f"without behavioral responses ({expected:,.0f})."
+                )
+    table = pd.DataFrame.from_dict(rows, orient="index")
+    table["static_impact"] = table["static"] - table["baseline"]
+    table["dynamic_impact"] = table["dynamic"] - table["baseline"]
+    return table
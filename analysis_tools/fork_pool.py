@@ -0,0 +1,115 @@
+"""
+Fork-based worker pool sharing one loaded dataset copy-on-write.
+
+Running reforms in parallel with a plain process pool makes every worker
+download, read and decode the same dataset. ``ForkPool`` loads it once in the
+parent, keeps the loaded input arrays, and forks workers that inherit those
+pages copy-on-write. Each worker builds its reformed ``Microsimulation`` from
+the inherited arrays (an in-memory dataset, so nothing is read from disk) and
+only allocates the arrays its reform calculates.
+
+    pool = ForkPool("hf://policyengine/policyengine-us-data/enhanced_cps_2024.h5")
+    totals = pool.map(total_income_tax, [None, reform_a, reform_b])
+
+``fn`` and the reforms reach workers through fork rather than pickling, so
+notebook-defined functions and ``Reform.from_dict`` classes work. Requires the
+``fork`` start method (Linux).
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+from typing import Callable
+
+# Set just before forking; workers read it from their copy of the parent.
+_JOB = None
+
+
+def in_memory_dataset(arrays: dict, time_period, source: str | None = None):
+    """A policyengine-core dataset serving ``{variable: {period: array}}``.
+
+    ``source`` names what the arrays were read from, for caches that key on
+    the dataset; every in-memory dataset has the same ``name``.
+    """
+    from policyengine_core.data import Dataset
+
+    class InMemoryDataset(Dataset):
+        name = "in_memory"
+        label = "In-memory dataset"
+        data_format = Dataset.TIME_PERIOD_ARRAYS
+
+        def __init__(self):
+            self.time_period = time_period
+            self.source = source
+
+        def load(self):
+            return arrays
+
+    return InMemoryDataset()
+
+
+def load_input_arrays(dataset) -> tuple[dict, str]:
+    """{variable: {period: array}} of everything a dataset loads, and its year.
+
+    Read from a freshly built simulation, before any calculation, so only
+    loaded inputs are captured. The arrays are the simulation's own storage,
+    not copies.
+    """
+    from policyengine_us import Microsimulation
+
+    simulation = Microsimulation(dataset=dataset)
+    arrays = {}
+    for name in simulation.input_variables:
+        holder = simulation.get_holder(name)
+        arrays[name] = {
+            str(period): holder.get_array(period)
+            for period in holder.get_known_periods()
+        }
+    # Flat files derive entity ids from memberships instead of storing them;
+    # an array dataset needs them explicitly.
+    time_period = simulation.dataset.time_period
+    persons = simulation.persons
+    arrays.setdefault("person_id", {str(time_period): persons.ids})
+    for entity in simulation.tax_benefit_system.group_entities:
+        population = simulation.populations[entity.key]
+        arrays.setdefault(f"{entity.key}_id", {str(time_period): population.ids})
+        arrays.setdefault(
+            f"person_{entity.key}_id",
+            {str(time_period): population.ids[population.members_entity_id]},
+        )
+    return arrays, time_period
+
+
+def _run(index: int):
+    from policyengine_us import Microsimulation
+
+    arrays, time_period, fn, reforms = _JOB
+    simulation = Microsimulation(
+        dataset=in_memory_dataset(arrays, time_period), reform=reforms[index]
+    )
+    return fn(simulation)
+
+
+class ForkPool:
+    def __init__(self, dataset, workers: int = 4):
+        self.workers = workers
+        self.arrays, self.time_period = load_input_arrays(dataset)
+
+    def simulation(self, reform=None):
+        """A Microsimulation over the loaded arrays, in this process."""
+        from policyengine_us import Microsimulation
+
+        return Microsimulation(
+            dataset=in_memory_dataset(self.arrays, self.time_period), reform=reform
+        )
+
+    def map(self, fn: Callable, reforms: list) -> list:
+        """``fn(Microsimulation(reform=r))`` for each reform, in forked workers."""
+        global _JOB
+        _JOB = (self.arrays, self.time_period, fn, list(reforms))
+        try:
+            context = multiprocessing.get_context("fork")
+            with context.Pool(min(self.workers, len(reforms))) as pool:
+                return pool.map(_run, range(len(reforms)), chunksize=1)
+        finally:
+            _JOB = None
@@ -0,0 +1,202 @@
+"""
+Run many household situations, each with its own axis sweep, in one simulation.
+
+Building a ``Simulation`` from a situation dict costs far more than computing
+a household, so looping over households one ``Simulation`` at a time is
+dominated by construction overhead. ``stack_situations`` instead expands each
+situation's axes itself and packs every household copy into one person-level
+flat file (``<variable>__<period>`` columns plus membership ids), which
+policyengine-core loads as a dataset. ``run_situations`` runs that in batches
+and returns one row per household copy.
+
+Axes follow the situation format: a single group of parallel axes, each with
+``name``, ``count``, ``min``, ``max`` and optional ``index`` (which person or
+group the sweep applies to) and ``period``.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from analysis_tools.reforms import build_reform
+from analysis_tools.variable_index import get_default_value, get_variable_entity
+
+
+def _group_entities() -> dict[str, str]:
+    from policyengine_us.entities import entities
+
+    return {entity.plural: entity.key for entity in entities if not entity.is_person}
+
+
+def _expand(situation: dict, axis_period: str, group_entities: dict[str, str]) -> dict:
+    """Columns, memberships and step count for one situation's household copies."""
+    people = list(situation["people"])
+    position = {name: j for j, name in enumerate(people)}
+    columns = {}
+
+    def set_values(members, variables):
+        for variable, values in variables.items():
+            if variable == "members":
+                continue
+            for value_period, value in values.items():
+                column = columns.setdefault(f"{variable}__{value_period}", {})
+                for member in members:
+                    column[position[member]] = value
+
+    for name, variables in situation["people"].items():
+        set_values([name], variables)
+
+    membership = {}
+    groups_by_entity = {}
+    for plural, key in group_entities.items():
+        groups = situation.get(plural) or {"all": {"members": people}}
+        groups = list(groups.values())
+        allocated = {m for group in groups for m in group["members"]}
+        # As in SimulationBuilder, anyone left out gets a group of their own.
+        groups += [{"members": [m]} for m in people if m not in allocated]
+        groups_by_entity[key] = groups
+        local = np.zeros(len(people), dtype=np.int64)
+        for g, group in enumerate(groups):
+            local[[position[m] for m in group["members"]]] = g
+            set_values(group["members"], group)
+        membership[key] = local
+
+    axis_groups = situation.get("axes") or []
+    if len(axis_groups) > 1:
+        raise ValueError("Only one group of parallel axes is supported.")
+    axes = axis_groups[0] if axis_groups else []
+    steps = axes[0]["count"] if axes else 1
+    sweeps = {}
+    for axis in axes:
+        if axis["count"] != steps:
+            raise ValueError("Parallel axes must have the same count.")
+        entity = get_variable_entity(axis["name"])
+        index = axis.get("index", 0)
+        if entity == "person":
+            targets = [position[people[index]]]
+        else:
+            targets = [position[m] for m in groups_by_entity[entity][index]["members"]]
+        column = f"{axis['name']}__{axis.get('period', axis_period)}"
+        sweeps[column] = (targets, np.linspace(axis["min"], axis["max"], steps))
+
+    return {
+        "size": len(people),
+        "steps": steps,
+        "columns": columns,
+        "sweeps": sweeps,
+        "membership": membership,
+        "households": len(groups_by_entity["household"]),
+    }
+
+
+def stack_situations(
+    situations: list[dict], period: int | str, axis_period: int | str | None = None
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Pack situations and their axis sweeps into one flat-file dataset.
+
+    Axes without a ``period`` set values for ``axis_period`` (default
+    ``period``); ids are written for ``period``.
+
+    Returns:
+        (persons, households): the person-level input frame, and one row per
+        household copy with ``situation`` (position in ``situations``),
+        ``step`` (axis point) and the swept values, in simulation order.
+    """
+    period = str(period)
+    axis_period = period if axis_period is None else str(axis_period)
+    group_entities = _group_entities()
+    expanded = [_expand(s, axis_period, group_entities) for s in situations]
+    names = sorted({c for e in expanded for c in [*e["columns"], *e["sweeps"]]})
+
+    parts = {name: [] for name in names}
+    memberships = {key: [] for key in group_entities.values()}
+    copy_of_person = []
+    household_rows = []
+    copy_number = 0
+    for i, e in enumerate(expanded):
+        size, steps = e["size"], e["steps"]
+        for name in names:
+            variable = name.split("__")[0]
+            template = np.full(size, get_default_value(variable), dtype=object)
+            for j, value in e["columns"].get(name, {}).items():
+                template[j] = value
+            values = np.tile(template, steps)
+            if name in e["sweeps"]:
+                targets, points = e["sweeps"][name]
+                for j in targets:
+                    values[j::size] = points
+            parts[name].append(values)
+        for key, local in e["membership"].items():
+            memberships[key].append(np.tile(local, steps))
+        copy_of_person.append(np.repeat(np.arange(copy_number, copy_number + steps), size))
+        household_rows.append(
+            pd.DataFrame(
+                {
+                    "situation": i,
+                    "step": np.repeat(np.arange(steps), e["households"]),
+                    **{
+                        name.split("__")[0]: np.repeat(points, e["households"])
+                        for name, (_, points) in e["sweeps"].items()
+                    },
+                }
+            )
+        )
+        copy_number += steps
+
+    copies = np.concatenate(copy_of_person)
+    persons = pd.DataFrame(
+        {name: pd.Series(np.concatenate(values)).infer_objects() for name, values in parts.items()}
+    )
+    persons[f"person_id__{period}"] = np.arange(len(persons))
+    for key, local in memberships.items():
+        local = np.concatenate(local)
+        persons[f"person_{key}_id__{period}"] = copies * (local.max() + 1) + local
+    return persons, pd.concat(household_rows, ignore_index=True)
+
+
+def run_situations(
+    situations: list[dict],
+    variables: list[str],
+    period: int | str,
+    reform: dict | None = None,
+    batch_size: int = 500,
+    tax_benefit_system=None,
+) -> pd.DataFrame:
+    """Household-level results for every situation and axis point.
+
+    Situations are simulated ``batch_size`` at a time, each batch as one
+    simulation. Returns the ``stack_situations`` household frame with one
+    column per variable. Pass an already-built (and possibly reformed)
+    ``tax_benefit_system`` instead of ``reform`` to skip building one.
+    """
+    from policyengine_us import Simulation
+
+    reform = build_reform(reform)
+    if tax_benefit_system is not None and reform is not None:
+        raise ValueError("Pass either reform or tax_benefit_system, not both.")
+    results = []
+    for start in range(0, len(situations), batch_size):
+        batch = situations[start : start + batch_size]
+        # SimulationBuilder puts period-less axes in the default input period
+        # (values are then uprated to ``period``), so do the same.
+        persons, households = stack_situations(
+            batch, period, axis_period=Simulation.default_input_period
+        )
+        simulation = Simulation(
+            dataset=persons, reform=reform, tax_benefit_system=tax_benefit_system
+        )
+        # Loaded as a dataset, but these are separate households: formulas
+        # that branch on is_over_dataset (population sums such as the Medicaid
+        # cost denominator) or on a supplied person_id must take their
+        # situation paths, as they do under Simulation(situation=...).
+        simulation.is_over_dataset = False
+        simulation.delete_arrays("person_id")
+        simulation.input_variables.remove("person_id")
+        for variable in variables:
+            households[variable] = simulation.calculate(
+                variable, period, map_to="household"
+            )
+        households["situation"] += start
+        results.append(households)
+    return pd.concat(results, ignore_index=True)
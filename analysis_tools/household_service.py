@@ -0,0 +1,234 @@
+"""
+Warm household-calculation service.
+
+Single-household notebooks and calculators pay for the tax-benefit system on
+every kernel start and rebuild their reformed systems on every
+``Simulation(situation=..., reform=...)``, which costs far more than the
+household itself. ``HouseholdService`` keeps the baseline system and every
+reformed system it has compiled in memory, and runs each batch of situations
+(with their ``axes``) as one simulation through
+``analysis_tools.household_batch``, so a household in a batch costs
+milliseconds once the service is warm.
+
+In process (one service per kernel):
+
+    from analysis_tools.household_service import get_service
+
+    get_service().calculate(situation, ["household_net_income"], 2026, reform=REFORM)
+
+Over a localhost socket, for CI checks and calculators in other processes:
+
+    python -m analysis_tools.household_service --port 8765 --reform reform.json
+
+    POST /calculate  one request or a list of requests:
+        {"situation": {...}, "variables": [...], "period": 2026, "reform": {...}}
+    GET /health
+
+Results are household-level: one value per household per axis point, as
+``calculate(variable, map_to="household")`` returns for a situation.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.request import Request, urlopen
+
+import numpy as np
+
+from analysis_tools.household_batch import run_situations
+from analysis_tools.reforms import build_reform, load_reform_file, reform_hash
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+class HouseholdService:
+    """Household calculations against cached baseline and reformed systems."""
+
+    def __init__(self):
+        self._systems = {}
+
+    @staticmethod
+    def _key(reform):
+        # Reform dicts are keyed by content; prebuilt Reform classes by identity.
+        return reform if isinstance(reform, type) else reform_hash(reform)
+
+    def system(self, reform=None):
+        """Tax-benefit system for a reform dict or Reform class, built once."""
+        key = self._key(reform)
+        if key not in self._systems:
+            from policyengine_us import CountryTaxBenefitSystem, Simulation
+
+            if key == "baseline" and Simulation.default_tax_benefit_system_instance:
+                system = Simulation.default_tax_benefit_system_instance
+            else:
+                compiled = reform if isinstance(reform, type) else build_reform(reform)
+                system = CountryTaxBenefitSystem(reform=compiled)
+            self._systems[key] = system
+        return self._systems[key]
+
+    def warm(self, reforms=(None,)) -> None:
+        """Build systems and run a trivial household on each."""
+        household = {
+            "people": {"you": {"age": {"2025": 40}}},
+            "households": {"your household": {"members": ["you"]}},
+        }
+        self.calculate_batch(
+            [
+                {
+                    "situation": household,
+                    "variables": ["household_net_income"],
+                    "period": 2025,
+                    "reform": reform,
+                }
+                for reform in reforms
+            ]
+        )
+
+    def calculate_batch(self, requests: list[dict]) -> list[dict[str, np.ndarray]]:
+        """Results for each request, in order.
+
+        Each request has ``situation``, ``variables``, ``period`` and an
+        optional ``reform``. Requests sharing a reform, period and variable
+        list run as one simulation.
+        """
+        groups = {}
+        for i, request in enumerate(requests):
+            key = (
+                self._key(request.get("reform")),
+                str(request["period"]),
+                tuple(request["variables"]),
+            )
+            groups.setdefault(key, []).append(i)
+
+        results = [None] * len(requests)
+        for (_, period, variables), indices in groups.items():
+            frame = run_situations(
+                [requests[i]["situation"] for i in indices],
+                list(variables),
+                period,
+                batch_size=len(indices),
+                tax_benefit_system=self.system(requests[indices[0]].get("reform")),
+            )
+            for position, rows in frame.groupby("situation"):
+                results[indices[position]] = {
+                    variable: rows[variable].to_numpy() for variable in variables
+                }
+        return results
+
+    def calculate(
+        self, situation: dict, variables: list[str], period, reform=None
+    ) -> dict[str, np.ndarray]:
+        """Results for one situation."""
+        request = {
+            "situation": situation,
+            "variables": variables,
+            "period": period,
+            "reform": reform,
+        }
+        return self.calculate_batch([request])[0]
+
+
+@lru_cache(maxsize=None)
+def get_service() -> HouseholdService:
+    """The process-wide service, so a kernel builds each system once."""
+    return HouseholdService()
+
+
+def _handler(service: HouseholdService):
+    class Handler(BaseHTTPRequestHandler):
+        def _respond(self, status: int, body) -> None:
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path != "/health":
+                return self._respond(404, {"error": f"Unknown path {self.path}"})
+            self._respond(200, {"status": "ok", "systems": len(service._systems)})
+
+        def do_POST(self):
+            if self.path != "/calculate":
+                return self._respond(404, {"error": f"Unknown path {self.path}"})
+            try:
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                single = isinstance(body, dict)
+                results = service.calculate_batch([body] if single else body)
+            except Exception as e:
+                return self._respond(400, {"error": f"{type(e).__name__}: {e}"})
+            results = [
+                {variable: values.tolist() for variable, values in result.items()}
+                for result in results
+            ]
+            self._respond(200, results[0] if single else results)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    service: HouseholdService | None = None,
+) -> HTTPServer:
+    """HTTP server for a service; call ``serve_forever()`` on the result.
+
+    Requests are handled one at a time: simulations share the cached systems.
+    """
+    return HTTPServer((host, port), _handler(service or get_service()))
+
+
+def calculate_remote(
+    requests: dict | list[dict], url: str = f"http://{DEFAULT_HOST}:{DEFAULT_PORT}"
+):
+    """Send one request or a batch to a running service."""
+    request = Request(
+        f"{url}/calculate",
+        data=json.dumps(requests).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    with urlopen(request) as response:
+        results = json.loads(response.read())
+    if isinstance(results, dict):
+        return {variable: np.array(values) for variable, values in results.items()}
+    return [
+        {variable: np.array(values) for variable, values in result.items()}
+        for result in results
+    ]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the household service.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument(
+        "--reform",
+        action="append",
+        default=[],
+        help="Reform file (JSON/YAML) to compile before serving. Repeatable.",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    service = get_service()
+    start = time.perf_counter()
+    service.warm([None] + [load_reform_file(path) for path in args.reform])
+    print(f"Warm in {time.perf_counter() - start:.1f}s")
+    server = serve(args.host, args.port, service)
+    print(f"Serving on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Job graph for reform-impact runs.
+
+A run asks for every combination of reforms x datasets x periods x tables.
+Planning collapses that into the simulations that actually have to be built:
+
+- one baseline Microsimulation per dataset, shared by every reform,
+- one reformed Microsimulation per (dataset, distinct reform), so two reform
+  files with identical contents are simulated once,
+- each simulation covers all requested periods and calculates the union of
+  variables its downstream tables need.
+
+Simulations are independent of each other and run on a local process pool.
+Each opens its dataset through ``analysis_tools.column_cache``, so workers
+share one memory-mapped copy of the inputs instead of decoding their own;
+datasets are converted in the parent before any worker starts.
+Tables are cheap and are computed in the parent from the returned arrays as
+soon as their baseline and reform simulations have both finished.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from analysis_tools.column_cache import convert, microsimulation
+from analysis_tools.compact import compact
+from analysis_tools.manifest import counting_caches, record_caches
+from analysis_tools.reforms import build_reform, reform_hash
+from analysis_tools.tables import MAP_TO, TABLES
+
+
+class SimulationJob(NamedTuple):
+    dataset: str
+    reform_hash: str
+    periods: tuple[int, ...]
+    variables: tuple[str, ...]
+
+
+class OutputJob(NamedTuple):
+    reform_name: str
+    reform_hash: str
+    dataset: str
+    period: int
+    table: str
+
+
+def plan_jobs(
+    reforms: dict[str, dict],
+    datasets: list[str],
+    periods: list[int],
+    tables: list[str],
+) -> tuple[list[SimulationJob], list[OutputJob]]:
+    """Expand a request into deduplicated simulation jobs and output jobs."""
+    unknown = sorted(set(tables) - set(TABLES))
+    if unknown:
+        raise ValueError(f"Unknown tables {unknown}. Available: {sorted(TABLES)}")
+
+    compared = sorted({v for t in tables for v in TABLES[t].compared})
+    baseline_vars = sorted(
+        set(compared) | {v for t in tables for v in TABLES[t].baseline_only}
+    )
+    periods = tuple(sorted(set(periods)))
+    hashes = {name: reform_hash(reform) for name, reform in reforms.items()}
+
+    simulations = {}
+    outputs = []
+    for dataset in dict.fromkeys(datasets):
+        simulations[(dataset, "baseline")] = SimulationJob(
+            dataset, "baseline", periods, tuple(baseline_vars)
+        )
+        for name, h in hashes.items():
+            simulations.setdefault(
+                (dataset, h), SimulationJob(dataset, h, periods, tuple(compared))
+            )
+            for period in periods:
+                for table in tables:
+                    outputs.append(OutputJob(name, h, dataset, period, table))
+    return list(simulations.values()), outputs
+
+
+def run_simulation(job: SimulationJob, reform: dict | None) -> tuple[dict, dict]:
+    """Build one Microsimulation; return ({period: {variable: array}}, cache counts).
+
+    The cache counts are returned rather than recorded, because a worker
+    process has no run manifest to record them in.
+    """
+    with counting_caches() as caches:
+        sim = microsimulation(job.dataset, reform=build_reform(reform))
+        arrays = {
+            period: {
+                variable: np.asarray(
+                    sim.calculate(
+                        variable, period=period, map_to=MAP_TO.get(variable)
+                    ).values
+                )
+                for variable in job.variables
+            }
+            for period in job.periods
+        }
+    return arrays, caches
+
+
+def run_jobs(
+    simulations: list[SimulationJob],
+    outputs: list[OutputJob],
+    reforms_by_hash: dict[str, dict],
+    workers: int = 1,
+) -> dict[str, pd.DataFrame]:
+    """Run the simulation jobs and return one long (compacted) table each."""
+    results = {}
+    pending = list(outputs)
+    rows = {}
+
+    def finish(job: SimulationJob, result: tuple[dict, dict]) -> None:
+        arrays, caches = result
+        record_caches(caches)
+        results[(job.dataset, job.reform_hash)] = arrays
+        print(f"  Simulated {job.reform_hash} on {job.dataset}")
+        for out in list(pending):
+            baseline = results.get((out.dataset, "baseline"))
+            reformed = results.get((out.dataset, out.reform_hash))
+            if baseline is None or reformed is None:
+                continue
+            pending.remove(out)
+            table = TABLES[out.table].compute(
+                baseline[out.period], reformed[out.period]
+            )
+            table.insert(0, "period", out.period)
+            table.insert(0, "dataset", out.dataset)
+            table.insert(0, "reform_hash", out.reform_hash)
+            table.insert(0, "reform", out.reform_name)
+            rows.setdefault(out.table, []).append(table)
+
+    if workers <= 1:
+        for job in simulations:
+            finish(job, run_simulation(job, reforms_by_hash.get(job.reform_hash)))
+    else:
+        # Convert each dataset here, once, rather than in every worker at once.
+        for dataset in dict.fromkeys(job.dataset for job in simulations):
+            convert(dataset)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(
+                    run_simulation, job, reforms_by_hash.get(job.reform_hash)
+                ): job
+                for job in simulations
+            }
+            for future in as_completed(futures):
+                finish(futures[future], future.result())
+
+    return {
+        table: compact(pd.concat(frames, ignore_index=True))
+        for table, frames in rows.items()
+    }
@@ -0,0 +1,413 @@
+"""
+Run manifests: what a runner did, how long it took and what it ran against.
+
+Every runner writes one JSON manifest per run to
+``results/manifests/<runner>/<run id>.json`` (``ANALYSIS_MANIFESTS``
+overrides the root) with:
+
+- per-stage wall time, peak resident memory and memory added,
+- the run's peak resident memory and total time,
+- cache hits and misses (column cache, payload cache, period cache, ...),
+- the datasets as given and as resolved (pinned version, local file size and
+  modification time),
+- installed policyengine/numpy/pandas versions,
+- the hash of each reform (``analysis_tools.reforms.reform_hash``),
+- the runner's arguments, and whether it finished or failed.
+
+A runner decorates its ``main`` and marks stage boundaries; the manifest is
+written when ``main`` returns or raises:
+
+    from analysis_tools.manifest import current_manifest, recorded
+
+    @recorded("children_by_agi_bin")
+    def main():
+        args = parser.parse_args()
+        manifest = current_manifest()
+        manifest.describe(arguments=vars(args), datasets=[args.enhanced_cps_2024])
+        manifest.begin("simulate")
+        ...
+        manifest.begin("render")
+        ...
+
+Shared caches report to whichever manifest is active with ``record_cache``,
+which does nothing outside a recorded run. Worker processes have no active
+manifest: they collect their counts with ``counting_caches`` and return them
+with their results, and the parent records them with ``record_caches``.
+Summarize trends across runs:
+
+    python -m analysis_tools.manifest --runner compare_legacy_vs_current \
+        --report results/manifests/trends.html
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import json
+import os
+import platform
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+PACKAGES = ("policyengine", "policyengine-us", "policyengine-core", "numpy", "pandas")
+
+# The manifest of the run in progress, if any.
+_ACTIVE = None
+# Cache counts collected by counting_caches instead, if any.
+_COUNTS = None
+
+
+def manifest_root() -> Path:
+    return Path(
+        os.environ.get("ANALYSIS_MANIFESTS", REPO_ROOT / "results" / "manifests")
+    )
+
+
+def _peak_rss_mb() -> float:
+    """Peak resident memory of this process so far, in MB (NaN if unknown)."""
+    try:
+        import resource
+    except ImportError:
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS.
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+class PeakRSS:
+    """Sample resident memory on a thread; ``reset`` starts a new window."""
+
+    def __init__(self, interval: float = 0.01):
+        from analysis_tools.memory_budget import _rss_mb
+
+        self._rss_mb = _rss_mb
+        self.interval = interval
+        self.start = self.peak = _rss_mb()
+        # Held across the sampler's read-modify-write of ``peak``, so a
+        # sample taken before ``reset`` can't land in the new window.
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                self.peak = max(self.peak, self._rss_mb())
+
+    def reset(self) -> None:
+        with self._lock:
+            self.start = self.peak = self._rss_mb()
+
+    def __enter__(self) -> PeakRSS:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self._rss_mb())
+
+
+def package_versions() -> dict[str, str | None]:
+    versions = {}
+    for package in PACKAGES:
+        try:
+            versions[package] = version(package)
+        except PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+
+def describe_dataset(dataset) -> dict:
+    """The dataset as given, its pinned version and, for a local file, its state."""
+    if not isinstance(dataset, (str, Path)):
+        return {"dataset": type(dataset).__name__}
+    text = str(dataset)
+    name, pinned = text, ""
+    if text.startswith("hf://"):
+        name, _, pinned = text.partition("@")
+    described = {"dataset": text, "version": pinned or None}
+    path = Path(name).expanduser()
+    if path.is_file():
+        stat = path.stat()
+        described.update(
+            path=str(path.resolve()),
+            size=stat.st_size,
+            modified=time.strftime(
+                "%Y-%m-%dT%H:%M:%S", time.localtime(stat.st_mtime)
+            ),
+        )
+    return described
+
+
+class RunManifest:
+    """Stages, caches and context of one run; see module docs."""
+
+    def __init__(self, runner: str):
+        self.runner = runner
+        self.started = time.time()
+        self.run_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+        self.context = {"arguments": {}, "datasets": [], "reforms": {}}
+        self.stages = []
+        self.caches = {}
+        self._stage = None
+        self._rss = PeakRSS()
+
+    def describe(self, arguments=None, datasets=(), reforms=None) -> None:
+        """Record the run's arguments, datasets and reforms (name -> dict)."""
+        from analysis_tools.reforms import reform_hash
+
+        if arguments is not None:
+            # Paths and other objects as strings, so the manifest is plain JSON.
+            self.context["arguments"] = json.loads(json.dumps(arguments, default=str))
+        self.context["datasets"] += [describe_dataset(d) for d in datasets]
+        for name, reform in (reforms or {}).items():
+            self.context["reforms"][name] = reform_hash(reform)
+
+    def begin(self, stage: str) -> None:
+        """End the current stage, if any, and start ``stage``."""
+        self.end()
+        self._rss.reset()
+        self._stage = (stage, time.perf_counter())
+
+    def end(self) -> None:
+        """End the current stage, if any."""
+        if self._stage is None:
+            return
+        name, start = self._stage
+        self._stage = None
+        peak = max(self._rss.peak, self._rss._rss_mb())
+        self.stages.append(
+            {
+                "stage": name,
+                "seconds": round(time.perf_counter() - start, 3),
+                "peak_rss_mb": round(peak, 1),
+                "rss_added_mb": round(peak - self._rss.start, 1),
+            }
+        )
+
+    @contextmanager
+    def stage(self, name: str):
+        """``begin(name)`` for the block, ending it afterwards."""
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end()
+
+    def record_cache(self, cache: str, hit: bool, count: int = 1) -> None:
+        counts = self.caches.setdefault(cache, {"hits": 0, "misses": 0})
+        counts["hits" if hit else "misses"] += count
+
+    def to_dict(self, status: str = "ok", error: str | None = None) -> dict:
+        return {
+            "runner": self.runner,
+            "run_id": self.run_id,
+            "status": status,
+            "error": error,
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "seconds": round(time.time() - self.started, 3),
+            "peak_rss_mb": round(_peak_rss_mb(), 1),
+            "host": platform.node(),
+            "python": platform.python_version(),
+            "packages": package_versions(),
+            **self.context,
+            "stages": self.stages,
+            "caches": self.caches,
+        }
+
+    def write(self, status: str = "ok", error: str | None = None) -> Path:
+        self.end()
+        path = manifest_root() / self.runner / f"{self.run_id}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(status, error), indent=2) + "\n")
+        return path
+
+
+def current_manifest() -> RunManifest | None:
+    return _ACTIVE
+
+
+def begin_stage(stage: str) -> None:
+    """Start ``stage`` in the active run's manifest, if any."""
+    if _ACTIVE is not None:
+        _ACTIVE.begin(stage)
+
+
+def record_cache(cache: str, hit: bool, count: int = 1) -> None:
+    """Count a cache hit or miss in the active run's manifest, if any."""
+    if _COUNTS is not None:
+        counts = _COUNTS.setdefault(cache, {"hits": 0, "misses": 0})
+        counts["hits" if hit else "misses"] += count
+    elif _ACTIVE is not None:
+        _ACTIVE.record_cache(cache, hit, count)
+
+
+@contextmanager
+def counting_caches():
+    """Collect the block's cache counts, {cache: {"hits", "misses"}}, instead."""
+    global _COUNTS
+    counts = {}
+    previous, _COUNTS = _COUNTS, counts
+    try:
+        yield counts
+    finally:
+        _COUNTS = previous
+
+
+def record_caches(counts: dict) -> None:
+    """Record counts collected by ``counting_caches``, e.g. in a worker."""
+    for cache, cache_counts in counts.items():
+        record_cache(cache, True, cache_counts["hits"])
+        record_cache(cache, False, cache_counts["misses"])
+
+
+@contextmanager
+def run_manifest(runner: str):
+    """Record a run; the manifest is written when the block exits."""
+    global _ACTIVE
+    manifest = RunManifest(runner)
+    previous, _ACTIVE = _ACTIVE, manifest
+    status, error = "ok", None
+    try:
+        with manifest._rss:
+            yield manifest
+    except SystemExit as e:
+        # sys.exit() and sys.exit(0) are a clean finish.
+        if e.code not in (None, 0):
+            status, error = "failed", f"SystemExit: {e.code}"
+        raise
+    except BaseException as e:
+        status, error = "failed", f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _ACTIVE = previous
+        path = manifest.write(status, error)
+        print(f"Wrote: {path}", file=sys.stderr)
+
+
+def recorded(runner: str):
+    """Decorator running a script's ``main`` inside ``run_manifest(runner)``."""
+
+    def decorate(main):
+        @functools.wraps(main)
+        def wrapper(*args, **kwargs):
+            with run_manifest(runner):
+                return main(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def load_manifests(root: Path | None = None, runner: str | None = None):
+    """Every manifest under ``root`` as (runs, stages) DataFrames."""
+    import pandas as pd
+
+    root = Path(root or manifest_root())
+    pattern = f"{runner}/*.json" if runner else "*/*.json"
+    runs, stages = [], []
+    for path in sorted(root.glob(pattern)):
+        manifest = json.loads(path.read_text())
+        run = {
+            key: manifest[key]
+            for key in (
+                "runner",
+                "run_id",
+                "status",
+                "started",
+                "seconds",
+                "peak_rss_mb",
+            )
+        }
+        run["policyengine_us"] = manifest["packages"].get("policyengine-us")
+        caches = manifest["caches"].values()
+        run["cache_hits"] = sum(c["hits"] for c in caches)
+        run["cache_misses"] = sum(c["misses"] for c in caches)
+        runs.append(run)
+        for stage in manifest["stages"]:
+            stages.append(
+                {
+                    "runner": run["runner"],
+                    "run_id": run["run_id"],
+                    "started": run["started"],
+                    **stage,
+                }
+            )
+    runs = pd.DataFrame(runs)
+    stages = pd.DataFrame(stages)
+    for table in (runs, stages):
+        if not table.empty:
+            table["started"] = pd.to_datetime(table["started"])
+    return runs, stages
+
+
+def trend_figures(runs, stages) -> list:
+    """(anchor, heading, figure) per runner: stage times and peak memory by run."""
+    import plotly.graph_objects as go
+
+    sections = []
+    for runner, runner_runs in runs.groupby("runner"):
+        anchor = re.sub(r"[^A-Za-z0-9_-]+", "-", runner)
+        timing = go.Figure()
+        if not stages.empty:
+            for stage, rows in stages[stages["runner"] == runner].groupby("stage"):
+                timing.add_scatter(
+                    x=rows["started"],
+                    y=rows["seconds"],
+                    mode="lines+markers",
+                    name=stage,
+                )
+        timing.update_layout(yaxis_title="Seconds", xaxis_title="Run started")
+        memory = go.Figure(
+            go.Scatter(
+                x=runner_runs["started"],
+                y=runner_runs["peak_rss_mb"],
+                mode="lines+markers",
+                text=runner_runs["policyengine_us"],
+                name="Peak RSS",
+            )
+        )
+        memory.update_layout(yaxis_title="Peak RSS (MB)", xaxis_title="Run started")
+        sections.append((f"{anchor}-time", f"{runner}: stage time", timing))
+        sections.append((f"{anchor}-memory", f"{runner}: peak memory", memory))
+    return sections
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Summarize run manifests.")
+    parser.add_argument("root", nargs="?", default=None, help="Manifest directory.")
+    parser.add_argument("--runner", help="Only this runner's manifests.")
+    parser.add_argument("--report", help="Write trend charts to this HTML file.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    runs, stages = load_manifests(args.root, args.runner)
+    if runs.empty:
+        sys.exit(f"No manifests under {args.root or manifest_root()}")
+    print(runs.to_string(index=False))
+    if not stages.empty:
+        summary = stages.groupby(["runner", "stage"])["seconds"].agg(
+            ["count", "median", "last", "max"]
+        )
+        print("\nStage seconds:")
+        print(summary.round(2).to_string())
+    if args.report:
+        from analysis_tools.report import write_report
+
+        path = write_report(
+            Path(args.report), "Run trends", trend_figures(runs, stages)
+        )
+        print(f"Wrote: {path}")
+
+
+if __name__ == "__main__":
+    main()
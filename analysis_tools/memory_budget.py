@@ -0,0 +1,181 @@
+"""
+Memory budget for long-running simulations.
+
+A ``Microsimulation`` keeps every array it calculates, for every period, for
+as long as it lives. A budget-window loop over one simulation (say
+``range(2025, 2036)`` with a large reform) therefore holds every intermediate
+variable of every year at once, which is what runs the batch nodes out of
+memory.
+
+``limit_memory`` attaches a budget to a simulation. After each top-level
+``calculate``, if the arrays held in memory exceed the budget, cached
+intermediates are dropped least-recently-used first until they fit. Dropped
+values are simply recalculated if asked for again. Never dropped:
+
+- inputs the dataset loaded (and anything pinned with ``pin``),
+- the results of top-level calculations, i.e. the outputs asked for.
+
+    from analysis_tools.memory_budget import limit_memory
+
+    budget = limit_memory(sim, budget_mb=8_000)
+    for year in range(2025, 2036):
+        sim.calculate("income_tax", year)
+    budget.report()  # peak cache and RSS per period
+
+The budget is checked between top-level calls, so a single calculation can
+still overshoot it by the size of its own intermediates. Branches (such as
+the itemization branch) keep caches of their own, which it does not manage.
+"""
+
+from __future__ import annotations
+
+import os
+import types
+from itertools import count
+
+import numpy as np
+import pandas as pd
+
+
+def _rss_mb() -> float:
+    """Resident memory of this process, in MB (Linux; NaN elsewhere)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except OSError:
+        return float("nan")
+    return pages * os.sysconf("SC_PAGE_SIZE") / 1e6
+
+
+def _year(period) -> int | None:
+    from policyengine_core.periods import period as as_period
+
+    if period is None:
+        return None
+    return as_period(period).start.year
+
+
+class MemoryBudget:
+    """LRU eviction of a simulation's cached intermediates; see module docs."""
+
+    def __init__(self, simulation, budget_mb: float):
+        self.simulation = simulation
+        self.budget_bytes = budget_mb * 1e6
+        # Loaded inputs are pinned exactly; later periods of an input variable
+        # are uprated from them and can be recalculated like any formula.
+        self.pinned = {
+            (name, str(period))
+            for name in simulation.input_variables
+            for period in simulation.get_holder(name).get_known_periods()
+        }
+        self._clock = count(1)
+        self._last_used = {}
+        self._depth = 0
+        self._peaks = {}
+
+    def pin(self, variable: str, period=None) -> None:
+        """Never evict ``variable`` (for ``period``, or every period)."""
+        periods = (
+            [period]
+            if period is not None
+            else self.simulation.get_holder(variable).get_known_periods()
+        )
+        self.pinned.update((variable, str(p)) for p in periods)
+        if period is None:
+            self.pinned.add((variable, None))
+
+    def track(self, method, variable_name, period, *args, **kwargs):
+        year = _year(period)
+        self._last_used[(variable_name, year)] = next(self._clock)
+        self._depth += 1
+        try:
+            result = method(variable_name, period, *args, **kwargs)
+        finally:
+            self._depth -= 1
+        if self._depth == 0:
+            holder = self.simulation.get_holder(variable_name)
+            self.pinned.update(
+                (variable_name, str(p))
+                for p in holder.get_known_periods()
+                if _year(p) == year
+            )
+            self._enforce(year)
+        return result
+
+    def _cached(self) -> list[tuple[str, object, int]]:
+        """(variable, period, bytes) for every array held in memory."""
+        arrays = []
+        holders = [
+            item
+            for population in self.simulation.populations.values()
+            for item in population._holders.items()
+        ]
+        for name, holder in holders:
+            for period in holder.get_known_periods():
+                values = holder.get_array(period)
+                # Memory-mapped inputs live in the page cache, not the heap.
+                if values is None or isinstance(values, np.memmap):
+                    continue
+                arrays.append((name, period, values.nbytes))
+        return arrays
+
+    def _enforce(self, year) -> None:
+        cached = self._cached()
+        total = sum(size for *_, size in cached)
+        peak = self._peaks.setdefault(
+            year,
+            {"peak_cache_mb": 0.0, "peak_rss_mb": 0.0, "evicted_mb": 0.0, "evictions": 0},
+        )
+        peak["peak_cache_mb"] = max(peak["peak_cache_mb"], total / 1e6)
+        peak["peak_rss_mb"] = max(peak["peak_rss_mb"], _rss_mb())
+        if total <= self.budget_bytes:
+            return
+        evictable = [
+            (self._last_used.get((name, _year(period)), 0), name, period, size)
+            for name, period, size in cached
+            if (name, str(period)) not in self.pinned
+            and (name, None) not in self.pinned
+        ]
+        for _, name, period, size in sorted(evictable, key=lambda e: e[0]):
+            if total <= self.budget_bytes:
+                break
+            self.simulation.get_holder(name).delete_arrays(period)
+            total -= size
+            peak["evicted_mb"] += size / 1e6
+            peak["evictions"] += 1
+
+    def report(self) -> pd.DataFrame:
+        """Peak cached arrays and process RSS, and evictions, per period."""
+        table = pd.DataFrame.from_dict(self._peaks, orient="index")
+        table.index.name = "period"
+        return table.round(1)
+
+
+def _tracked(name: str):
+    """``Simulation.<name>`` routed through the simulation's memory budget.
+
+    Set on the instance rather than on a subclass or the class itself, so
+    the simulation keeps its type (and any patches of ``Simulation``).
+    policyengine-core's ``clone`` binds instance methods to each clone, so
+    branches (``get_branch``) call their own methods; they carry the budget
+    attribute over too, but are not the simulation it manages.
+    """
+
+    def calculate(self, variable_name, period=None, *args, **kwargs):
+        bound = getattr(type(self), name).__get__(self)
+        budget = getattr(self, "memory_budget", None)
+        if budget is None or budget.simulation is not self:
+            return bound(variable_name, period, *args, **kwargs)
+        return budget.track(bound, variable_name, period, *args, **kwargs)
+
+    calculate.__name__ = name
+    return calculate
+
+
+def limit_memory(simulation, budget_mb: float) -> MemoryBudget:
+    """Attach a memory budget to ``simulation`` (also ``simulation.memory_budget``)."""
+    budget = MemoryBudget(simulation, budget_mb)
+    simulation.memory_budget = budget
+    for name in ("calculate", "calculate_add", "calculate_divide"):
+        setattr(simulation, name, types.MethodType(_tracked(name), simulation))
+    return budget
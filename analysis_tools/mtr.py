@@ -0,0 +1,182 @@
+"""
+Batched marginal tax rates for population MTR distributions.
+
+policyengine-us computes ``marginal_tax_rate`` by re-running the whole income
+chain once per adult earner index (``simulation.marginal_tax_rate_adults``
+branches, each over every household), and a study over several reforms
+repeats all of that per reform.
+
+``MTREngine`` instead builds one stacked input dataset per dataset/period:
+
+- copy 0 is every household, unperturbed,
+- copy k is only the households with a k-th adult earner, with that adult's
+  earnings raised by ``marginal_tax_rate_delta``.
+
+Each reform is then a single Microsimulation over the stack: one pass yields
+the unperturbed and every perturbed net income, and copies beyond the first
+only hold the households that need them. The stack, earner ranks, weights and
+the baseline's results are built once and shared across reforms.
+
+The perturbation splits delta between employment, self-employment and SSTB
+self-employment income exactly as the ``marginal_tax_rate`` formula does,
+starting from baseline earnings, which every copy takes as input (so reforms
+with labor supply responses are not supported).
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from analysis_tools.reforms import build_reform, reform_hash
+
+EARNINGS = ("employment_income", "self_employment_income", "sstb_self_employment_income")
+
+
+def _input_frame(base, loaded: dict) -> pd.DataFrame:
+    """Person-level flat file of everything the dataset loaded.
+
+    ``to_input_dataframe`` skips variables that have a formula, but datasets
+    also set some of those (``state_code``, weights, ids), and dropping them
+    would change the results.
+    """
+    columns = {}
+    for name, periods in loaded.items():
+        holder = base.get_holder(name)
+        for period in periods:
+            values = holder.get_array(period)
+            if hasattr(values, "decode_to_str"):
+                values = values.decode_to_str()
+            columns[f"{name}__{period}"] = base.map_result(
+                values, holder.variable.entity.key, "person"
+            )
+    return pd.DataFrame(columns)
+
+
+class MTREngine:
+    """Marginal tax rates for one dataset and period, shared across reforms.
+
+    Args:
+        dataset: policyengine-us dataset name.
+        period: Year to compute MTRs for.
+        adult_index_limit: If set, summaries cover adults with
+            ``adult_index`` (age rank) up to this limit; otherwise the
+            people ``marginal_tax_rate_computed`` flags.
+    """
+
+    def __init__(
+        self,
+        dataset: str = "enhanced_cps_2024",
+        period: int = 2024,
+        adult_index_limit: int | None = None,
+    ):
+        from policyengine_us import Microsimulation
+
+        self.dataset = dataset
+        self.period = period
+        base = Microsimulation(dataset=dataset)
+        # Captured before any calculation adds computed periods to the holders.
+        loaded = {
+            name: base.get_holder(name).get_known_periods()
+            for name in base.input_variables
+        }
+        params = base.tax_benefit_system.parameters(str(period)).simulation
+        self.adult_count = int(params.marginal_tax_rate_adults)
+        self.delta = float(params.marginal_tax_rate_delta)
+
+        def person(variable):
+            return np.asarray(base.calculate(variable, period, map_to="person").values)
+
+        self.earner_index = person("adult_earnings_index")
+        self.computed = person("marginal_tax_rate_computed").astype(bool)
+        if adult_index_limit is None:
+            self.population = self.computed
+        else:
+            adult_index = person("adult_index")
+            self.population = (adult_index >= 1) & (adult_index <= adult_index_limit)
+        self.person_weight = person("person_weight")
+        self._stack, self._rows = self._build_stack(base, loaded, person)
+        self._results = {}
+
+    def _build_stack(
+        self, base, loaded, person
+    ) -> tuple[pd.DataFrame, list[np.ndarray]]:
+        """Person-level input frame with one perturbed copy per earner index."""
+        inputs = _input_frame(base, loaded)
+        earnings = {variable: person(variable) for variable in EARNINGS}
+        ratio = person("emp_self_emp_ratio")
+        se = np.maximum(earnings["self_employment_income"], 0)
+        sstb = np.maximum(earnings["sstb_self_employment_income"], 0)
+        se_total = se + sstb
+        with np.errstate(divide="ignore", invalid="ignore"):
+            non_sstb_share = np.where(se_total > 0, se / se_total, 1.0)
+        sstb_share = 1 - non_sstb_share
+        for variable in EARNINGS:
+            inputs[f"{variable}__{self.period}"] = earnings[variable]
+
+        # Flat-file datasets derive entity membership from the *_id columns,
+        # so each copy gets its own id range.
+        household = person("household_id")
+        id_columns = [c for c in inputs.columns if c.split("__")[0].endswith("_id")]
+        offset = int(inputs[id_columns].to_numpy().max()) + 1
+
+        copies = [inputs]
+        rows = [np.arange(len(inputs))]
+        for k in range(1, self.adult_count + 1):
+            target = self.computed & (self.earner_index == k)
+            in_copy = np.isin(household, household[target])
+            copy = inputs[in_copy].copy()
+            bump = target[in_copy] * self.delta
+            se_bump = bump * (1 - ratio[in_copy])
+            perturbed = {
+                "employment_income": bump * ratio[in_copy],
+                "self_employment_income": se_bump * non_sstb_share[in_copy],
+                "sstb_self_employment_income": se_bump * sstb_share[in_copy],
+            }
+            for variable, change in perturbed.items():
+                copy[f"{variable}__{self.period}"] += change
+            copy[id_columns] += k * offset
+            copies.append(copy)
+            rows.append(np.flatnonzero(in_copy))
+        return pd.concat(copies, ignore_index=True), rows
+
+    def mtrs(self, reform: dict | None = None) -> np.ndarray:
+        """Per-person MTR under a reform; zero where ``marginal_tax_rate`` is."""
+        key = reform_hash(reform)
+        if key in self._results:
+            return self._results[key]
+        from policyengine_us import Microsimulation
+
+        sim = Microsimulation(dataset=self._stack, reform=build_reform(reform))
+        net_income = np.asarray(
+            sim.calculate("household_net_income", self.period, map_to="person").values
+        )
+        n = len(self.earner_index)
+        base_net = net_income[:n]
+        mtr = np.zeros(n)
+        start = n
+        for k, rows in enumerate(self._rows[1:], start=1):
+            alt_net = net_income[start : start + len(rows)]
+            start += len(rows)
+            target = self.computed[rows] & (self.earner_index[rows] == k)
+            people = rows[target]
+            mtr[people] = 1 - (alt_net[target] - base_net[people]) / self.delta
+        self._results[key] = mtr
+        return mtr
+
+    def share_above(self, thresholds, reform: dict | None = None) -> pd.Series:
+        """Weighted share of the population whose MTR exceeds each threshold."""
+        thresholds = np.atleast_1d(np.asarray(thresholds, dtype=float))
+        mtr = self.mtrs(reform)[self.population]
+        weight = self.person_weight[self.population].astype(float)
+        above = mtr[:, None] > thresholds[None, :]
+        shares = weight @ above / weight.sum()
+        return pd.Series(shares, index=pd.Index(thresholds, name="threshold"))
+
+    def compare(self, reforms: dict[str, dict | None], thresholds) -> pd.DataFrame:
+        """Share above each threshold for every reform; one row per reform."""
+        table = pd.DataFrame(
+            {name: self.share_above(thresholds, reform) for name, reform in reforms.items()}
+        ).T
+        table.index.name = "reform"
+        return table
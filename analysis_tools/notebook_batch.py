@@ -0,0 +1,430 @@
+"""
+Re-execute notebooks in parallel with injected parameters and shared results.
+
+Refreshing a folder of analysis notebooks one kernel at a time recomputes the
+same baseline in every notebook. ``run_batch`` executes notebooks on a process
+pool. Each notebook gets a parameters cell injected after its cell tagged
+``parameters`` (papermill's convention), or at the top if it has none:
+
+    YEAR = 2026
+    DATASET = "hf://policyengine/policyengine-us-data/enhanced_cps_2024.h5"
+    REFORM_FILE = "us/reconciliation/reform.json"
+
+Notebooks that read those names pick the values up; others run unchanged.
+The microsimulation notebooks in ``us/reconciliation`` take ``DATASET``. The
+injected cell also turns on ``enable_shared_cache`` in the kernel. Every
+top-level ``calculate`` is then looked up on disk, keyed by dataset, reform
+hash, loaded inputs, variable, period and policyengine-us version, so a
+baseline that thirty notebooks ask for is computed once. A file lock per key
+makes concurrent notebooks wait for the one computing a value instead of
+computing it too.
+
+    python -m analysis_tools.notebook_batch us/reconciliation/*.ipynb \
+        --dataset hf://policyengine/policyengine-us-data/enhanced_cps_2024.h5 \
+        --workers 4 --output-dir results/notebooks
+
+Executed notebooks are written under ``--output-dir`` with the same relative
+paths, failed ones included (up to the failing cell). ``batch_summary.csv``
+lists status, time and error per notebook. Requires ``nbformat`` and
+``nbclient``.
+
+Only simulations that are not branches are cached, and only over datasets
+whose contents can be identified: a file (by path, size and modification
+time) or the column cache (by directory). DataFrame and other in-memory
+datasets are not cached, and neither is a simulation once an input is set on
+it after it is built.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from importlib.metadata import version
+from pathlib import Path
+from typing import NamedTuple
+
+from analysis_tools.cache import cache_dir
+from analysis_tools.manifest import current_manifest, record_cache, recorded
+from analysis_tools.reforms import load_reform_file, reform_hash
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+INJECTED_TAG = "injected-parameters"
+
+# Set by enable_shared_cache in a notebook kernel.
+_CACHE = None
+_DEPTH = threading.local()
+
+
+def shared_cache_dir() -> Path:
+    model = f"policyengine_us-{version('policyengine-us')}"
+    return cache_dir("notebook_results", model)
+
+
+def _reform_key(reform) -> str | None:
+    """Hash of a reform built from parameter values, or None if it has code."""
+    if reform is None:
+        return "baseline"
+    if isinstance(reform, dict):
+        return reform_hash(json.loads(json.dumps(reform, default=str)))
+    if isinstance(reform, (list, tuple)):
+        keys = [_reform_key(r) for r in reform]
+        return None if None in keys else reform_hash({"stack": keys})
+    values = getattr(reform, "parameter_values", None)
+    return None if values is None else _reform_key(values)
+
+
+def dataset_key(dataset) -> str | None:
+    """Identity of a dataset's contents, or None if it has none to go by."""
+    source = getattr(dataset, "source", None)
+    if source is not None:
+        return str(source)
+    # Every DataFrame dataset is "dataframe", every in-memory one "in_memory".
+    if getattr(dataset, "name", None) in ("dataframe", "in_memory"):
+        return None
+    file_path = getattr(dataset, "file_path", None)
+    if file_path is None or not Path(file_path).is_file():
+        return None
+    path = Path(file_path)
+    stat = path.stat()
+    return f"{path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def simulation_key(simulation) -> str | None:
+    """What a simulation's results depend on, or None if it can't be cached."""
+    if getattr(simulation, "branch_name", "default") != "default":
+        return None
+    dataset_id = dataset_key(getattr(simulation, "dataset", None))
+    reform = _reform_key(getattr(simulation, "reform", None))
+    if dataset_id is None or reform is None:
+        return None
+    inputs = sorted(
+        (name, sorted(str(p) for p in simulation.get_holder(name).get_known_periods()))
+        for name in simulation.input_variables
+    )
+    text = json.dumps([dataset_id, reform, inputs])
+    return hashlib.sha256(text.encode()).hexdigest()[:24]
+
+
+class SharedResultCache:
+    """Pickled ``calculate`` results on disk, one file per key."""
+
+    def __init__(self, directory=None):
+        self.directory = Path(directory) if directory else shared_cache_dir()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    @contextmanager
+    def _locked(self, key: str):
+        import fcntl
+
+        with open(self.directory / f"{key}.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def get_or_compute(self, key: str, compute):
+        path = self.directory / f"{key}.pkl"
+        if not path.exists():
+            # Whoever holds the lock is computing it; wait and read theirs.
+            with self._locked(key):
+                if not path.exists():
+                    value = compute()
+                    staging = path.with_suffix(f".{os.getpid()}.tmp")
+                    staging.write_bytes(pickle.dumps(value, protocol=5))
+                    staging.replace(path)
+                    self.misses += 1
+                    record_cache("notebook_results", False)
+                    return value
+        self.hits += 1
+        record_cache("notebook_results", True)
+        return pickle.loads(path.read_bytes())
+
+
+def _constructing(simulation) -> bool:
+    """Whether ``simulation`` is still being built (an ``__init__`` of it runs).
+
+    Checked on the stack because country packages set inputs of their own
+    in their ``__init__`` after policyengine-core's has returned.
+    """
+    frame = sys._getframe(2)
+    while frame is not None:
+        code = frame.f_code
+        if code.co_name == "__init__" and frame.f_locals.get("self") is simulation:
+            return True
+        frame = frame.f_back
+    return False
+
+
+def _install() -> None:
+    """Route top-level ``Simulation.calculate`` calls through ``_CACHE``, once."""
+    from policyengine_core.simulations import Simulation
+
+    original = Simulation.calculate
+    if getattr(original, "_shared", False):
+        return
+    original_set_input = Simulation.set_input
+
+    def calculate(self, variable_name, period=None, map_to=None, decode_enums=False):
+        depth = getattr(_DEPTH, "value", 0)
+        if _CACHE is None or depth:
+            return original(self, variable_name, period, map_to, decode_enums)
+        if "_shared_cache_key" not in self.__dict__:
+            self._shared_cache_key = simulation_key(self)
+        if self._shared_cache_key is None:
+            return original(self, variable_name, period, map_to, decode_enums)
+        if period is None:
+            period = self.default_calculation_period
+        request = [self._shared_cache_key, variable_name, str(period), map_to]
+        key = hashlib.sha256(
+            json.dumps(request + [decode_enums]).encode()
+        ).hexdigest()[:32]
+
+        def compute():
+            _DEPTH.value = depth + 1
+            try:
+                return original(self, variable_name, period, map_to, decode_enums)
+            finally:
+                _DEPTH.value = depth
+
+        return _CACHE.get_or_compute(key, compute)
+
+    def set_input(self, *args, **kwargs):
+        # Inputs set after the dataset loaded: results are no longer the
+        # dataset's, whether or not anything was calculated yet.
+        if not _constructing(self):
+            self._shared_cache_key = None
+        return original_set_input(self, *args, **kwargs)
+
+    calculate._shared = True
+    calculate.__doc__ = original.__doc__
+    Simulation.calculate = calculate
+    Simulation.set_input = set_input
+
+
+def enable_shared_cache(directory=None) -> SharedResultCache:
+    """Serve top-level calculations in this process from the shared cache."""
+    global _CACHE
+    _install()
+    _CACHE = SharedResultCache(directory)
+    return _CACHE
+
+
+def parameters_source(parameters: dict, cache: Path | None) -> str:
+    lines = ["# Parameters injected by analysis_tools.notebook_batch"]
+    lines += [f"{name} = {value!r}" for name, value in parameters.items()]
+    if cache is not None:
+        lines += [
+            "import sys",
+            f"sys.path.insert(0, {str(REPO_ROOT)!r})",
+            "from analysis_tools.notebook_batch import enable_shared_cache",
+            f"enable_shared_cache({str(cache)!r})",
+        ]
+    return "\n".join(lines)
+
+
+def inject_parameters(notebook, parameters: dict, cache: Path | None = None) -> None:
+    """Insert the parameters cell after the ``parameters`` cell, or first."""
+    import nbformat
+
+    cells = notebook.cells
+    cells[:] = [c for c in cells if INJECTED_TAG not in c.metadata.get("tags", [])]
+    position = next(
+        (
+            i + 1
+            for i, cell in enumerate(cells)
+            if "parameters" in cell.metadata.get("tags", [])
+        ),
+        0,
+    )
+    cell = nbformat.v4.new_code_cell(parameters_source(parameters, cache))
+    cell.metadata["tags"] = [INJECTED_TAG]
+    cells.insert(position, cell)
+
+
+class NotebookResult(NamedTuple):
+    notebook: str
+    output: str
+    status: str  # "ok" or "failed"
+    seconds: float
+    error: str | None = None
+
+
+def run_notebook(
+    path: str,
+    output: str,
+    parameters: dict,
+    cache: str | None,
+    timeout: int | None = None,
+    kernel: str = "python3",
+) -> NotebookResult:
+    """Execute one notebook with ``parameters``; never raises on cell errors."""
+    import nbformat
+    from nbclient import NotebookClient
+    from nbclient.exceptions import CellExecutionError
+
+    notebook = nbformat.read(path, as_version=4)
+    inject_parameters(notebook, parameters, Path(cache) if cache else None)
+    client = NotebookClient(
+        notebook,
+        timeout=timeout,
+        kernel_name=kernel,
+        resources={"metadata": {"path": str(Path(path).parent)}},
+    )
+    status, error = "ok", None
+    start = time.perf_counter()
+    try:
+        client.execute()
+    except CellExecutionError as e:
+        status = "failed"
+        error = f"{e.ename}: {e.evalue}"
+    except Exception as e:  # Kernel died, timeout, ...
+        status = "failed"
+        error = f"{type(e).__name__}: {e}"
+    seconds = time.perf_counter() - start
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    nbformat.write(notebook, output)
+    return NotebookResult(path, output, status, round(seconds, 1), error)
+
+
+def _output_path(notebook: Path, output_dir: Path) -> Path:
+    notebook = notebook.resolve()
+    try:
+        relative = notebook.relative_to(REPO_ROOT)
+    except ValueError:
+        relative = Path(notebook.name)
+    return output_dir / relative
+
+
+def run_batch(
+    notebooks: list,
+    parameters: dict,
+    output_dir,
+    workers: int = 4,
+    cache=None,
+    timeout: int | None = None,
+    kernel: str = "python3",
+) -> list[NotebookResult]:
+    """Execute ``notebooks`` on ``workers`` processes sharing one result cache.
+
+    ``cache=False`` runs without the shared cache.
+    """
+    output_dir = Path(output_dir)
+    if cache is not False:
+        cache = str(cache or shared_cache_dir())
+    else:
+        cache = None
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(
+                run_notebook,
+                str(path),
+                str(_output_path(Path(path), output_dir)),
+                parameters,
+                cache,
+                timeout,
+                kernel,
+            ): path
+            for path in notebooks
+        }
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            print(
+                f"  {result.status:<6} {result.seconds:7.1f}s  {result.notebook}"
+                + (f"  {result.error}" if result.error else "")
+            )
+    return sorted(results, key=lambda r: r.notebook)
+
+
+def _parse_value(text: str):
+    """JSON if it parses (numbers, booleans, lists), else the string."""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return text
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("notebooks", nargs="+", help="Notebook files.")
+    parser.add_argument("--year", type=int, help="Injected as YEAR.")
+    parser.add_argument("--dataset", help="Injected as DATASET.")
+    parser.add_argument("--reform", help="Reform file, injected as REFORM_FILE.")
+    parser.add_argument(
+        "--param",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="Any other parameter (VALUE parsed as JSON when it can be).",
+    )
+    parser.add_argument("--output-dir", default="results/notebooks")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--timeout", type=int, help="Seconds per cell.")
+    parser.add_argument("--kernel", default="python3")
+    parser.add_argument("--cache-dir", help="Shared result cache directory.")
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Don't share results between notebooks.",
+    )
+    return parser.parse_args()
+
+
+@recorded("notebook_batch")
+def main() -> None:
+    args = parse_args()
+    parameters = {}
+    for name, value in (
+        ("YEAR", args.year),
+        ("DATASET", args.dataset),
+        ("REFORM_FILE", str(Path(args.reform).resolve()) if args.reform else None),
+    ):
+        if value is not None:
+            parameters[name] = value
+    for item in args.param:
+        name, _, value = item.partition("=")
+        parameters[name] = _parse_value(value)
+    current_manifest().describe(
+        arguments=vars(args),
+        datasets=[args.dataset] if args.dataset else [],
+        reforms={Path(args.reform).stem: load_reform_file(args.reform)}
+        if args.reform
+        else None,
+    )
+
+    print(f"Running {len(args.notebooks)} notebook(s) on {args.workers} worker(s)")
+    results = run_batch(
+        args.notebooks,
+        parameters,
+        args.output_dir,
+        workers=args.workers,
+        cache=False if args.no_cache else args.cache_dir,
+        timeout=args.timeout,
+        kernel=args.kernel,
+    )
+
+    import pandas as pd
+
+    summary = Path(args.output_dir) / "batch_summary.csv"
+    summary.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame(results, columns=NotebookResult._fields).to_csv(summary, index=False)
+    failed = [r for r in results if r.status != "ok"]
+    print(f"{len(results) - len(failed)} ok, {len(failed)} failed. Wrote: {summary}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Work out which variables a set of outputs depends on.
+
+policyengine-core resolves dependencies lazily inside formulas, so there is
+no static graph to read. ``plan_outputs`` traces the requested outputs on a
+(small) simulation instead and returns every variable they reached, in
+evaluation order (dependencies before the variables that read them), and
+which of the provided input columns were among them.
+
+    plan = plan_outputs(sample_sim, ["income_tax", "eitc"], [2024, 2025], provided)
+    plan.unused   # input columns none of the outputs read
+
+Formulas are vectorised, so a few households normally reach the same
+variables as the full file; only formulas that branch on the data itself
+(rather than on parameters) could read more on other rows.
+"""
+
+from __future__ import annotations
+
+from typing import NamedTuple
+
+
+class OutputPlan(NamedTuple):
+    outputs: tuple[str, ...]
+    periods: tuple[str, ...]
+    # Every variable the outputs reached, dependencies first.
+    variables: tuple[str, ...]
+    # Provided input columns the outputs read, and those they never did.
+    inputs: tuple[str, ...]
+    unused: tuple[str, ...]
+
+
+def _post_order(nodes, seen: dict) -> None:
+    for node in nodes:
+        _post_order(node.children, seen)
+        seen.setdefault(node.name)
+
+
+def plan_outputs(simulation, outputs, periods, provided=()) -> OutputPlan:
+    """Trace ``outputs`` for each period on ``simulation`` and plan from it.
+
+    The simulation is left traced and holding the computed values; use a
+    throwaway one built on a sample of the data.
+    """
+    periods = tuple(str(p) for p in periods)
+    simulation.trace = True
+    for period in periods:
+        for output in outputs:
+            simulation.calculate(output, period)
+    seen = {}
+    _post_order(simulation.tracer.trees, seen)
+    used = set(seen)
+    provided = set(provided)
+    return OutputPlan(
+        outputs=tuple(outputs),
+        periods=periods,
+        variables=tuple(seen),
+        inputs=tuple(sorted(provided & used)),
+        unused=tuple(sorted(provided - used)),
+    )
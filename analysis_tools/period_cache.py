@@ -0,0 +1,199 @@
+"""
+Period-aware result cache for iterating on reform drafts.
+
+Bill drafts set year-specific values (``thresholds.3.JOINT`` for each of
+2026-2035), and a typical edit touches only the out-years. Keying results on
+the whole reform recomputes the entire window after any edit. Here each
+year's results are keyed on the reform *as it applies in that year*: the
+parameter values in effect on every day of the year, merged into segments.
+Editing 2034 values changes only 2034's key, so the other years are reused.
+
+    cache = PeriodResultCache("family_first_act", "enhanced_cps_2024", token="v1")
+    for year in range(2026, 2036):
+        impact = cache.get_or_compute(
+            REFORM, year, "income_tax_impact", lambda: compute(year)
+        )
+
+``changed_periods(old, new, years)`` reports which years and parameters an
+edit affects, e.g. to print before a rerun.
+
+Period keys follow ``Reform.from_dict``: ranges (``2026-01-01.2027-12-31``),
+open-ended instants (``2026-01-01``, applying from then on), ``year:2026:5``
+/ ``month:2026-01:3`` and ``ETERNITY``; later-starting entries win. Years
+are compared only on their own dates, so a formula that reads another year's
+parameters (a lagged threshold, say) is not tracked. Keys include the
+installed ``policyengine-us`` version, the dataset's contents (a rewritten
+file or new upload of an unpinned URL starts afresh) and a caller token:
+``compute`` is not hashed, so change the token when it changes.
+"""
+
+from __future__ import annotations
+
+import calendar
+import hashlib
+import json
+import pickle
+import re
+from datetime import date, timedelta
+from importlib.metadata import version
+from os import PathLike
+from pathlib import Path
+from typing import Any, Callable
+
+from analysis_tools.cache import cache_dir
+from analysis_tools.manifest import record_cache
+
+FOREVER = date.max
+
+
+def _start(text: str) -> date:
+    parts = [int(p) for p in text.split("-")]
+    return date(*(parts + [1] * (3 - len(parts))))
+
+
+def _end(text: str) -> date:
+    parts = [int(p) for p in text.split("-")]
+    if len(parts) == 1:
+        return date(parts[0], 12, 31)
+    if len(parts) == 2:
+        return date(*parts, calendar.monthrange(*parts)[1])
+    return date(*parts)
+
+
+def _add_months(day: date, months: int) -> date:
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def _interval(key: str) -> tuple[date, date]:
+    """First and last day a reform period key covers."""
+    key = str(key)
+    if key.upper() == "ETERNITY":
+        return date.min, FOREVER
+    if ":" in key:
+        unit, start, *size = key.split(":")
+        size = int(size[0]) if size else 1
+        first = _start(start)
+        if unit == "year":
+            return first, date(first.year + size, first.month, first.day) - timedelta(1)
+        if unit == "month":
+            return first, _add_months(first, size) - timedelta(1)
+        raise ValueError(f"Unsupported reform period key: {key}")
+    if "." in key:
+        start, stop = key.split(".")
+        return _start(start), _end(stop)
+    return _start(key), FOREVER
+
+
+def _segments(values: dict, year: int) -> list:
+    """[(first day, value)] for the year, merged; None where unreformed."""
+    entries = sorted(
+        ((*_interval(key), value) for key, value in values.items()),
+        key=lambda entry: entry[0],
+    )
+    first, last = date(year, 1, 1), date(year, 12, 31)
+    cuts = {first}
+    for start, stop, _ in entries:
+        for day in (start, stop + timedelta(1) if stop < FOREVER else None):
+            if day is not None and first <= day <= last:
+                cuts.add(day)
+    segments = []
+    for day in sorted(cuts):
+        value = None
+        # Later-starting entries are applied last and win.
+        for start, stop, entry_value in entries:
+            if start <= day <= stop:
+                value = entry_value
+        if not segments or segments[-1][1] != value:
+            segments.append((day.isoformat(), value))
+    return segments
+
+
+def reform_in_year(reform: dict | None, year: int) -> dict:
+    """{parameter: segments} for the parameters a reform changes in ``year``."""
+    applied = {}
+    for parameter, values in (reform or {}).items():
+        segments = _segments(values, year)
+        if segments != [(f"{year}-01-01", None)]:
+            applied[parameter] = segments
+    return applied
+
+
+def period_hash(reform: dict | None, year: int) -> str:
+    """Hash of a reform as it applies in one year; "baseline" if not at all."""
+    applied = reform_in_year(reform, year)
+    if not applied:
+        return "baseline"
+    canonical = json.dumps(applied, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+def changed_periods(old: dict | None, new: dict | None, years) -> dict[int, list[str]]:
+    """{year: parameters whose values differ in that year} between versions."""
+    changed = {}
+    for year in years:
+        before, after = reform_in_year(old, year), reform_in_year(new, year)
+        parameters = sorted(
+            p for p in set(before) | set(after) if before.get(p) != after.get(p)
+        )
+        if parameters:
+            changed[year] = parameters
+    return changed
+
+
+def dataset_identity(dataset) -> str:
+    """Key for a dataset's contents, from its name, file, URL or Dataset."""
+    if isinstance(dataset, (str, PathLike)):
+        from analysis_tools.column_cache import cache_path
+
+        return cache_path(str(dataset)).name
+    from analysis_tools.notebook_batch import dataset_key
+
+    key = dataset_key(dataset)
+    if key is None:
+        raise ValueError(
+            f"Can't tell the contents of {dataset!r} apart; pass a file or URL."
+        )
+    return key
+
+
+class PeriodResultCache:
+    """On-disk results keyed by dataset, token, key, year and that year's reform.
+
+    Args:
+        name: Directory for this analysis's results.
+        dataset: Dataset name, file, URL or Dataset the results come from.
+        token: Version of the computation. Results under another token are
+            not reused.
+    """
+
+    def __init__(self, name: str, dataset, token: str):
+        identity = json.dumps([dataset_identity(dataset), token])
+        digest = hashlib.sha256(identity.encode()).hexdigest()[:12]
+        stem = Path(str(getattr(dataset, "name", dataset)).split("@")[0]).stem
+        self.directory = cache_dir(
+            "period_results",
+            name,
+            f"policyengine_us-{version('policyengine-us')}",
+            f"{re.sub(r'[^A-Za-z0-9_.-]+', '_', stem)}-{digest}",
+        )
+        self.hits = []
+        self.misses = []
+
+    def _path(self, reform: dict | None, year: int, key: str):
+        return self.directory / key / f"{year}-{period_hash(reform, year)}.pkl"
+
+    def get_or_compute(
+        self, reform: dict | None, year: int, key: str, compute: Callable[[], Any]
+    ) -> Any:
+        """Cached result for this year's reform, else ``compute()`` and store it."""
+        path = self._path(reform, year, key)
+        record_cache("period_cache", path.exists())
+        if path.exists():
+            self.hits.append((key, year))
+            return pickle.loads(path.read_bytes())
+        result = compute()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(pickle.dumps(result))
+        self.misses.append((key, year))
+        return result
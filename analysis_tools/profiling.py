@@ -0,0 +1,241 @@
+"""
+Per-variable profile of the calculations a run makes.
+
+policyengine-core's own tracer (``trace=True``) records a computation tree
+per simulation, but it has to be turned on when each simulation is built and
+it switches off core's fast path for values already calculated, so it
+neither times a normal run nor shows cache hits. ``Profiler`` instead wraps ``Simulation.calculate`` for
+every simulation in the process (reformed, baseline and branches) and, per
+(variable, period, branch), records:
+
+- calls, and how many found the value already calculated (cache hits),
+- total time including the variables its formula asked for, and self time
+  excluding them, which is what points at a slow formula,
+- the size of the array calculated.
+
+    from analysis_tools.profiling import profiling
+
+    with profiling("profiles/repeal_sde"):
+        run_analysis()
+    # profiles/repeal_sde/variables.csv  - sorted by self time
+    # profiles/repeal_sde/trace.json     - Chrome trace
+
+The trace has one event per calculation, nested like the dependency chain.
+Open it in https://ui.perfetto.dev or chrome://tracing, or as a flame graph
+in speedscope. Scripts take ``--profile [DIR]`` (see ``add_profile_argument``).
+Only simulations in this process are profiled, not those in worker processes.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+# pandas is only needed to export; scripts import this at startup.
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_PROFILE_DIR = "profiles"
+
+# The active profiler, read by the patched Simulation.calculate.
+_PROFILER = None
+
+
+class Profiler:
+    """Timings per (variable, period, branch); see module docs."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stats = {}
+        self.events = []
+        self._threads = {}
+        # Time spent in nested calculations, one entry per open calculation.
+        self._children = []
+
+    def track(self, simulation, method, variable_name, period, *args, **kwargs):
+        branch = getattr(simulation, "branch_name", "default")
+        key = (variable_name, _period_label(simulation, period), branch)
+        hit = _is_cached(simulation, variable_name, period)
+        self._children.append(0.0)
+        start = time.perf_counter()
+        try:
+            result = method(simulation, variable_name, period, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self._children.pop()
+            if self._children:
+                self._children[-1] += elapsed
+        size = len(result) if hasattr(result, "__len__") else 1
+        nbytes = getattr(getattr(result, "values", result), "nbytes", 0)
+
+        stats = self.stats.setdefault(
+            key,
+            {
+                "calls": 0,
+                "hits": 0,
+                "total_s": 0.0,
+                "self_s": 0.0,
+                "size": 0,
+                "mb": 0.0,
+            },
+        )
+        stats["calls"] += 1
+        stats["hits"] += hit
+        stats["total_s"] += elapsed
+        stats["self_s"] += elapsed - children
+        stats["size"] = size
+        stats["mb"] = nbytes / 1e6
+        self.events.append(
+            {
+                "name": variable_name,
+                "cat": "hit" if hit else "miss",
+                "ph": "X",
+                "ts": (start - self.start) * 1e6,
+                "dur": elapsed * 1e6,
+                "pid": os.getpid(),
+                "tid": self._thread(branch),
+                "args": {"period": key[1], "size": size},
+            }
+        )
+        return result
+
+    def _thread(self, branch: str) -> int:
+        """Trace thread id for a branch, so each branch gets its own track."""
+        if branch not in self._threads:
+            self._threads[branch] = len(self._threads)
+            self.events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": os.getpid(),
+                    "tid": self._threads[branch],
+                    "args": {"name": branch},
+                }
+            )
+        return self._threads[branch]
+
+    def table(self) -> pd.DataFrame:
+        """One row per (variable, period, branch), slowest self time first."""
+        import pandas as pd
+
+        table = pd.DataFrame.from_dict(self.stats, orient="index")
+        if table.empty:
+            return table
+        table.index.names = ["variable", "period", "branch"]
+        table.insert(2, "misses", table["calls"] - table["hits"])
+        return table.sort_values("self_s", ascending=False).reset_index()
+
+    def chrome_trace(self) -> dict:
+        """Events in Chrome trace-event format (flame graph / timeline)."""
+        return {"traceEvents": self.events, "displayTimeUnit": "ms"}
+
+    def write(self, directory) -> tuple[Path, Path]:
+        """Write ``variables.csv`` and ``trace.json`` into ``directory``."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        table_path = directory / "variables.csv"
+        self.table().to_csv(table_path, index=False)
+        trace_path = directory / "trace.json"
+        trace_path.write_text(json.dumps(self.chrome_trace()))
+        return table_path, trace_path
+
+
+def _period_label(simulation, period) -> str:
+    if period is None:
+        period = getattr(simulation, "default_calculation_period", None)
+    return str(period)
+
+
+def _is_cached(simulation, variable_name, period) -> bool:
+    from policyengine_core.periods import period as as_period
+
+    if period is None:
+        period = getattr(simulation, "default_calculation_period", None)
+        if period is None:
+            return False
+    holder = simulation.get_holder(variable_name)
+    return holder.get_array(as_period(period), simulation.branch_name) is not None
+
+
+def _install() -> None:
+    """Route ``Simulation.calculate`` through the active profiler, once.
+
+    Patched on policyengine-core's base class because every simulation a
+    script makes (including baselines and branches built inside
+    policyengine-us) ends up there, and formulas reach their inputs through
+    it too.
+    """
+    from policyengine_core.simulations import Simulation
+
+    original = Simulation.calculate
+    if getattr(original, "_profiled", False):
+        return
+
+    def calculate(self, variable_name, period=None, *args, **kwargs):
+        if _PROFILER is None:
+            return original(self, variable_name, period, *args, **kwargs)
+        return _PROFILER.track(self, original, variable_name, period, *args, **kwargs)
+
+    calculate._profiled = True
+    calculate.__doc__ = original.__doc__
+    Simulation.calculate = calculate
+
+
+def start_profiling() -> Profiler:
+    """Profile every calculation from now on; return the profiler."""
+    global _PROFILER
+    _install()
+    _PROFILER = Profiler()
+    return _PROFILER
+
+
+def stop_profiling() -> Profiler | None:
+    """Stop profiling; return the profiler that was active."""
+    global _PROFILER
+    profiler, _PROFILER = _PROFILER, None
+    return profiler
+
+
+@contextmanager
+def profiling(directory=None, top: int = 15):
+    """Profile the block and write the results to ``directory``.
+
+    With ``directory=None`` this does nothing, so scripts can pass their
+    ``--profile`` argument straight through. The slowest variables are
+    printed to stderr.
+    """
+    if directory is None:
+        yield None
+        return
+    profiler = start_profiling()
+    try:
+        yield profiler
+    finally:
+        stop_profiling()
+        table_path, trace_path = profiler.write(directory)
+        table = profiler.table()
+        print("\nSlowest variables (self time):", file=sys.stderr)
+        if not table.empty:
+            print(table.head(top).to_string(index=False), file=sys.stderr)
+        print(f"Wrote: {table_path}\nWrote: {trace_path}", file=sys.stderr)
+
+
+def add_profile_argument(parser: argparse.ArgumentParser) -> None:
+    """Add ``--profile [DIR]`` to a script's argument parser."""
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=DEFAULT_PROFILE_DIR,
+        default=None,
+        metavar="DIR",
+        help=(
+            "Profile every variable calculated and write variables.csv and "
+            f"trace.json to DIR (default: {DEFAULT_PROFILE_DIR})."
+        ),
+    )
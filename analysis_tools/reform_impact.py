@@ -0,0 +1,137 @@
+"""
+Reform-impact runner: any reforms x datasets x periods x tables in one run.
+
+Run from the repository root:
+
+    uv run --python 3.11 \
+      --with policyengine-us \
+      python -m analysis_tools.reform_impact \
+        --reform us/state_dependent_exemptions/repeal_state_dependent_exemptions.json \
+        --reform us/irs/income/credits/ctc/ctc_eitc_reform.json \
+        --dataset enhanced_cps_2024 \
+        --period 2025 2026 \
+        --table budget state \
+        --output-dir results/reform_impact \
+        --workers 4
+
+Baselines are shared across reforms and identical reforms are simulated once
+(see analysis_tools.jobs). Each requested table is written to
+``<output-dir>/<table>.csv`` in long format with reform, reform_hash, dataset
+and period columns; ``--warehouse`` also writes them to the results warehouse
+(see analysis_tools.warehouse). Each run writes a manifest with stage timings
+and versions (see analysis_tools.manifest).
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from analysis_tools.jobs import plan_jobs, run_jobs
+from analysis_tools.manifest import current_manifest, recorded
+from analysis_tools.profiling import add_profile_argument, profiling
+from analysis_tools.reforms import load_reform_file, reform_hash
+from analysis_tools.tables import TABLES
+from analysis_tools.warehouse import to_long, write
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--reform",
+        action="append",
+        required=True,
+        help="Reform file (.json/.yaml). Repeat for several reforms.",
+    )
+    parser.add_argument(
+        "--dataset",
+        nargs="+",
+        default=["enhanced_cps_2024"],
+        help="Dataset names, paths or hf:// URLs.",
+    )
+    parser.add_argument(
+        "--period", nargs="+", type=int, required=True, help="Simulation years."
+    )
+    parser.add_argument(
+        "--table",
+        nargs="+",
+        choices=sorted(TABLES),
+        default=["budget"],
+        help="Output tables to compute.",
+    )
+    parser.add_argument("--output-dir", default="results/reform_impact")
+    parser.add_argument(
+        "--workers", type=int, default=1, help="Simulation processes to run at once."
+    )
+    parser.add_argument(
+        "--warehouse",
+        action="store_true",
+        help="Also write the tables to the results warehouse.",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Print the job plan and exit."
+    )
+    add_profile_argument(parser)
+    return parser.parse_args()
+
+
+def reform_names(paths: list[str]) -> dict[str, Path]:
+    """Name reforms by file stem, falling back to the full path on clashes."""
+    stems = [Path(p).stem for p in paths]
+    return {
+        (Path(p).stem if stems.count(Path(p).stem) == 1 else str(p)): Path(p)
+        for p in paths
+    }
+
+
+@recorded("reform_impact")
+def main() -> None:
+    args = parse_args()
+    manifest = current_manifest()
+    manifest.begin("plan")
+    reforms = {
+        name: load_reform_file(path)
+        for name, path in reform_names(args.reform).items()
+    }
+    manifest.describe(arguments=vars(args), datasets=args.dataset, reforms=reforms)
+    reforms_by_hash = {reform_hash(r): r for r in reforms.values()}
+
+    simulations, outputs = plan_jobs(reforms, args.dataset, args.period, args.table)
+    print(
+        f"{len(reforms)} reform(s) x {len(args.dataset)} dataset(s) x "
+        f"{len(args.period)} period(s) x {len(args.table)} table(s) -> "
+        f"{len(simulations)} simulation(s), {len(outputs)} table block(s)"
+    )
+    for job in simulations:
+        print(
+            f"  {job.reform_hash:<16} {job.dataset}  "
+            f"periods={list(job.periods)}  variables={len(job.variables)}"
+        )
+    if args.dry_run:
+        return
+
+    manifest.begin("simulate")
+    workers = args.workers
+    if args.profile and workers > 1:
+        # Only simulations in this process can be profiled.
+        print("--profile: running simulations in this process (--workers 1)")
+        workers = 1
+    with profiling(args.profile):
+        tables = run_jobs(simulations, outputs, reforms_by_hash, workers=workers)
+
+    manifest.begin("write")
+    outdir = Path(args.output_dir)
+    outdir.mkdir(parents=True, exist_ok=True)
+    for name, table in tables.items():
+        path = outdir / f"{name}.csv"
+        table.to_csv(path, index=False)
+        print(f"Wrote: {path}")
+        if args.warehouse:
+            layout = TABLES[name]
+            long = to_long(table, region=layout.region, group=layout.group)
+            paths = write(long, name)
+            print(f"Wrote: {len(paths)} warehouse file(s) for {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Reform files and reform hashes.
+
+A reform file holds the same dict that the notebooks pass to
+``Reform.from_dict``, i.e. parameter path -> {period: value}:
+
+    gov.contrib.repeal_state_dependent_exemptions.in_effect:
+      2024-01-01.2100-12-31: true
+
+JSON files are always supported. YAML needs PyYAML.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+
+
+def load_reform_file(path: str | Path) -> dict:
+    """Read a reform dict from a .json, .yaml or .yml file."""
+    path = Path(path)
+    text = path.read_text()
+    if path.suffix in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError as e:
+            raise ImportError(
+                f"PyYAML is required to read {path}. "
+                "Install it with `pip install pyyaml` or use a JSON reform file."
+            ) from e
+        reform = yaml.safe_load(text)
+    else:
+        reform = json.loads(text)
+    if not isinstance(reform, dict):
+        raise ValueError(f"Reform file {path} must contain a mapping of parameters.")
+    return {
+        parameter: {str(period): value for period, value in values.items()}
+        for parameter, values in reform.items()
+    }
+
+
+def reform_hash(reform: dict | None) -> str:
+    """Stable short hash of a reform dict. The baseline hashes to "baseline"."""
+    if not reform:
+        return "baseline"
+    canonical = json.dumps(reform, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+def build_reform(reform: dict | None):
+    """Build a policyengine-us Reform, or None for the baseline."""
+    if not reform:
+        return None
+    from policyengine_core.reforms import Reform
+
+    return Reform.from_dict(reform, country_id="us")
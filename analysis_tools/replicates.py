@@ -0,0 +1,72 @@
+"""
+Bootstrap uncertainty for weighted aggregates, without re-simulating.
+
+Survey estimates from a microsimulation are weighted sums over households.
+Their sampling uncertainty can be bootstrapped by reweighting alone: draw
+replicate weights once, as a (households x replicates) matrix, and every
+aggregate for every replicate is a single matrix product of household values
+against that matrix.
+
+    replicates = bootstrap_multipliers(n_households, 200)
+    W = weights[:, None] * replicates          # (households, 200)
+    totals = change @ W                        # one total per replicate
+    summarize(change @ weights, totals)        # estimate, se, low, high
+
+Replicates are Poisson(1) household multipliers, the usual large-sample
+stand-in for resampling households with replacement. People inherit their
+household's multiplier (``person_multipliers``), so person- and
+household-level estimates share one set of draws.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+
+def bootstrap_multipliers(
+    households: int, replicates: int = 200, seed: int = 0
+) -> np.ndarray:
+    """(households, replicates) Poisson(1) weight multipliers, as float32."""
+    rng = np.random.default_rng(seed)
+    return rng.poisson(1.0, size=(households, replicates)).astype(np.float32)
+
+
+def person_multipliers(simulation, multipliers: np.ndarray) -> np.ndarray:
+    """Each person's row of their household's multipliers."""
+    return multipliers[simulation.populations["household"].members_entity_id]
+
+
+def summarize(estimate: float, replicates: np.ndarray, level: float = 0.9) -> dict:
+    """Point estimate with bootstrap standard error and percentile interval."""
+    tail = (1 - level) / 2 * 100
+    low, high = np.percentile(replicates, [tail, 100 - tail])
+    return {
+        "estimate": float(estimate),
+        "se": float(np.std(replicates, ddof=1)),
+        "low": float(low),
+        "high": float(high),
+    }
+
+
+def weighted_ratio(
+    numerator: np.ndarray,
+    denominator: np.ndarray,
+    weights: np.ndarray,
+    multipliers: np.ndarray,
+    level: float = 0.9,
+) -> dict:
+    """sum(w * num) / sum(w * den), with its bootstrap uncertainty.
+
+    ``numerator`` and ``denominator`` may be 2-D (rows x groups, e.g. masked
+    by decile); results are then per group.
+    """
+    replicate_weights = weights[:, None] * multipliers
+    num = np.atleast_2d(numerator.T) @ replicate_weights
+    den = np.atleast_2d(denominator.T) @ replicate_weights
+    point_num = np.atleast_2d(numerator.T) @ weights
+    point_den = np.atleast_2d(denominator.T) @ weights
+    with np.errstate(divide="ignore", invalid="ignore"):
+        point = np.where(point_den != 0, point_num / point_den, 0.0)
+        ratios = np.where(den != 0, num / den, 0.0)
+    results = [summarize(p, r, level) for p, r in zip(point, ratios)]
+    return results[0] if numerator.ndim == 1 else results
@@ -0,0 +1,157 @@
+"""
+Chart output: parallel HTML writing, single-file reports and batched PNGs.
+
+Writing one HTML per figure with ``include_plotlyjs="cdn"`` and stitching
+them together with iframes means every page load fetches plotly.js once per
+chart and needs network access. ``write_report`` instead writes one
+self-contained page: the plotly.js bundle is inlined once and every figure is
+embedded as a JSON spec rendered client-side with ``Plotly.newPlot``.
+
+Figure serialization is the slow part of writing charts, so both standalone
+HTML files and report specs are produced on a process pool when
+``workers > 1``. PNG export goes through one long-lived Kaleido renderer for
+the whole batch rather than a renderer per image.
+"""
+
+from __future__ import annotations
+
+import html
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
+
+
+def _to_json(fig: go.Figure) -> str:
+    import plotly.io as pio
+
+    return pio.to_json(fig, validate=False)
+
+
+def _write_html(fig: go.Figure, path: Path) -> Path:
+    fig.write_html(str(path), include_plotlyjs="cdn")
+    return path
+
+
+def _pool_map(fn, *iterables, workers: int = 1) -> list:
+    if workers <= 1:
+        return list(map(fn, *iterables))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fn, *iterables))
+
+
+def write_charts(figures: dict[Path, go.Figure], workers: int = 1) -> list[Path]:
+    """Write each figure to its own standalone HTML file."""
+    return _pool_map(_write_html, figures.values(), figures.keys(), workers=workers)
+
+
+_REPORT_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8" />
+    <meta name="viewport" content="width=device-width, initial-scale=1.0" />
+    <title>{title}</title>
+    <style>
+        body {{ margin: 0; font-family: "Roboto Serif", Georgia, serif; color: #0c1a27;
+                background: linear-gradient(180deg, #f7fafd 0%, #ffffff 100%); }}
+        main {{ max-width: 1200px; margin: 0 auto; padding: 32px 20px 60px; }}
+        h1 {{ margin: 0 0 12px; font-size: 2rem; }}
+        .intro {{ margin: 0 0 28px; padding: 16px 18px; background: white;
+                  border-left: 4px solid #2C6496; box-shadow: 0 8px 24px rgba(12,26,39,0.06); }}
+        .toc {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(220px, 1fr));
+                gap: 10px; margin: 0 0 28px; }}
+        .toc a {{ display: block; padding: 10px 12px; color: #0c1a27; text-decoration: none;
+                  background: #f2f2f2; border: 1px solid #d8e6f3; }}
+        section {{ margin: 0 0 28px; padding: 16px; background: white;
+                   box-shadow: 0 8px 24px rgba(12,26,39,0.06); }}
+        h2 {{ margin: 0 0 12px; font-size: 1.15rem; }}
+    </style>
+    <script type="text/javascript">{plotlyjs}</script>
+</head>
+<body>
+<main>
+    <h1>{title}</h1>
+    {intro}
+    <nav class="toc">
+{toc}
+    </nav>
+{sections}
+</main>
+<script type="text/javascript">
+    document.querySelectorAll("script.figure-spec").forEach(function (node) {{
+        var spec = JSON.parse(node.textContent);
+        Plotly.newPlot(node.dataset.target, spec.data, spec.layout, {{responsive: true}});
+    }});
+</script>
+</body>
+</html>
+"""
+
+
+def write_report(
+    path: Path,
+    title: str,
+    sections: list[tuple[str, str, go.Figure]],
+    intro_html: str = "",
+    workers: int = 1,
+) -> Path:
+    """Write a self-contained HTML report.
+
+    Args:
+        path: Output file.
+        title: Page title and heading.
+        sections: (anchor id, heading, figure) per chart, in page order.
+        intro_html: Optional HTML shown under the title.
+        workers: Processes used to serialize figures.
+    """
+    from plotly.offline import get_plotlyjs
+
+    specs = _pool_map(_to_json, [fig for _, _, fig in sections], workers=workers)
+    toc = []
+    blocks = []
+    for (anchor, heading, _), spec in zip(sections, specs):
+        heading = html.escape(heading)
+        # "</script>" inside a string value would end the spec block early.
+        spec = spec.replace("</", "<\\/")
+        toc.append(f'        <a href="#{anchor}">{heading}</a>')
+        blocks.append(
+            f'    <section id="{anchor}">\n'
+            f"        <h2>{heading}</h2>\n"
+            f'        <div id="{anchor}-plot"></div>\n'
+            f'        <script type="application/json" class="figure-spec" '
+            f'data-target="{anchor}-plot">{spec}</script>\n'
+            f"    </section>"
+        )
+    path = Path(path)
+    path.write_text(
+        _REPORT_TEMPLATE.format(
+            title=html.escape(title),
+            intro=f'<p class="intro">{intro_html}</p>' if intro_html else "",
+            plotlyjs=get_plotlyjs(),
+            toc="\n".join(toc),
+            sections="\n".join(blocks),
+        )
+    )
+    return path
+
+
+def export_pngs(figures: dict[Path, go.Figure], scale: float = 2.0) -> list[Path]:
+    """Export figures to PNG through a single Kaleido renderer.
+
+    plotly>=6.1 batches the whole list through one browser session with
+    ``write_images``. Older plotly/Kaleido 0.2 keeps one persistent Kaleido
+    subprocess alive across ``write_image`` calls, so looping is equivalent.
+    """
+    import plotly.io as pio
+
+    paths = [Path(p) for p in figures]
+    for path in paths:
+        path.parent.mkdir(parents=True, exist_ok=True)
+    if hasattr(pio, "write_images"):
+        pio.write_images(list(figures.values()), [str(p) for p in paths], scale=scale)
+    else:
+        for fig, path in zip(figures.values(), paths):
+            pio.write_image(fig, str(path), scale=scale)
+    return paths
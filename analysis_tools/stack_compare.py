@@ -0,0 +1,450 @@
+"""
+Run the legacy and current stacks side by side and diff every household.
+
+The legacy web-app numbers need the old pinned stack (``policyengine==0.3.9``,
+``policyengine-us==1.425.4``) and the current numbers the current one, so the
+two can't share an interpreter. Run one after the other and compared through
+``impact_payload.json``, they take the sum of both run times and only
+summaries can be compared.
+
+``run`` starts one worker per stack at the same time, each in its own
+isolated ``uv run`` environment (or a given interpreter). Each worker
+simulates the baseline and the reform and writes one row per household to an
+Arrow IPC file: ids, weight, state, and the baseline and reform values of the
+compared variables. The parent memory-maps both files and joins them on
+``household_id``. It then writes the per-household drift:
+
+    <output-dir>/legacy_households.arrow    legacy stack, one row per household
+    <output-dir>/current_households.arrow   current stack, same dataset
+    <output-dir>/household_diff.arrow       both, plus current - legacy changes
+    <output-dir>/stack_diff_summary.json    weighted totals and drift counts
+
+    python -m analysis_tools.stack_compare run \
+        --dataset ~/policyengine-us-data/policyengine_us_data/storage/cps_2023.h5 \
+        --reform us/irs/income/credits/ctc/ctc_eitc_reform.json --year 2025
+
+``--region state/<code>`` limits both stacks to one state's households
+(the legacy one through its macro region, the current one by state code).
+
+The legacy worker also writes the macro ``impact_payload.json`` from the same
+simulations (``--legacy-payload``), so compare_legacy_vs_current.py can run
+on it afterwards without another legacy run. Requires ``pyarrow`` in both
+environments.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from analysis_tools.manifest import current_manifest, recorded
+from analysis_tools.reforms import build_reform, load_reform_file, reform_hash
+from analysis_tools.warehouse import to_long, write
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+STACKS = {
+    "legacy": (
+        "policyengine==0.3.9",
+        "policyengine-us==1.425.4",
+        "policyengine-core==3.20.1",
+        "pyarrow",
+    ),
+    "current": ("policyengine-us", "pyarrow"),
+}
+HOUSEHOLD_COLUMNS = (
+    "household_id",
+    "household_weight",
+    "household_count_people",
+    "state_fips",
+)
+COMPARED = (
+    "household_net_income",
+    "household_market_income",
+    "household_tax",
+    "household_benefits",
+)
+# Households whose changes differ by more than this count as drifted.
+DRIFT_THRESHOLD = 1.0
+
+
+def household_table(baseline, reformed, year: int) -> pd.DataFrame:
+    """One row per household: identifiers, weight, baseline and reform values."""
+    import numpy as np
+    import pandas as pd
+
+    def values(simulation, variable):
+        return np.asarray(simulation.calculate(variable, period=year).values)
+
+    columns = {variable: values(baseline, variable) for variable in HOUSEHOLD_COLUMNS}
+    for variable in COMPARED:
+        columns[f"{variable}_baseline"] = values(baseline, variable)
+        columns[f"{variable}_reform"] = values(reformed, variable)
+    return pd.DataFrame(columns)
+
+
+def write_arrow(table: pd.DataFrame, path: Path, metadata: dict) -> Path:
+    """Write ``table`` as an Arrow IPC file with JSON ``metadata`` in its schema."""
+    import pyarrow as pa
+
+    arrow = pa.Table.from_pandas(table, preserve_index=False)
+    arrow = arrow.replace_schema_metadata({"run": json.dumps(metadata)})
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with pa.OSFile(str(path), "wb") as sink:
+        with pa.ipc.new_file(sink, arrow.schema) as writer:
+            writer.write_table(arrow)
+    return path
+
+
+def read_arrow(path: Path) -> tuple[pd.DataFrame, dict]:
+    """Memory-map an Arrow IPC file; return (table, metadata)."""
+    import pyarrow as pa
+
+    with pa.memory_map(str(path)) as source:
+        arrow = pa.ipc.open_file(source).read_all()
+        # Convert while the map is open: the Arrow buffers point into it.
+        table = arrow.to_pandas()
+    metadata = json.loads((arrow.schema.metadata or {}).get(b"run", b"{}"))
+    return table, metadata
+
+
+def legacy_households(
+    dataset: str, reform: dict, year: int, region: str, payload: Path | None
+) -> pd.DataFrame:
+    """Households from the legacy macro path (policyengine 0.3.x Simulation)."""
+    from policyengine import Simulation
+
+    simulation = Simulation(
+        country="us",
+        scope="macro",
+        reform=build_reform(reform),
+        time_period=year,
+        region=region,
+        data=str(Path(dataset).expanduser()),
+    )
+    if payload is not None:
+        impact = simulation.calculate_economy_comparison().model_dump()
+        payload.parent.mkdir(parents=True, exist_ok=True)
+        payload.write_text(json.dumps(impact, indent=2, sort_keys=True))
+    return household_table(
+        simulation.baseline_simulation, simulation.reform_simulation, year
+    )
+
+
+def region_state(region: str) -> str | None:
+    """State code a legacy region selects: None for "us", "CA" for "state/ca"."""
+    if region == "us":
+        return None
+    match = re.fullmatch(r"state/([A-Za-z]{2})", region)
+    if match is None:
+        raise argparse.ArgumentTypeError(
+            f"unsupported region {region!r}: use 'us' or 'state/<code>'"
+        )
+    return match.group(1).upper()
+
+
+def region_argument(region: str) -> str:
+    region_state(region)
+    return region
+
+
+def current_households(dataset: str, reform: dict, year: int, region: str) -> pd.DataFrame:
+    """Households from the current stack over the same dataset and region.
+
+    The legacy stack simulates only the region's households; households don't
+    interact, so keeping the same ones afterwards gives the same rows.
+    """
+    import numpy as np
+
+    from analysis_tools.column_cache import microsimulation
+
+    baseline = microsimulation(dataset)
+    reformed = microsimulation(dataset, reform=build_reform(reform))
+    table = household_table(baseline, reformed, year)
+    state = region_state(region)
+    if state is not None:
+        codes = np.asarray(baseline.calculate("state_code", period=year).values)
+        table = table[codes.astype(str) == state].reset_index(drop=True)
+    return table
+
+
+def run_worker(args: argparse.Namespace) -> None:
+    from importlib.metadata import version
+
+    reform = load_reform_file(args.reform)
+    start = time.perf_counter()
+    if args.stack == "legacy":
+        payload = Path(args.payload) if args.payload else None
+        table = legacy_households(args.dataset, reform, args.year, args.region, payload)
+    else:
+        table = current_households(args.dataset, reform, args.year, args.region)
+    metadata = {
+        "stack": args.stack,
+        "dataset": args.dataset,
+        "year": args.year,
+        "region": args.region,
+        "reform_hash": reform_hash(reform),
+        "policyengine_us": version("policyengine-us"),
+        "seconds": round(time.perf_counter() - start, 1),
+    }
+    path = write_arrow(table, Path(args.output), metadata)
+    print(f"Wrote: {path} ({len(table):,} households)")
+
+
+def worker_command(stack: str, args: argparse.Namespace, output: Path) -> list[str]:
+    """Command running one stack's worker in its own environment."""
+    python = getattr(args, f"{stack}_python")
+    if python:
+        launcher = [python]
+    else:
+        launcher = ["uv", "run", "--no-project", "--python", "3.11"]
+        for requirement in STACKS[stack]:
+            launcher += ["--with", requirement]
+        launcher.append("python")
+    command = launcher + [
+        "-m",
+        "analysis_tools.stack_compare",
+        "worker",
+        "--stack",
+        stack,
+        "--dataset",
+        str(Path(args.dataset).expanduser()),
+        "--reform",
+        str(Path(args.reform).resolve()),
+        "--year",
+        str(args.year),
+        "--region",
+        args.region,
+        "--output",
+        str(output),
+    ]
+    if stack == "legacy" and args.legacy_payload:
+        command += ["--payload", str(Path(args.legacy_payload).resolve())]
+    return command
+
+
+def run_stacks(args: argparse.Namespace, outdir: Path) -> dict[str, Path]:
+    """Run both workers at once; return each stack's household file."""
+    outputs = {stack: outdir / f"{stack}_households.arrow" for stack in STACKS}
+    processes = {}
+    for stack, output in outputs.items():
+        log = open(outdir / f"{stack}.log", "w")
+        processes[stack] = (
+            subprocess.Popen(
+                worker_command(stack, args, output.resolve()),
+                cwd=REPO_ROOT,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+            ),
+            log,
+        )
+        print(f"Started {stack} stack (log: {outdir / f'{stack}.log'})")
+
+    failed = []
+    for stack, (process, log) in processes.items():
+        code = process.wait()
+        log.close()
+        print(f"  {stack} stack finished (exit {code})")
+        if code != 0:
+            failed.append(stack)
+    if failed:
+        for stack in failed:
+            tail = (outdir / f"{stack}.log").read_text().splitlines()[-20:]
+            print(f"\n--- {stack}.log (last lines) ---\n" + "\n".join(tail))
+        sys.exit(f"Stack run failed: {', '.join(failed)}")
+    return outputs
+
+
+def household_diff(legacy: pd.DataFrame, current: pd.DataFrame) -> pd.DataFrame:
+    """Join the stacks on household and compare their reform changes.
+
+    Columns are suffixed ``_legacy``/``_current``; for each compared
+    variable, ``<variable>_change_<stack>`` is reform minus baseline and
+    ``<variable>_drift`` is the current change minus the legacy one.
+    """
+    diff = legacy.merge(
+        current,
+        on="household_id",
+        how="outer",
+        suffixes=("_legacy", "_current"),
+        indicator=True,
+    )
+    for variable in COMPARED:
+        for stack in ("legacy", "current"):
+            diff[f"{variable}_change_{stack}"] = (
+                diff[f"{variable}_reform_{stack}"]
+                - diff[f"{variable}_baseline_{stack}"]
+            )
+        diff[f"{variable}_drift"] = (
+            diff[f"{variable}_change_current"] - diff[f"{variable}_change_legacy"]
+        )
+    return diff.rename(columns={"_merge": "matched"})
+
+
+def summarize(diff: pd.DataFrame) -> dict:
+    """Weighted change per stack and how many households drifted, per variable."""
+    matched = diff[diff["matched"] == "both"]
+    summary = {
+        "households": {
+            "matched": int(len(matched)),
+            "legacy_only": int((diff["matched"] == "left_only").sum()),
+            "current_only": int((diff["matched"] == "right_only").sum()),
+        },
+        "variables": {},
+    }
+    for variable in COMPARED:
+        drift = matched[f"{variable}_drift"].abs()
+        totals = {
+            f"{stack}_change": float(
+                (
+                    diff[f"{variable}_change_{stack}"]
+                    * diff[f"household_weight_{stack}"]
+                ).sum()
+            )
+            for stack in ("legacy", "current")
+        }
+        summary["variables"][variable] = {
+            **totals,
+            "households_drifted": int((drift > DRIFT_THRESHOLD).sum()),
+            "weighted_households_drifted": float(
+                matched.loc[drift > DRIFT_THRESHOLD, "household_weight_current"].sum()
+            ),
+            "max_abs_drift": float(drift.max()) if len(drift) else 0.0,
+        }
+    return summary
+
+
+def write_warehouse(summary: dict, args: argparse.Namespace) -> list[Path]:
+    """Write each stack's weighted change per variable to the warehouse.
+
+    The schema has no stack column, so the stack is in the metric name:
+    ``<variable>_change_legacy`` and ``<variable>_change_current``.
+    """
+    import pandas as pd
+
+    row = {
+        f"{variable}_{field}": value
+        for variable, values in summary["variables"].items()
+        for field, value in values.items()
+    }
+    frame = pd.DataFrame([row])
+    frame = frame.rename(
+        columns=lambda c: re.sub(r"_(legacy|current)_change$", r"_change_\1", c)
+    )
+    frame["region"] = region_state(args.region) or "us"
+    long = to_long(
+        frame,
+        region="region",
+        reform_hash=reform_hash(load_reform_file(args.reform)),
+        dataset=args.dataset,
+        period=args.year,
+    )
+    return write(long, "stack_compare")
+
+
+@recorded("stack_compare")
+def run(args: argparse.Namespace) -> None:
+    manifest = current_manifest()
+    manifest.describe(
+        arguments=vars(args),
+        datasets=[args.dataset],
+        reforms={Path(args.reform).stem: load_reform_file(args.reform)},
+    )
+    outdir = Path(args.output_dir)
+    outdir.mkdir(parents=True, exist_ok=True)
+
+    manifest.begin("stacks")
+    outputs = run_stacks(args, outdir)
+
+    manifest.begin("diff")
+    legacy, legacy_meta = read_arrow(outputs["legacy"])
+    current, current_meta = read_arrow(outputs["current"])
+    diff = household_diff(legacy, current)
+    summary = {
+        "legacy": legacy_meta,
+        "current": current_meta,
+        **summarize(diff),
+    }
+    diff["matched"] = diff["matched"].astype(str)
+    diff_path = write_arrow(diff, outdir / "household_diff.arrow", summary)
+    summary_path = outdir / "stack_diff_summary.json"
+    summary_path.write_text(json.dumps(summary, indent=2) + "\n")
+
+    print(
+        f"\nHouseholds matched: {summary['households']['matched']:,} "
+        f"(legacy only {summary['households']['legacy_only']:,}, "
+        f"current only {summary['households']['current_only']:,})"
+    )
+    print(f"{'Variable':<26} {'Legacy ($bn)':>13} {'Current ($bn)':>14} {'Drifted':>9}")
+    for variable, row in summary["variables"].items():
+        print(
+            f"{variable:<26} {row['legacy_change'] / 1e9:>13,.2f} "
+            f"{row['current_change'] / 1e9:>14,.2f} {row['households_drifted']:>9,}"
+        )
+    print(f"\nWrote: {diff_path}\nWrote: {summary_path}")
+    if args.warehouse:
+        paths = write_warehouse(summary, args)
+        print(f"Wrote: {len(paths)} warehouse file(s)")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def common(command):
+        command.add_argument("--dataset", required=True, help="Dataset file.")
+        command.add_argument("--reform", required=True, help="Reform file.")
+        command.add_argument("--year", type=int, default=2025)
+        command.add_argument(
+            "--region",
+            type=region_argument,
+            default="us",
+            help="Region both stacks simulate: 'us' or 'state/<code>'.",
+        )
+
+    run_parser = commands.add_parser("run", help="Run both stacks and diff them.")
+    common(run_parser)
+    run_parser.add_argument("--output-dir", default="results/stack_compare")
+    run_parser.add_argument(
+        "--warehouse",
+        action="store_true",
+        help="Also write each stack's weighted changes to the results warehouse.",
+    )
+    run_parser.add_argument(
+        "--legacy-payload",
+        help="Also write the legacy macro impact payload here.",
+    )
+    for stack in STACKS:
+        run_parser.add_argument(
+            f"--{stack}-python",
+            help=f"Interpreter with the {stack} stack installed, instead of uv.",
+        )
+
+    worker_parser = commands.add_parser("worker", help="Run one stack (internal).")
+    common(worker_parser)
+    worker_parser.add_argument("--stack", choices=sorted(STACKS), required=True)
+    worker_parser.add_argument("--output", required=True)
+    worker_parser.add_argument("--payload")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.command == "worker":
+        run_worker(args)
+    else:
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
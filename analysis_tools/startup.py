@@ -0,0 +1,92 @@
+"""
+Measure import time of analysis scripts against a startup budget.
+
+Each target is imported in a fresh interpreter (so nothing is already in
+``sys.modules``) without running its ``main()``. Targets are module names or
+script paths:
+
+    python -m analysis_tools.startup \
+        analysis_tools.reform_impact \
+        us/irs/income/credits/ctc/render_legacy_webapp_charts.py \
+        --budget 1.5
+
+Exits non-zero if any target goes over budget, listing the slowest imports
+from ``python -X importtime`` so the offending top-level import is obvious.
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+DEFAULT_BUDGET_SECONDS = 2.0
+
+_IMPORT_SNIPPET = """
+import importlib, importlib.util, os, sys, time
+target = sys.argv[1]
+start = time.perf_counter()
+if target.endswith(".py"):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(target)))
+    spec = importlib.util.spec_from_file_location("_startup_target", target)
+    spec.loader.exec_module(importlib.util.module_from_spec(spec))
+else:
+    importlib.import_module(target)
+print(time.perf_counter() - start)
+"""
+
+
+def measure_import(target: str) -> tuple[float, list[tuple[float, str]]]:
+    """Return (seconds, [(cumulative seconds, module), ...] slowest first)."""
+    repo_root = Path(__file__).resolve().parents[1]
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _IMPORT_SNIPPET, target],
+        capture_output=True,
+        text=True,
+        cwd=repo_root,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {target} failed:\n{proc.stderr[-2000:]}")
+    seconds = float(proc.stdout.strip().splitlines()[-1])
+
+    # -X importtime lines: "import time: self [us] | cumulative | imported package"
+    slowest = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):  # top-level imports only
+            slowest.append((int(cumulative) / 1e6, name.strip()))
+    slowest.sort(reverse=True)
+    return seconds, slowest
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check script import times.")
+    parser.add_argument("targets", nargs="+", help="Module names or script paths.")
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=DEFAULT_BUDGET_SECONDS,
+        help=f"Seconds allowed per target (default: {DEFAULT_BUDGET_SECONDS}).",
+    )
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    over_budget = []
+    for target in args.targets:
+        seconds, slowest = measure_import(target)
+        status = "ok" if seconds <= args.budget else "OVER BUDGET"
+        print(f"{target}: {seconds:.2f}s ({status}, budget {args.budget:.2f}s)")
+        for cumulative, name in slowest[: args.top]:
+            print(f"    {cumulative:6.2f}s  {name}")
+        if seconds > args.budget:
+            over_budget.append(target)
+
+    if over_budget:
+        sys.exit(f"Over startup budget: {', '.join(over_budget)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Output tables for reform-impact runs.
+
+Each table declares the variables it needs from the baseline and reformed
+simulations and computes its rows from plain numpy arrays, so the arrays can
+be produced in one worker process and tabulated in another. The formulas
+follow compare_legacy_vs_current.py and the PolicyEngine API.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from analysis_tools.aggregation import aggregate_by_region
+from analysis_tools.counties import aggregate_by_county
+
+
+# Variables defined below household level that tables aggregate per household.
+MAP_TO = {
+    "household_state_income_tax": "household",
+}
+
+
+class Table(NamedTuple):
+    # Variables calculated under both baseline and reform.
+    compared: tuple[str, ...]
+    # Variables only read from the baseline (weights, groupings).
+    baseline_only: tuple[str, ...]
+    compute: Callable[[dict, dict], pd.DataFrame]
+    # Columns holding the region and breakdown group, for the warehouse.
+    region: str | None = None
+    group: str | None = None
+
+
+def _weighted_sum(values: np.ndarray, weights: np.ndarray) -> float:
+    return float(np.dot(values, weights))
+
+
+def budget_table(baseline: dict, reformed: dict) -> pd.DataFrame:
+    w = baseline["household_weight"]
+    tax = _weighted_sum(reformed["household_tax"] - baseline["household_tax"], w)
+    state_tax = _weighted_sum(
+        reformed["household_state_income_tax"]
+        - baseline["household_state_income_tax"],
+        w,
+    )
+    benefits = _weighted_sum(
+        reformed["household_benefits"] - baseline["household_benefits"], w
+    )
+    return pd.DataFrame([{
+        "tax_revenue_impact": tax,
+        "state_tax_revenue_impact": state_tax,
+        "benefit_spending_impact": benefits,
+        "budgetary_impact": tax - benefits,
+        "households": float(w.sum()),
+    }])
+
+
+def decile_table(baseline: dict, reformed: dict) -> pd.DataFrame:
+    w = baseline["household_weight"]
+    decile = baseline["household_income_decile"].astype(int)
+    valid = (decile >= 1) & (decile <= 10)
+    b_income = baseline["household_net_income"]
+    change = reformed["household_net_income"] - b_income
+
+    def by_decile(values: np.ndarray) -> np.ndarray:
+        return np.bincount(
+            decile[valid], weights=(values * w)[valid], minlength=11
+        )[1:]
+
+    total_weight = by_decile(np.ones_like(w))
+    total_change = by_decile(change)
+    total_baseline = by_decile(b_income)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        average = np.where(total_weight > 0, total_change / total_weight, 0.0)
+        relative = np.where(total_baseline != 0, total_change / total_baseline, 0.0)
+    return pd.DataFrame({
+        "decile": np.arange(1, 11),
+        "average": average,
+        "relative": relative,
+    })
+
+
+def poverty_table(baseline: dict, reformed: dict) -> pd.DataFrame:
+    w = baseline["person_weight"]
+    age = baseline["age"]
+    b_poverty = baseline["person_in_poverty"].astype(float)
+    r_poverty = reformed["person_in_poverty"].astype(float)
+    groups = {
+        "child": age < 18,
+        "adult": (age >= 18) & (age < 65),
+        "senior": age >= 65,
+        "all": np.ones_like(age, dtype=bool),
+    }
+    rows = []
+    for group, mask in groups.items():
+        total = w[mask].sum()
+        b_rate = _weighted_sum(b_poverty[mask], w[mask]) / total
+        r_rate = _weighted_sum(r_poverty[mask], w[mask]) / total
+        rows.append({
+            "group": group,
+            "baseline_rate": b_rate,
+            "reform_rate": r_rate,
+            "relative_change": r_rate / b_rate - 1 if b_rate else 0.0,
+        })
+    return pd.DataFrame(rows)
+
+
+def state_table(baseline: dict, reformed: dict) -> pd.DataFrame:
+    income_change = (
+        reformed["household_net_income"] - baseline["household_net_income"]
+    )
+    by_state = aggregate_by_region(
+        baseline["state_code"],
+        baseline["household_weight"],
+        {
+            "net_income_change": income_change,
+            "state_tax_change": reformed["household_state_income_tax"]
+            - baseline["household_state_income_tax"],
+        },
+        affected=np.abs(income_change) > 0.01,
+    )
+    return by_state.reset_index().rename(columns={"region": "state_code"})
+
+
+def county_table(baseline: dict, reformed: dict) -> pd.DataFrame:
+    income_change = (
+        reformed["household_net_income"] - baseline["household_net_income"]
+    )
+    by_county = aggregate_by_county(
+        baseline["county"],
+        baseline["household_weight"],
+        {"net_income_change": income_change},
+        affected=np.abs(income_change) > 0.01,
+    )
+    return by_county.reset_index()
+
+
+TABLES = {
+    "budget": Table(
+        compared=("household_tax", "household_state_income_tax", "household_benefits"),
+        baseline_only=("household_weight",),
+        compute=budget_table,
+    ),
+    "decile": Table(
+        compared=("household_net_income",),
+        baseline_only=("household_weight", "household_income_decile"),
+        compute=decile_table,
+        group="decile",
+    ),
+    "poverty": Table(
+        compared=("person_in_poverty",),
+        baseline_only=("person_weight", "age"),
+        compute=poverty_table,
+        group="group",
+    ),
+    "state": Table(
+        compared=("household_net_income", "household_state_income_tax"),
+        baseline_only=("household_weight", "state_code"),
+        compute=state_table,
+        region="state_code",
+    ),
+    "county": Table(
+        compared=("household_net_income",),
+        baseline_only=("household_weight", "county"),
+        compute=county_table,
+        region="county_fips",
+    ),
+}
@@ -0,0 +1,93 @@
+"""
+Serialized variable-metadata index for policyengine-us.
+
+Looking up a variable's entity or value type normally means building the full
+tax-benefit system, which takes tens of seconds. The index stores that
+metadata as JSON keyed on the installed policyengine-us version, so after the
+first build a lookup only costs reading one small file. The installed version
+is read from package metadata, which does not import policyengine-us.
+
+Rebuild manually with:
+
+    python -m analysis_tools.variable_index
+"""
+
+from __future__ import annotations
+
+import json
+from functools import lru_cache
+from importlib.metadata import version
+
+from analysis_tools.cache import cache_dir
+
+# Bump when the stored fields change so stale index files are not reused.
+INDEX_FORMAT = 2
+
+
+def index_path():
+    name = f"policyengine_us-{version('policyengine-us')}-v{INDEX_FORMAT}.json"
+    return cache_dir("variable_index") / name
+
+
+def _default_value(variable):
+    value = variable.default_value
+    if hasattr(value, "name"):  # Enum member
+        return value.name
+    if isinstance(value, (bool, int, float, str)) or value is None:
+        return value
+    return str(value)
+
+
+def build_index(system=None) -> dict:
+    """Extract per-variable metadata from a tax-benefit system and save it."""
+    if system is None:
+        from policyengine_us import CountryTaxBenefitSystem
+
+        system = CountryTaxBenefitSystem()
+    variables = {
+        name: {
+            "entity": variable.entity.key,
+            "value_type": variable.value_type.__name__,
+            "definition_period": str(variable.definition_period),
+            "unit": variable.unit,
+            "default_value": _default_value(variable),
+        }
+        for name, variable in system.variables.items()
+    }
+    path = index_path()
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(variables, sort_keys=True))
+    tmp.replace(path)
+    return variables
+
+
+@lru_cache(maxsize=None)
+def load_index() -> dict:
+    """Return {variable: metadata}, building the index on first use."""
+    path = index_path()
+    if path.exists():
+        return json.loads(path.read_text())
+    return build_index()
+
+
+def get_variable_entity(name: str, default: str = "person") -> str:
+    """Entity key of a variable, or ``default`` if it is not a model variable."""
+    meta = load_index().get(name)
+    return meta["entity"] if meta else default
+
+
+def get_value_type(name: str) -> type:
+    """Python dtype to store a variable's input values with (bool/int/float)."""
+    meta = load_index().get(name)
+    value_type = meta["value_type"] if meta else "float"
+    return {"bool": bool, "int": int}.get(value_type, float)
+
+
+def get_default_value(name: str):
+    """Value a variable takes when neither set nor computed (enums by name)."""
+    meta = load_index().get(name)
+    return meta["default_value"] if meta else 0
+
+
+if __name__ == "__main__":
+    print(f"Indexed {len(build_index())} variables -> {index_path()}")
@@ -0,0 +1,153 @@
+"""
+Local results warehouse: partitioned Parquet queried with DuckDB.
+
+Runners write their outputs here in one long schema instead of ad-hoc CSVs
+(``reform_impact``, ``stack_compare run``, compare_legacy_vs_current.py and
+repeal_state_dependent_exemptions.py, each with ``--warehouse``):
+
+    reform_hash | dataset | period | region | metric | group | value
+
+``region`` is ``"us"`` for national figures, ``group`` is ``"all"`` unless
+the table breaks results down (deciles, age groups, filing statuses). Files
+are laid out as
+
+    <root>/period=<period>/reform_hash=<hash>/<table>__<dataset>-<hash>.parquet
+
+so writing a table again for the same reform, dataset and period replaces
+it, and queries that filter on period or reform only open those files. The
+root is ``results/warehouse`` under the repository (``ANALYSIS_WAREHOUSE``
+overrides it).
+
+    from analysis_tools.warehouse import query
+
+    query('''
+        SELECT reform_hash, period, value FROM results
+        WHERE metric = 'budgetary_impact' ORDER BY period
+    ''')
+
+or from the shell:
+
+    python -m analysis_tools.warehouse "SELECT metric, count(*) FROM results GROUP BY 1"
+
+Requires ``pyarrow`` (writing) and ``duckdb`` (querying).
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import re
+from pathlib import Path
+
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SCHEMA = ("reform_hash", "dataset", "period", "region", "metric", "group", "value")
+
+
+def warehouse_root() -> Path:
+    return Path(os.environ.get("ANALYSIS_WAREHOUSE", REPO_ROOT / "results" / "warehouse"))
+
+
+def to_long(
+    frame: pd.DataFrame,
+    region: str | None = None,
+    group: str | None = None,
+    **keys,
+) -> pd.DataFrame:
+    """Melt a wide results table into the warehouse schema.
+
+    Every numeric column other than the keys becomes a metric.
+
+    Args:
+        region: Column holding the region (e.g. ``state_code``); else "us".
+        group: Column holding the breakdown (e.g. ``decile``); else "all".
+        **keys: Values for ``reform_hash``, ``dataset`` or ``period`` when
+            the frame has no such column.
+    """
+    frame = frame.copy()
+    for key, value in keys.items():
+        frame[key] = value
+    frame["region"] = frame.pop(region).astype(str) if region else "us"
+    frame["group"] = frame.pop(group).astype(str) if group else "all"
+    id_columns = ["reform_hash", "dataset", "period", "region", "group"]
+    metrics = [
+        c
+        for c in frame.columns
+        if c not in id_columns and pd.api.types.is_numeric_dtype(frame[c])
+    ]
+    long = frame.melt(
+        id_vars=id_columns, value_vars=metrics, var_name="metric", value_name="value"
+    )
+    long["period"] = long["period"].astype(int)
+    long["value"] = long["value"].astype(float)
+    return long[list(SCHEMA)]
+
+
+def _safe(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", str(name))
+
+
+def write(frame: pd.DataFrame, table: str, root: Path | None = None) -> list[Path]:
+    """Write schema rows under ``table``, replacing earlier writes of it."""
+    missing = set(SCHEMA) - set(frame.columns)
+    if missing:
+        raise ValueError(f"Missing warehouse columns: {sorted(missing)}")
+    root = Path(root or warehouse_root())
+    paths = []
+    for (period, reform_hash, dataset), rows in frame.groupby(
+        ["period", "reform_hash", "dataset"], sort=False, observed=True
+    ):
+        directory = root / f"period={int(period)}" / f"reform_hash={reform_hash}"
+        directory.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256(str(dataset).encode()).hexdigest()[:8]
+        name = f"{_safe(table)}__{_safe(Path(dataset).stem)}-{digest}.parquet"
+        path = directory / name
+        # Partition values come from the path.
+        rows.drop(columns=["period", "reform_hash"]).to_parquet(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def connect(root: Path | None = None):
+    """DuckDB connection with the warehouse as the ``results`` view."""
+    import duckdb
+
+    root = Path(root or warehouse_root())
+    connection = duckdb.connect()
+    files = str(root / "**" / "*.parquet")
+    connection.execute(
+        f"""
+        CREATE VIEW results AS
+        SELECT reform_hash, dataset, period, region, metric, "group", value
+        FROM read_parquet(
+            '{files}',
+            hive_partitioning = true,
+            hive_types = {{'period': INTEGER, 'reform_hash': VARCHAR}}
+        )
+        """
+    )
+    return connection
+
+
+def query(sql: str, params: list | None = None, root: Path | None = None) -> pd.DataFrame:
+    """Run SQL against the ``results`` view."""
+    with connect(root) as connection:
+        return connection.execute(sql, params or []).df()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Query the results warehouse.")
+    parser.add_argument("sql", help="SQL over the 'results' view.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    with pd.option_context("display.max_rows", 200, "display.width", 200):
+        print(query(args.sql))
+
+
+if __name__ == "__main__":
+    main()
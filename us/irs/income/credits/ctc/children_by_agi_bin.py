@@ -13,12 +13,24 @@ Outputs a table and a grouped bar chart comparing the two datasets.
 from __future__ import annotations
 
 import argparse
+import sys
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import numpy as np
 import pandas as pd
-import plotly.graph_objects as go
-from policyengine_us import Microsimulation
+
+REPO_ROOT = Path(__file__).resolve().parents[5]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from analysis_tools.manifest import current_manifest, recorded
+from analysis_tools.profiling import add_profile_argument, profiling
+
+# policyengine_us and plotly are imported where they are used: each costs
+# seconds at startup and neither is needed for --help.
+if TYPE_CHECKING:
+    from policyengine_us import Microsimulation
 
 
 # Default dataset paths
@@ -97,6 +109,7 @@ def get_children_by_agi(sim: Microsimulation, year: int) -> pd.DataFrame:
     return result
 
 
+@recorded("children_by_agi_bin")
 def main() -> None:
     parser = argparse.ArgumentParser(
         description="Compare number of children by AGI bin across datasets"
@@ -122,20 +135,30 @@ def main() -> None:
         default="us/irs/income/credits/ctc/legacy_webapp_charts",
         help="Directory to write output chart",
     )
+    add_profile_argument(parser)
     args = parser.parse_args()
+    manifest = current_manifest()
+    manifest.describe(
+        arguments=vars(args), datasets=[args.cps_2023, args.enhanced_cps_2024]
+    )
 
     outdir = Path(args.output_dir)
     outdir.mkdir(parents=True, exist_ok=True)
 
+    from policyengine_us import Microsimulation
+
+    manifest.begin("load")
     print(f"Loading CPS 2023 from: {args.cps_2023}")
     sim_cps = Microsimulation(dataset=args.cps_2023)
 
     print(f"Loading Enhanced CPS 2024: {args.enhanced_cps_2024}")
     sim_ecps = Microsimulation(dataset=args.enhanced_cps_2024)
 
+    manifest.begin("compute")
     print(f"\nComputing children by AGI bin for year {args.year}...")
-    df_cps = get_children_by_agi(sim_cps, args.year)
-    df_ecps = get_children_by_agi(sim_ecps, args.year)
+    with profiling(args.profile):
+        df_cps = get_children_by_agi(sim_cps, args.year)
+        df_ecps = get_children_by_agi(sim_ecps, args.year)
 
     # Merge for comparison
     comparison = df_cps.merge(df_ecps, on="agi_bin", suffixes=("_cps23", "_ecps24"))
@@ -178,6 +201,9 @@ def main() -> None:
     print(f"\nCSV saved to: {csv_path}")
 
     # Grouped bar chart
+    manifest.begin("render")
+    import plotly.graph_objects as go
+
     fig = go.Figure()
     fig.add_trace(go.Bar(
         x=comparison["agi_bin"],
@@ -14,18 +14,43 @@ Run:
 Prerequisites:
     The legacy payload must already exist at:
     us/irs/income/credits/ctc/legacy_webapp_charts/impact_payload.json
-    (generated by render_legacy_webapp_charts.py using the old pinned stack)
+    (generated by render_legacy_webapp_charts.py using the old pinned stack,
+    or by `python -m analysis_tools.stack_compare run --legacy-payload ...`,
+    which also diffs both stacks household by household)
 """
 
 from __future__ import annotations
 
 import argparse
 import json
+import sys
 from pathlib import Path
+from typing import TYPE_CHECKING
+
+REPO_ROOT = Path(__file__).resolve().parents[5]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from analysis_tools.inequality import compute_inequality
+from analysis_tools.manifest import current_manifest, recorded
+from analysis_tools.profiling import add_profile_argument, profiling
+from analysis_tools.replicates import (
+    bootstrap_multipliers,
+    person_multipliers,
+    summarize,
+    weighted_ratio,
+)
+from analysis_tools.reforms import reform_hash
+from analysis_tools.report import write_charts, write_report
+from analysis_tools.warehouse import to_long, write
 
-import plotly.graph_objects as go
-from policyengine_us import Microsimulation
-from policyengine_core.reforms import Reform
+# policyengine and plotly are imported where they are used so that re-rendering
+# charts or --help does not pay for loading the tax-benefit system.
+if TYPE_CHECKING:
+    import numpy as np
+    import plotly.graph_objects as go
+    from policyengine_core.reforms import Reform
+    from policyengine_us import Microsimulation
 
 
 CPS_2023 = Path(
@@ -45,61 +70,28 @@ PLOT_FONT = "Roboto Serif"
 
 YEAR = 2025
 
-REFORM_DICT = {
-    "gov.irs.credits.eitc.max[0].amount": {"2025-01-01.2100-12-31": 2000},
-    "gov.irs.credits.eitc.max[1].amount": {"2025-01-01.2100-12-31": 2000},
-    "gov.irs.credits.eitc.max[2].amount": {"2025-01-01.2100-12-31": 2000},
-    "gov.irs.credits.eitc.max[3].amount": {"2025-01-01.2100-12-31": 2000},
-    "gov.irs.credits.ctc.phase_out.amount": {"2025-01-01.2100-12-31": 25},
-    "gov.irs.credits.ctc.amount.arpa[0].amount": {"2025-01-01.2100-12-31": 4800},
-    "gov.irs.credits.ctc.amount.arpa[1].amount": {"2025-01-01.2100-12-31": 4800},
-    "gov.irs.credits.ctc.phase_out.arpa.amount": {"2025-01-01.2100-12-31": 25},
-    "gov.contrib.ctc.minimum_refundable.in_effect": {"2025-01-01.2100-12-31": True},
-    "gov.contrib.ctc.per_child_phase_in.in_effect": {"2025-01-01.2100-12-31": True},
-    "gov.irs.credits.ctc.phase_out.arpa.in_effect": {"2025-01-01.2100-12-31": True},
-    "gov.irs.credits.ctc.refundable.phase_in.rate": {"2025-01-01.2100-12-31": 0.2},
-    "gov.irs.credits.eitc.phase_in_rate[0].amount": {"2025-01-01.2100-12-31": 0.2},
-    "gov.irs.credits.eitc.phase_in_rate[1].amount": {"2025-01-01.2100-12-31": 0.2},
-    "gov.irs.credits.eitc.phase_in_rate[2].amount": {"2025-01-01.2100-12-31": 0.2},
-    "gov.irs.credits.eitc.phase_in_rate[3].amount": {"2025-01-01.2100-12-31": 0.2},
-    "gov.contrib.ctc.per_child_phase_out.in_effect": {"2025-01-01.2100-12-31": True},
-    "gov.irs.credits.ctc.phase_out.threshold.JOINT": {"2025-01-01.2100-12-31": 200000},
-    "gov.irs.credits.ctc.refundable.individual_max": {"2025-01-01.2100-12-31": 4800},
-    "gov.irs.credits.eitc.phase_out.rate[0].amount": {"2025-01-01.2100-12-31": 0.1},
-    "gov.irs.credits.eitc.phase_out.rate[1].amount": {"2025-01-01.2100-12-31": 0.1},
-    "gov.irs.credits.eitc.phase_out.rate[2].amount": {"2025-01-01.2100-12-31": 0.1},
-    "gov.irs.credits.eitc.phase_out.rate[3].amount": {"2025-01-01.2100-12-31": 0.1},
-    "gov.irs.credits.ctc.phase_out.threshold.SINGLE": {"2025-01-01.2100-12-31": 100000},
-    "gov.irs.credits.eitc.phase_out.start[0].amount": {"2025-01-01.2100-12-31": 20000},
-    "gov.irs.credits.eitc.phase_out.start[1].amount": {"2025-01-01.2100-12-31": 20000},
-    "gov.irs.credits.eitc.phase_out.start[2].amount": {"2025-01-01.2100-12-31": 20000},
-    "gov.irs.credits.eitc.phase_out.start[3].amount": {"2025-01-01.2100-12-31": 20000},
-    "gov.irs.credits.ctc.phase_out.threshold.SEPARATE": {"2025-01-01.2100-12-31": 100000},
-    "gov.contrib.ctc.per_child_phase_out.avoid_overlap": {"2025-01-01.2100-12-31": True},
-    "gov.irs.credits.ctc.refundable.phase_in.threshold": {"2025-01-01.2100-12-31": 0},
-    "gov.irs.credits.ctc.phase_out.arpa.threshold.JOINT": {"2025-01-01.2100-12-31": 35000},
-    "gov.contrib.ctc.minimum_refundable.amount[0].amount": {"2025-01-01.2100-12-31": 2400},
-    "gov.contrib.ctc.minimum_refundable.amount[1].amount": {"2025-01-01.2100-12-31": 2400},
-    "gov.irs.credits.ctc.phase_out.arpa.threshold.SINGLE": {"2025-01-01.2100-12-31": 25000},
-    "gov.irs.credits.eitc.phase_out.joint_bonus[0].amount": {"2025-01-01.2100-12-31": 7000},
-    "gov.irs.credits.eitc.phase_out.joint_bonus[1].amount": {"2025-01-01.2100-12-31": 7000},
-    "gov.irs.credits.ctc.phase_out.arpa.threshold.SEPARATE": {"2025-01-01.2100-12-31": 25000},
-    "gov.irs.credits.ctc.phase_out.threshold.SURVIVING_SPOUSE": {"2025-01-01.2100-12-31": 100000},
-    "gov.irs.credits.ctc.phase_out.threshold.HEAD_OF_HOUSEHOLD": {"2025-01-01.2100-12-31": 100000},
-    "gov.irs.credits.ctc.phase_out.arpa.threshold.SURVIVING_SPOUSE": {"2025-01-01.2100-12-31": 25000},
-    "gov.irs.credits.ctc.phase_out.arpa.threshold.HEAD_OF_HOUSEHOLD": {"2025-01-01.2100-12-31": 25000},
-}
+REFORM_FILE = Path(__file__).with_name("ctc_eitc_reform.json")
+REFORM_DICT = json.loads(REFORM_FILE.read_text())
 
 
 def build_reform() -> Reform:
+    from policyengine_core.reforms import Reform
+
     return Reform.from_dict(REFORM_DICT, country_id="us")
 
 
-def compute_budget(baseline: Microsimulation, reformed: Microsimulation, year: int) -> dict:
+def compute_budget(
+    baseline: Microsimulation,
+    reformed: Microsimulation,
+    year: int,
+    multipliers: np.ndarray | None = None,
+) -> dict:
     """Compute budgetary impact matching the API/app-v2 approach.
 
     Uses household_tax and household_benefits at household level.
-    MicroSeries.sum() auto-applies household_weight.
+    MicroSeries.sum() auto-applies household_weight. With bootstrap
+    ``multipliers`` (households x replicates), also returns each impact's
+    standard error and interval under "uncertainty".
     """
     # household_tax includes fed+state+local taxes minus refundable credits
     b_tax = baseline.calculate("household_tax", period=year).sum()
@@ -115,21 +107,45 @@ def compute_budget(baseline: Microsimulation, reformed: Microsimulation, year: i
     benefit_spending_impact = float(r_benefits - b_benefits)
     budgetary_impact = tax_revenue_impact - benefit_spending_impact
 
-    return {
+    result = {
         "tax_revenue_impact": tax_revenue_impact,
         "state_tax_revenue_impact": state_tax_revenue_impact,
         "benefit_spending_impact": benefit_spending_impact,
         "budgetary_impact": budgetary_impact,
     }
+    if multipliers is not None:
+        import numpy as np
+
+        def change(variable):
+            return (
+                reformed.calculate(variable, period=year, map_to="household").values
+                - baseline.calculate(variable, period=year, map_to="household").values
+            )
+
+        tax = change("household_tax")
+        benefits = change("household_benefits")
+        changes = np.vstack([tax, change("state_income_tax"), benefits, tax - benefits])
+        weight = baseline.calculate("household_weight", period=year).values
+        # Every impact for every replicate in one product.
+        totals = changes @ (weight[:, None] * multipliers)
+        result["uncertainty"] = {
+            name: summarize(result[name], replicate_totals)
+            for name, replicate_totals in zip(list(result), totals)
+        }
+    return result
 
 
 def compute_decile_impacts(
-    baseline: Microsimulation, reformed: Microsimulation, year: int
+    baseline: Microsimulation,
+    reformed: Microsimulation,
+    year: int,
+    multipliers: np.ndarray | None = None,
 ) -> dict:
     """Compute average and relative income change by decile.
 
     Matches the API: uses pre-computed household_income_decile (person-weighted)
-    and household_weight for aggregation.
+    and household_weight for aggregation. With bootstrap ``multipliers``, also
+    returns per-decile uncertainty (deciles held at their point assignment).
     """
     import pandas as pd
 
@@ -159,16 +175,39 @@ def compute_decile_impacts(
         average[str(d)] = float(total_change / total_weight) if total_weight > 0 else 0.0
         relative[str(d)] = float(total_change / total_baseline) if total_baseline != 0 else 0.0
 
-    return {"average": average, "relative": relative}
+    result = {"average": average, "relative": relative}
+    if multipliers is not None:
+        import numpy as np
+
+        masks = df["decile"].to_numpy()[:, None] == np.arange(1, 11)
+        change = df["change"].to_numpy()[:, None] * masks
+        weight = df["weight"].to_numpy()
+        result["uncertainty"] = {
+            "average": dict(zip(
+                average, weighted_ratio(change, masks.astype(float), weight, multipliers)
+            )),
+            "relative": dict(zip(
+                relative,
+                weighted_ratio(
+                    change, df["baseline"].to_numpy()[:, None] * masks, weight, multipliers
+                ),
+            )),
+        }
+    return result
 
 
 def compute_poverty(
-    baseline: Microsimulation, reformed: Microsimulation, year: int
+    baseline: Microsimulation,
+    reformed: Microsimulation,
+    year: int,
+    multipliers: np.ndarray | None = None,
 ) -> dict:
     """Compute poverty rate changes matching the API/app-v2.
 
     Uses person_in_poverty (person-level variable derived from spm_unit)
-    weighted by person_weight. Poverty rate = weighted mean.
+    weighted by person_weight. Poverty rate = weighted mean. With bootstrap
+    household ``multipliers``, each group also gets the uncertainty of its
+    baseline rate, reform rate and change.
     """
     import pandas as pd
 
@@ -192,12 +231,41 @@ def compute_poverty(
         r_rate = (sub["r_poverty"] * w).sum() / w.sum()
         return {"baseline": float(b_rate), "reform": float(r_rate)}
 
-    return {
-        "child": poverty_rates(df["age"] < 18),
-        "adult": poverty_rates((df["age"] >= 18) & (df["age"] < 65)),
-        "senior": poverty_rates(df["age"] >= 65),
-        "all": poverty_rates(None),
+    groups = {
+        "child": df["age"] < 18,
+        "adult": (df["age"] >= 18) & (df["age"] < 65),
+        "senior": df["age"] >= 65,
+        "all": None,
     }
+    result = {group: poverty_rates(mask) for group, mask in groups.items()}
+    if multipliers is not None:
+        import numpy as np
+
+        masks = np.column_stack([
+            np.ones(len(df)) if mask is None else mask.to_numpy(dtype=float)
+            for mask in groups.values()
+        ])
+        weight = df["weight"].to_numpy()
+        people = person_multipliers(baseline, multipliers)
+        b = df["b_poverty"].to_numpy(dtype=float)[:, None] * masks
+        r = df["r_poverty"].to_numpy(dtype=float)[:, None] * masks
+        estimates = {
+            "baseline": weighted_ratio(b, masks, weight, people),
+            "reform": weighted_ratio(r, masks, weight, people),
+            "change": weighted_ratio(r - b, masks, weight, people),
+        }
+        for i, group in enumerate(groups):
+            result[group]["uncertainty"] = {
+                name: values[i] for name, values in estimates.items()
+            }
+    return result
+
+
+def replicate_multipliers(baseline: Microsimulation, replicates: int) -> np.ndarray | None:
+    """Bootstrap household weight multipliers, or None when replicates is 0."""
+    if not replicates:
+        return None
+    return bootstrap_multipliers(baseline.populations["household"].count, replicates)
 
 
 def parse_args() -> argparse.Namespace:
@@ -206,20 +274,63 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--enhanced-cps-2024", default=ENHANCED_CPS_2024)
     parser.add_argument("--legacy-payload", default=str(LEGACY_PAYLOAD))
     parser.add_argument("--year", type=int, default=YEAR)
+    parser.add_argument("--workers", type=int, default=3, help="Chart-writing processes.")
+    parser.add_argument(
+        "--replicates",
+        type=int,
+        default=0,
+        help="Bootstrap replicates for standard errors and 90%% intervals (0: off).",
+    )
     parser.add_argument(
         "--output-dir",
         default="us/irs/income/credits/ctc/legacy_webapp_charts",
     )
+    parser.add_argument(
+        "--warehouse",
+        action="store_true",
+        help="Also write the current-stack budget and decile tables to the warehouse.",
+    )
+    add_profile_argument(parser)
     return parser.parse_args()
 
 
-def write_chart(fig: go.Figure, path: Path) -> None:
-    fig.write_html(str(path), include_plotlyjs="cdn")
-    print(f"  Wrote: {path}")
+def write_warehouse(results: dict, year: int) -> list[Path]:
+    """Write each dataset's budget and decile results to the warehouse.
 
+    ``results`` maps dataset (as given) to its ``compute_budget`` and
+    ``compute_decile_impacts`` results. Only the current stack is written:
+    the legacy payload has no reform hash or dataset of its own to key on.
+    """
+    import pandas as pd
 
-def render_budget_comparison(legacy: dict, current_cps: dict, current_ecps: dict, outdir: Path) -> None:
+    keys = {"reform_hash": reform_hash(REFORM_DICT), "period": year}
+    paths = []
+    for dataset, result in results.items():
+        budget = pd.DataFrame(
+            [{k: v for k, v in result["budget"].items() if k != "uncertainty"}]
+        )
+        paths += write(
+            to_long(budget, dataset=dataset, **keys), "legacy_comparison_budget"
+        )
+        decile = result["decile"]
+        deciles = pd.DataFrame(
+            {
+                "decile": list(decile["average"]),
+                "average_income_change": list(decile["average"].values()),
+                "relative_income_change": list(decile["relative"].values()),
+            }
+        )
+        paths += write(
+            to_long(deciles, group="decile", dataset=dataset, **keys),
+            "legacy_comparison_decile",
+        )
+    return paths
+
+
+def render_budget_comparison(legacy: dict, current_cps: dict, current_ecps: dict) -> go.Figure:
     """Side-by-side budgetary impact."""
+    import plotly.graph_objects as go
+
     datasets = ["Legacy (old stack, CPS 23)", "Current (CPS 23)", "Current (ECPS 24)"]
     budgets = [legacy["budget"], current_cps, current_ecps]
 
@@ -244,11 +355,13 @@ def render_budget_comparison(legacy: dict, current_cps: dict, current_ecps: dict
         height=500,
         margin={"t": 60, "b": 80, "l": 80, "r": 20},
     )
-    write_chart(fig, outdir / "comparison_budget.html")
+    return fig
 
 
-def render_decile_comparison(legacy: dict, current_cps: dict, current_ecps: dict, outdir: Path) -> None:
+def render_decile_comparison(legacy: dict, current_cps: dict, current_ecps: dict) -> go.Figure:
     """Decile average impact comparison."""
+    import plotly.graph_objects as go
+
     legacy_avg = legacy["decile"]["average"]
     deciles = list(legacy_avg.keys())
 
@@ -283,11 +396,13 @@ def render_decile_comparison(legacy: dict, current_cps: dict, current_ecps: dict
         margin={"t": 60, "b": 80, "l": 80, "r": 20},
         legend={"yanchor": "top", "y": 0.99, "xanchor": "right", "x": 0.99},
     )
-    write_chart(fig, outdir / "comparison_decile_average.html")
+    return fig
 
 
-def render_poverty_comparison(legacy: dict, current_cps: dict, current_ecps: dict, outdir: Path) -> None:
+def render_poverty_comparison(legacy: dict, current_cps: dict, current_ecps: dict) -> go.Figure:
     """Poverty rate change comparison."""
+    import plotly.graph_objects as go
+
     categories = ["child", "adult", "senior", "all"]
     labels = ["Children", "Working-age", "Seniors", "All"]
 
@@ -327,11 +442,57 @@ def render_poverty_comparison(legacy: dict, current_cps: dict, current_ecps: dic
         margin={"t": 60, "b": 80, "l": 80, "r": 20},
         legend={"yanchor": "top", "y": 0.99, "xanchor": "right", "x": 0.99},
     )
-    write_chart(fig, outdir / "comparison_poverty.html")
+    return fig
+
+
+def render_inequality_comparison(
+    legacy: dict, current_cps: dict, current_ecps: dict
+) -> go.Figure:
+    """Relative change in Gini and top income shares."""
+    import plotly.graph_objects as go
+
+    keys = ["gini", "top_10_pct_share", "top_1_pct_share"]
+    labels = ["Gini index", "Top 10% share", "Top 1% share"]
+
+    def get_changes(inequality):
+        return [inequality[k]["reform"] / inequality[k]["baseline"] - 1 for k in keys]
+
+    fig = go.Figure()
+    for label, inequality, color in [
+        ("Legacy (old stack, CPS 23)", legacy["inequality"], BLUE),
+        ("Current (CPS 23)", current_cps, DARK_GRAY),
+        ("Current (ECPS 24)", current_ecps, ORANGE),
+    ]:
+        fig.add_trace(go.Bar(
+            x=labels,
+            y=get_changes(inequality),
+            name=label,
+            marker_color=color,
+        ))
+
+    fig.update_layout(
+        title="Inequality Change: Legacy vs Current",
+        xaxis={"title": ""},
+        yaxis={"title": "Relative change", "tickformat": "+,.1%"},
+        barmode="group",
+        font={"family": PLOT_FONT},
+        plot_bgcolor="rgba(0,0,0,0)",
+        height=500,
+        margin={"t": 60, "b": 80, "l": 80, "r": 20},
+        legend={"yanchor": "top", "y": 0.99, "xanchor": "right", "x": 0.99},
+    )
+    return fig
 
 
+@recorded("compare_legacy_vs_current")
 def main() -> None:
     args = parse_args()
+    manifest = current_manifest()
+    manifest.describe(
+        arguments=vars(args),
+        datasets=[args.cps_2023, args.enhanced_cps_2024],
+        reforms={REFORM_FILE.stem: REFORM_DICT},
+    )
     outdir = Path(args.output_dir)
     outdir.mkdir(parents=True, exist_ok=True)
 
@@ -346,24 +507,34 @@ def main() -> None:
         legacy = json.loads(legacy_path.read_text())
         print(f"Loaded legacy payload from: {legacy_path}")
 
-    reform = build_reform()
+    from analysis_tools.column_cache import microsimulation
 
-    # Run current stack with CPS 2023
-    print(f"\nRunning current stack with CPS 2023...")
-    baseline_cps = Microsimulation(dataset=args.cps_2023)
-    reformed_cps = Microsimulation(dataset=args.cps_2023, reform=reform)
-    budget_cps = compute_budget(baseline_cps, reformed_cps, args.year)
-    decile_cps = compute_decile_impacts(baseline_cps, reformed_cps, args.year)
-    poverty_cps = compute_poverty(baseline_cps, reformed_cps, args.year)
-
-    # Run current stack with Enhanced CPS 2024
-    print(f"Running current stack with Enhanced CPS 2024...")
-    baseline_ecps = Microsimulation(dataset=args.enhanced_cps_2024)
-    reformed_ecps = Microsimulation(dataset=args.enhanced_cps_2024, reform=reform)
-    budget_ecps = compute_budget(baseline_ecps, reformed_ecps, args.year)
-    decile_ecps = compute_decile_impacts(baseline_ecps, reformed_ecps, args.year)
-    poverty_ecps = compute_poverty(baseline_ecps, reformed_ecps, args.year)
+    reform = build_reform()
 
+    with profiling(args.profile):
+        # Run current stack with CPS 2023
+        manifest.begin("simulate_cps_2023")
+        print(f"\nRunning current stack with CPS 2023...")
+        baseline_cps = microsimulation(args.cps_2023)
+        reformed_cps = microsimulation(args.cps_2023, reform=reform)
+        multipliers = replicate_multipliers(baseline_cps, args.replicates)
+        budget_cps = compute_budget(baseline_cps, reformed_cps, args.year, multipliers)
+        decile_cps = compute_decile_impacts(baseline_cps, reformed_cps, args.year, multipliers)
+        poverty_cps = compute_poverty(baseline_cps, reformed_cps, args.year, multipliers)
+        inequality_cps = compute_inequality(baseline_cps, reformed_cps, args.year)
+
+        # Run current stack with Enhanced CPS 2024
+        manifest.begin("simulate_enhanced_cps_2024")
+        print(f"Running current stack with Enhanced CPS 2024...")
+        baseline_ecps = microsimulation(args.enhanced_cps_2024)
+        reformed_ecps = microsimulation(args.enhanced_cps_2024, reform=reform)
+        multipliers = replicate_multipliers(baseline_ecps, args.replicates)
+        budget_ecps = compute_budget(baseline_ecps, reformed_ecps, args.year, multipliers)
+        decile_ecps = compute_decile_impacts(baseline_ecps, reformed_ecps, args.year, multipliers)
+        poverty_ecps = compute_poverty(baseline_ecps, reformed_ecps, args.year, multipliers)
+        inequality_ecps = compute_inequality(baseline_ecps, reformed_ecps, args.year)
+
+    manifest.begin("report")
     # Print summary table
     print("\n" + "=" * 80)
     print("BUDGETARY IMPACT COMPARISON")
@@ -385,6 +556,12 @@ def main() -> None:
                 f"{b['tax_revenue_impact']/1e9:>15,.2f} "
                 f"{b['benefit_spending_impact']/1e9:>15,.2f}"
             )
+            if "uncertainty" in b:
+                net = b["uncertainty"]["budgetary_impact"]
+                print(
+                    f"{'':<30} {'se ' + format(net['se'] / 1e9, ',.2f'):>18} "
+                    f"90% interval {net['low'] / 1e9:,.2f} to {net['high'] / 1e9:,.2f}"
+                )
 
     # Save current-stack results
     current_results = {
@@ -392,68 +569,75 @@ def main() -> None:
             "budget": budget_cps,
             "decile": decile_cps,
             "poverty": poverty_cps,
+            "inequality": inequality_cps,
         },
         "enhanced_cps_2024": {
             "budget": budget_ecps,
             "decile": decile_ecps,
             "poverty": poverty_ecps,
+            "inequality": inequality_ecps,
         },
     }
     results_path = outdir / "current_stack_results.json"
     results_path.write_text(json.dumps(current_results, indent=2))
     print(f"\nCurrent stack results saved to: {results_path}")
+    if args.warehouse:
+        paths = write_warehouse(
+            {
+                args.cps_2023: current_results["cps_2023"],
+                args.enhanced_cps_2024: current_results["enhanced_cps_2024"],
+            },
+            args.year,
+        )
+        print(f"Wrote: {len(paths)} warehouse file(s)")
 
     # Render comparison charts
     if legacy:
         print("\nRendering comparison charts...")
-        render_budget_comparison(legacy, budget_cps, budget_ecps, outdir)
-        render_decile_comparison(legacy, decile_cps, decile_ecps, outdir)
-        render_poverty_comparison(legacy, poverty_cps, poverty_ecps, outdir)
-
-        # Also render an index page for the comparison
-        comparison_index = outdir / "comparison_index.html"
-        comparison_index.write_text(f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8" />
-    <title>Legacy vs Current Comparison</title>
-    <style>
-        body {{ margin: 0; font-family: "Roboto Serif", Georgia, serif; background: #f7fafd; }}
-        main {{ max-width: 1200px; margin: 0 auto; padding: 32px 20px 60px; }}
-        h1 {{ margin: 0 0 12px; font-size: 2rem; }}
-        .intro {{ margin: 0 0 28px; padding: 16px 18px; background: white;
-                  border-left: 4px solid #2C6496; box-shadow: 0 8px 24px rgba(12,26,39,0.06); }}
-        section {{ margin: 0 0 28px; padding: 16px; background: white;
-                   box-shadow: 0 8px 24px rgba(12,26,39,0.06); }}
-        iframe {{ width: 100%; height: 620px; border: 1px solid #bdbdbd; background: white; }}
-        h2 {{ margin: 0 0 12px; font-size: 1.15rem; }}
-    </style>
-</head>
-<body>
-<main>
-    <h1>Legacy vs Current Stack Comparison</h1>
-    <p class="intro">
-        Comparing the same CTC/EITC reform across three configurations:<br>
-        <strong>Legacy</strong> = old stack (policyengine 0.3.9 + policyengine-us 1.425.4 + CPS 2023)<br>
-        <strong>Current CPS 23</strong> = current policyengine-us + CPS 2023<br>
-        <strong>Current ECPS 24</strong> = current policyengine-us + Enhanced CPS 2024
-    </p>
-    <section>
-        <h2>Net Budgetary Impact</h2>
-        <iframe src="comparison_budget.html"></iframe>
-    </section>
-    <section>
-        <h2>Distributional Impact (Average by Decile)</h2>
-        <iframe src="comparison_decile_average.html"></iframe>
-    </section>
-    <section>
-        <h2>Poverty Rate Change</h2>
-        <iframe src="comparison_poverty.html"></iframe>
-    </section>
-</main>
-</body>
-</html>
-""")
+        figures = {
+            "comparison_budget.html": (
+                "budget",
+                "Net Budgetary Impact",
+                render_budget_comparison(legacy, budget_cps, budget_ecps),
+            ),
+            "comparison_decile_average.html": (
+                "decile",
+                "Distributional Impact (Average by Decile)",
+                render_decile_comparison(legacy, decile_cps, decile_ecps),
+            ),
+            "comparison_poverty.html": (
+                "poverty",
+                "Poverty Rate Change",
+                render_poverty_comparison(legacy, poverty_cps, poverty_ecps),
+            ),
+        }
+        if "inequality" in legacy:
+            figures["comparison_inequality.html"] = (
+                "inequality",
+                "Inequality Change",
+                render_inequality_comparison(legacy, inequality_cps, inequality_ecps),
+            )
+        for path in write_charts(
+            {outdir / name: fig for name, (_, _, fig) in figures.items()},
+            workers=args.workers,
+        ):
+            print(f"  Wrote: {path}")
+
+        # Single self-contained page: one inlined plotly.js, no iframes.
+        comparison_index = write_report(
+            outdir / "comparison_index.html",
+            "Legacy vs Current Stack Comparison",
+            list(figures.values()),
+            intro_html=(
+                "Comparing the same CTC/EITC reform across three configurations:<br>"
+                "<strong>Legacy</strong> = old stack (policyengine 0.3.9 + "
+                "policyengine-us 1.425.4 + CPS 2023)<br>"
+                "<strong>Current CPS 23</strong> = current policyengine-us + CPS 2023<br>"
+                "<strong>Current ECPS 24</strong> = current policyengine-us + "
+                "Enhanced CPS 2024"
+            ),
+            workers=args.workers,
+        )
         print(f"  Wrote: {comparison_index}")
     else:
         print("\nSkipping comparison charts (no legacy payload available).")
@@ -12,20 +12,44 @@ This script targets the closest reproducible setup we found for the November 4,
       python us/irs/income/credits/ctc/render_legacy_webapp_charts.py
 
 It writes Plotly HTML files for the chart families whose payloads are present in
-the old macro output.
+the old macro output, plus report.html: a single self-contained page with one
+inlined plotly.js bundle that works offline (index.html loads the per-chart
+files through iframes instead).
+
+The macro payload is cached per (dataset, reform hash, time period, region),
+so later runs skip the simulation, and only charts whose payload sections or
+styling code changed are re-rendered (tracked in render_state.json). To tweak
+chart styling without the old stack installed at all:
+
+    uv run --python 3.11 --with plotly \
+      python us/irs/income/credits/ctc/render_legacy_webapp_charts.py --render-only
 """
 
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
+import sys
 from pathlib import Path
+from typing import TYPE_CHECKING, Callable
+
+from reproduce_legacy_webapp_path import DEFAULT_DATASET, REFORM_DICT, build_reform
+
+REPO_ROOT = Path(__file__).resolve().parents[5]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
 
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-from policyengine import Simulation
+from analysis_tools.cache import cache_dir
+from analysis_tools.manifest import current_manifest, record_cache, recorded
+from analysis_tools.profiling import add_profile_argument, profiling
+from analysis_tools.reforms import reform_hash
+from analysis_tools.report import export_pngs, write_charts, write_report
 
-from reproduce_legacy_webapp_path import DEFAULT_DATASET, build_reform
+# plotly and policyengine are imported where they are used so that --help and
+# other runs that never build a figure or simulation start quickly.
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
 
 
 BLUE = "#2C6496"
@@ -35,6 +59,34 @@ LIGHT_GRAY = "#F2F2F2"
 MEDIUM_LIGHT_GRAY = "#BDBDBD"
 PLOT_FONT = "Roboto Serif"
 
+# Chart file -> (anchor, heading) in the combined report.html, in page order.
+REPORT_SECTIONS = {
+    "budgetary_impact_overall.html": ("budget", "Budgetary Impact"),
+    "distributional_income_decile_average.html": (
+        "dist-avg",
+        "Distributional Impact By Income Decile: Average",
+    ),
+    "distributional_income_decile_relative.html": (
+        "dist-rel",
+        "Distributional Impact By Income Decile: Relative",
+    ),
+    "winners_losers_income_decile.html": (
+        "winners",
+        "Winners And Losers By Income Decile",
+    ),
+    "poverty_by_age.html": ("poverty-age", "Poverty Impact By Age"),
+    "deep_poverty_by_age.html": ("deep-age", "Deep Poverty Impact By Age"),
+    "poverty_by_gender.html": ("poverty-gender", "Poverty Impact By Gender"),
+    "deep_poverty_by_gender.html": ("deep-gender", "Deep Poverty Impact By Gender"),
+    "poverty_by_race.html": ("poverty-race", "Poverty Impact By Race And Ethnicity"),
+    "inequality_impact.html": ("inequality", "Inequality Impact"),
+}
+REPORT_INTRO = (
+    "Closest reproducible legacy web-app output for the November 2025 path: "
+    "old macro stack, <code>region=us</code>, no <code>dataset=enhanced_cps</code>, "
+    "using <code>cps_2023.h5</code>."
+)
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser()
@@ -59,10 +111,45 @@ def parse_args() -> argparse.Namespace:
         default="us/irs/income/credits/ctc/legacy_webapp_charts",
         help="Directory to write HTML charts and payload JSON into.",
     )
+    parser.add_argument(
+        "--render-only",
+        action="store_true",
+        help=(
+            "Never simulate. Use the cached payload for this dataset/reform/"
+            "period/region, or the payload already in --output-dir."
+        ),
+    )
+    parser.add_argument(
+        "--force-simulate",
+        action="store_true",
+        help="Rerun the simulation even if a cached payload exists.",
+    )
+    parser.add_argument(
+        "--force-render",
+        action="store_true",
+        help="Re-render every chart even if its inputs are unchanged.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Processes used to serialize charts.",
+    )
+    parser.add_argument(
+        "--png",
+        action="store_true",
+        help=(
+            "Also export re-rendered charts, and any not yet in png/, to png/ "
+            "in one Kaleido session."
+        ),
+    )
+    add_profile_argument(parser)
     return parser.parse_args()
 
 
 def run_impact(dataset: Path, time_period: int, region: str) -> dict:
+    from policyengine import Simulation
+
     simulation = Simulation(
         country="us",
         scope="macro",
@@ -74,6 +161,49 @@ def run_impact(dataset: Path, time_period: int, region: str) -> dict:
     return simulation.calculate_economy_comparison().model_dump()
 
 
+def payload_key(dataset: Path, time_period: int, region: str) -> str:
+    """Cache key for a macro payload: dataset, reform hash, period and region."""
+    dataset_key = str(dataset)
+    if dataset.is_file():
+        # A dataset regenerated in place gets a new payload.
+        stat = dataset.stat()
+        dataset_key = f"{dataset.resolve()}:{stat.st_size}:{stat.st_mtime_ns}"
+    key = {
+        "dataset": dataset_key,
+        "reform_hash": reform_hash(REFORM_DICT),
+        "time_period": time_period,
+        "region": region,
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def load_or_run_impact(args: argparse.Namespace, outdir: Path) -> dict:
+    """Return the macro payload, simulating only on a cache miss."""
+    dataset_path = Path(args.dataset).expanduser()
+    cached = cache_dir("legacy_impact_payloads") / (
+        payload_key(dataset_path, args.time_period, args.region) + ".json"
+    )
+    hit = cached.exists() and not args.force_simulate
+    record_cache("legacy_impact_payload", hit)
+    if hit:
+        print(f"Using cached payload: {cached}")
+        return json.loads(cached.read_text())
+    if args.render_only:
+        existing = outdir / "impact_payload.json"
+        if not existing.exists():
+            raise FileNotFoundError(
+                f"--render-only: no cached payload at {cached} or {existing}"
+            )
+        print(f"Using existing payload: {existing}")
+        return json.loads(existing.read_text())
+
+    if not dataset_path.exists():
+        raise FileNotFoundError(f"Dataset not found: {dataset_path}")
+    impact = run_impact(dataset_path, args.time_period, args.region)
+    cached.write_text(json.dumps(impact, indent=2, sort_keys=True))
+    return impact
+
+
 def base_layout(title: str, height: int = 500) -> dict:
     return {
         "title": {"text": title},
@@ -85,11 +215,9 @@ def base_layout(title: str, height: int = 500) -> dict:
     }
 
 
-def write_chart(fig: go.Figure, path: Path) -> None:
-    fig.write_html(str(path), include_plotlyjs="cdn")
+def render_budget_chart(impact: dict) -> go.Figure:
+    import plotly.graph_objects as go
 
-
-def render_budget_chart(impact: dict, outdir: Path) -> None:
     budget = impact["budget"]
     state_tax = budget["state_tax_revenue_impact"] / 1e9
     tax = (budget["tax_revenue_impact"] - budget["state_tax_revenue_impact"]) / 1e9
@@ -126,10 +254,12 @@ def render_budget_chart(impact: dict, outdir: Path) -> None:
         **base_layout("Budgetary impact"),
         yaxis={"title": "Budgetary impact (bn)", "tickformat": "$,.1f"},
     )
-    write_chart(fig, outdir / "budgetary_impact_overall.html")
+    return fig
+
 
+def render_decile_average_chart(impact: dict) -> go.Figure:
+    import plotly.graph_objects as go
 
-def render_decile_average_chart(impact: dict, outdir: Path) -> None:
     data = impact["decile"]["average"]
     x = list(data.keys())
     y = list(data.values())
@@ -147,10 +277,12 @@ def render_decile_average_chart(impact: dict, outdir: Path) -> None:
         xaxis={"title": "Income decile"},
         yaxis={"title": "Average change in household income", "tickformat": "$,.0f"},
     )
-    write_chart(fig, outdir / "distributional_income_decile_average.html")
+    return fig
+
 
+def render_decile_relative_chart(impact: dict) -> go.Figure:
+    import plotly.graph_objects as go
 
-def render_decile_relative_chart(impact: dict, outdir: Path) -> None:
     data = impact["decile"]["relative"]
     x = list(data.keys())
     y = list(data.values())
@@ -168,10 +300,13 @@ def render_decile_relative_chart(impact: dict, outdir: Path) -> None:
         xaxis={"title": "Income decile"},
         yaxis={"title": "Relative change in household income", "tickformat": "+,.1%"},
     )
-    write_chart(fig, outdir / "distributional_income_decile_relative.html")
+    return fig
 
 
-def render_intra_decile_chart(impact: dict, outdir: Path) -> None:
+def render_intra_decile_chart(impact: dict) -> go.Figure:
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
     all_data = impact["intra_decile"]["all"]
     deciles = impact["intra_decile"]["deciles"]
     categories = [
@@ -238,17 +373,18 @@ def render_intra_decile_chart(impact: dict, outdir: Path) -> None:
     fig.update_xaxes(title_text="Population share", tickformat=".0%", row=2, col=1)
     fig.update_yaxes(title_text="", row=1, col=1)
     fig.update_yaxes(title_text="Income decile", row=2, col=1)
-    write_chart(fig, outdir / "winners_losers_income_decile.html")
+    return fig
 
 
 def render_poverty_chart(
     series: dict,
-    outpath: Path,
     title: str,
     labels: list[str],
     keys: list[str],
     yaxis_title: str,
-) -> None:
+) -> go.Figure:
+    import plotly.graph_objects as go
+
     changes = [series[key]["reform"] / series[key]["baseline"] - 1 for key in keys]
     fig = go.Figure(
         go.Bar(
@@ -263,10 +399,12 @@ def render_poverty_chart(
         **base_layout(title),
         yaxis={"title": yaxis_title, "tickformat": "+,.1%"},
     )
-    write_chart(fig, outpath)
+    return fig
 
 
-def render_inequality_chart(impact: dict, outdir: Path) -> None:
+def render_inequality_chart(impact: dict) -> go.Figure:
+    import plotly.graph_objects as go
+
     inequality = impact["inequality"]
     labels = ["Gini index", "Top 10% share", "Top 1% share"]
     keys = ["gini", "top_10_pct_share", "top_1_pct_share"]
@@ -286,83 +424,193 @@ def render_inequality_chart(impact: dict, outdir: Path) -> None:
         **base_layout("Income inequality impact"),
         yaxis={"title": "Relative change", "tickformat": "+,.1%"},
     )
-    write_chart(fig, outdir / "inequality_impact.html")
+    return fig
+
+
+def chart_jobs(impact: dict) -> dict[str, tuple[object, Callable[[], go.Figure]]]:
+    """Map each chart file to (the payload sections it reads, its figure builder)."""
+    poverty = impact["poverty"]
+    by_gender = impact["poverty_by_gender"]
+    by_race = impact["poverty_by_race"]
+    age_labels = ["Children", "Working-age adults", "Seniors", "All"]
+    age_keys = ["child", "adult", "senior", "all"]
+    gender_poverty = {
+        "male": by_gender["poverty"]["male"],
+        "female": by_gender["poverty"]["female"],
+        "all": poverty["poverty"]["all"],
+    }
+    gender_deep_poverty = {
+        "male": by_gender["deep_poverty"]["male"],
+        "female": by_gender["deep_poverty"]["female"],
+        "all": poverty["deep_poverty"]["all"],
+    }
+    race_poverty = {
+        "white": by_race["poverty"]["white"],
+        "black": by_race["poverty"]["black"],
+        "hispanic": by_race["poverty"]["hispanic"],
+        "other": by_race["poverty"]["other"],
+        "all": poverty["poverty"]["all"],
+    }
+    return {
+        "budgetary_impact_overall.html": (
+            impact["budget"],
+            lambda: render_budget_chart(impact),
+        ),
+        "distributional_income_decile_average.html": (
+            impact["decile"]["average"],
+            lambda: render_decile_average_chart(impact),
+        ),
+        "distributional_income_decile_relative.html": (
+            impact["decile"]["relative"],
+            lambda: render_decile_relative_chart(impact),
+        ),
+        "winners_losers_income_decile.html": (
+            impact["intra_decile"],
+            lambda: render_intra_decile_chart(impact),
+        ),
+        "poverty_by_age.html": (
+            poverty["poverty"],
+            lambda: render_poverty_chart(
+                poverty["poverty"],
+                "Poverty impact by age",
+                age_labels,
+                age_keys,
+                "Relative change in poverty rate",
+            ),
+        ),
+        "deep_poverty_by_age.html": (
+            poverty["deep_poverty"],
+            lambda: render_poverty_chart(
+                poverty["deep_poverty"],
+                "Deep poverty impact by age",
+                age_labels,
+                age_keys,
+                "Relative change in deep poverty rate",
+            ),
+        ),
+        "poverty_by_gender.html": (
+            gender_poverty,
+            lambda: render_poverty_chart(
+                gender_poverty,
+                "Poverty impact by gender",
+                ["Male", "Female", "All"],
+                ["male", "female", "all"],
+                "Relative change in poverty rate",
+            ),
+        ),
+        "deep_poverty_by_gender.html": (
+            gender_deep_poverty,
+            lambda: render_poverty_chart(
+                gender_deep_poverty,
+                "Deep poverty impact by gender",
+                ["Male", "Female", "All"],
+                ["male", "female", "all"],
+                "Relative change in deep poverty rate",
+            ),
+        ),
+        "poverty_by_race.html": (
+            race_poverty,
+            lambda: render_poverty_chart(
+                race_poverty,
+                "Poverty impact by race and ethnicity",
+                ["White (non-Hispanic)", "Black (non-Hispanic)", "Hispanic", "Other", "All"],
+                ["white", "black", "hispanic", "other", "all"],
+                "Relative change in poverty rate",
+            ),
+        ),
+        "inequality_impact.html": (
+            impact["inequality"],
+            lambda: render_inequality_chart(impact),
+        ),
+    }
 
 
+def render_changed_charts(
+    impact: dict, outdir: Path, force: bool = False, workers: int = 1, png: bool = False
+) -> list[str]:
+    """Render charts whose payload inputs or styling code changed since last run.
+
+    Each chart's fingerprint covers its payload sections and this script's
+    source, so a styling edit re-renders everything without simulating and a
+    new payload re-renders only the charts whose numbers moved. The combined
+    report is rewritten whenever any chart changes.
+    """
+    script_hash = hashlib.sha256(Path(__file__).read_bytes()).hexdigest()
+    state_path = outdir / "render_state.json"
+    state = json.loads(state_path.read_text()) if state_path.exists() else {}
+
+    jobs = chart_jobs(impact)
+    changed = {}
+    for filename, (inputs, build) in jobs.items():
+        fingerprint = hashlib.sha256(
+            (script_hash + json.dumps(inputs, sort_keys=True)).encode()
+        ).hexdigest()
+        if not force and state.get(filename) == fingerprint and (outdir / filename).exists():
+            continue
+        changed[filename] = (fingerprint, build())
+    record_cache("rendered_charts", True, len(jobs) - len(changed))
+    record_cache("rendered_charts", False, len(changed))
+
+    report_path = outdir / "report.html"
+    if changed or not report_path.exists():
+        figures = {
+            filename: changed[filename][1] if filename in changed else build()
+            for filename, (_, build) in jobs.items()
+        }
+        write_charts(
+            {outdir / filename: fig for filename, (_, fig) in changed.items()},
+            workers=workers,
+        )
+        write_report(
+            report_path,
+            "Legacy Webapp Charts",
+            [
+                (anchor, heading, figures[filename])
+                for filename, (anchor, heading) in REPORT_SECTIONS.items()
+            ],
+            intro_html=REPORT_INTRO,
+            workers=workers,
+        )
+    if png:
+        pngs = {}
+        for filename, (_, build) in jobs.items():
+            path = outdir / "png" / filename.replace(".html", ".png")
+            if filename in changed:
+                pngs[path] = changed[filename][1]
+            elif not path.exists():
+                # Unchanged, but rendered by an earlier run without --png.
+                pngs[path] = build()
+        if pngs:
+            export_pngs(pngs)
+
+    for filename, (fingerprint, _) in changed.items():
+        state[filename] = fingerprint
+    state_path.write_text(json.dumps(state, indent=2, sort_keys=True))
+    return list(changed)
+
+
+@recorded("render_legacy_webapp_charts")
 def main() -> None:
     args = parse_args()
-    dataset_path = Path(args.dataset).expanduser()
-    if not dataset_path.exists():
-        raise FileNotFoundError(f"Dataset not found: {dataset_path}")
-
+    manifest = current_manifest()
+    manifest.describe(
+        arguments=vars(args), datasets=[args.dataset], reforms={"ctc_eitc_reform": REFORM_DICT}
+    )
     outdir = Path(args.output_dir)
     outdir.mkdir(parents=True, exist_ok=True)
 
-    impact = run_impact(dataset_path, args.time_period, args.region)
+    manifest.begin("impact")
+    with profiling(args.profile):
+        impact = load_or_run_impact(args, outdir)
 
     (outdir / "impact_payload.json").write_text(
         json.dumps(impact, indent=2, sort_keys=True)
     )
 
-    render_budget_chart(impact, outdir)
-    render_decile_average_chart(impact, outdir)
-    render_decile_relative_chart(impact, outdir)
-    render_intra_decile_chart(impact, outdir)
-    render_poverty_chart(
-        impact["poverty"]["poverty"],
-        outdir / "poverty_by_age.html",
-        "Poverty impact by age",
-        ["Children", "Working-age adults", "Seniors", "All"],
-        ["child", "adult", "senior", "all"],
-        "Relative change in poverty rate",
+    manifest.begin("render")
+    rendered = render_changed_charts(
+        impact, outdir, force=args.force_render, workers=args.workers, png=args.png
     )
-    render_poverty_chart(
-        impact["poverty"]["deep_poverty"],
-        outdir / "deep_poverty_by_age.html",
-        "Deep poverty impact by age",
-        ["Children", "Working-age adults", "Seniors", "All"],
-        ["child", "adult", "senior", "all"],
-        "Relative change in deep poverty rate",
-    )
-    render_poverty_chart(
-        {
-            "male": impact["poverty_by_gender"]["poverty"]["male"],
-            "female": impact["poverty_by_gender"]["poverty"]["female"],
-            "all": impact["poverty"]["poverty"]["all"],
-        },
-        outdir / "poverty_by_gender.html",
-        "Poverty impact by gender",
-        ["Male", "Female", "All"],
-        ["male", "female", "all"],
-        "Relative change in poverty rate",
-    )
-    render_poverty_chart(
-        {
-            "male": impact["poverty_by_gender"]["deep_poverty"]["male"],
-            "female": impact["poverty_by_gender"]["deep_poverty"]["female"],
-            "all": impact["poverty"]["deep_poverty"]["all"],
-        },
-        outdir / "deep_poverty_by_gender.html",
-        "Deep poverty impact by gender",
-        ["Male", "Female", "All"],
-        ["male", "female", "all"],
-        "Relative change in deep poverty rate",
-    )
-    render_poverty_chart(
-        {
-            "white": impact["poverty_by_race"]["poverty"]["white"],
-            "black": impact["poverty_by_race"]["poverty"]["black"],
-            "hispanic": impact["poverty_by_race"]["poverty"]["hispanic"],
-            "other": impact["poverty_by_race"]["poverty"]["other"],
-            "all": impact["poverty"]["poverty"]["all"],
-        },
-        outdir / "poverty_by_race.html",
-        "Poverty impact by race and ethnicity",
-        ["White (non-Hispanic)", "Black (non-Hispanic)", "Hispanic", "Other", "All"],
-        ["white", "black", "hispanic", "other", "all"],
-        "Relative change in poverty rate",
-    )
-    render_inequality_chart(impact, outdir)
 
     skipped = {
         "cliff_impact": impact.get("cliff_impact") is None,
@@ -375,7 +623,12 @@ def main() -> None:
         json.dumps(skipped, indent=2, sort_keys=True)
     )
 
-    print(json.dumps({"output_dir": str(outdir), "skipped": skipped}, indent=2))
+    print(
+        json.dumps(
+            {"output_dir": str(outdir), "rendered": rendered, "skipped": skipped},
+            indent=2,
+        )
+    )
 
 
 if __name__ == "__main__":
@@ -19,149 +19,32 @@ from __future__ import annotations
 
 import argparse
 import json
+import sys
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from policyengine import Simulation
-from policyengine_core.reforms import Reform
+REPO_ROOT = Path(__file__).resolve().parents[5]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from analysis_tools.manifest import current_manifest, recorded
+from analysis_tools.profiling import add_profile_argument, profiling
+
+if TYPE_CHECKING:
+    from policyengine_core.reforms import Reform
 
 
 DEFAULT_DATASET = Path(
     "/Users/pavelmakarchuk/policyengine-us-data/policyengine_us_data/storage/cps_2023.h5"
 )
+REFORM_FILE = Path(__file__).with_name("ctc_eitc_reform.json")
+REFORM_DICT = json.loads(REFORM_FILE.read_text())
 
 
 def build_reform() -> Reform:
-    return Reform.from_dict(
-        {
-            "gov.irs.credits.eitc.max[0].amount": {
-                "2025-01-01.2100-12-31": 2000
-            },
-            "gov.irs.credits.eitc.max[1].amount": {
-                "2025-01-01.2100-12-31": 2000
-            },
-            "gov.irs.credits.eitc.max[2].amount": {
-                "2025-01-01.2100-12-31": 2000
-            },
-            "gov.irs.credits.eitc.max[3].amount": {
-                "2025-01-01.2100-12-31": 2000
-            },
-            "gov.irs.credits.ctc.phase_out.amount": {
-                "2025-01-01.2100-12-31": 25
-            },
-            "gov.irs.credits.ctc.amount.arpa[0].amount": {
-                "2025-01-01.2100-12-31": 4800
-            },
-            "gov.irs.credits.ctc.amount.arpa[1].amount": {
-                "2025-01-01.2100-12-31": 4800
-            },
-            "gov.irs.credits.ctc.phase_out.arpa.amount": {
-                "2025-01-01.2100-12-31": 25
-            },
-            "gov.contrib.ctc.minimum_refundable.in_effect": {
-                "2025-01-01.2100-12-31": True
-            },
-            "gov.contrib.ctc.per_child_phase_in.in_effect": {
-                "2025-01-01.2100-12-31": True
-            },
-            "gov.irs.credits.ctc.phase_out.arpa.in_effect": {
-                "2025-01-01.2100-12-31": True
-            },
-            "gov.irs.credits.ctc.refundable.phase_in.rate": {
-                "2025-01-01.2100-12-31": 0.2
-            },
-            "gov.irs.credits.eitc.phase_in_rate[0].amount": {
-                "2025-01-01.2100-12-31": 0.2
-            },
-            "gov.irs.credits.eitc.phase_in_rate[1].amount": {
-                "2025-01-01.2100-12-31": 0.2
-            },
-            "gov.irs.credits.eitc.phase_in_rate[2].amount": {
-                "2025-01-01.2100-12-31": 0.2
-            },
-            "gov.irs.credits.eitc.phase_in_rate[3].amount": {
-                "2025-01-01.2100-12-31": 0.2
-            },
-            "gov.contrib.ctc.per_child_phase_out.in_effect": {
-                "2025-01-01.2100-12-31": True
-            },
-            "gov.irs.credits.ctc.phase_out.threshold.JOINT": {
-                "2025-01-01.2100-12-31": 200000
-            },
-            "gov.irs.credits.ctc.refundable.individual_max": {
-                "2025-01-01.2100-12-31": 4800
-            },
-            "gov.irs.credits.eitc.phase_out.rate[0].amount": {
-                "2025-01-01.2100-12-31": 0.1
-            },
-            "gov.irs.credits.eitc.phase_out.rate[1].amount": {
-                "2025-01-01.2100-12-31": 0.1
-            },
-            "gov.irs.credits.eitc.phase_out.rate[2].amount": {
-                "2025-01-01.2100-12-31": 0.1
-            },
-            "gov.irs.credits.eitc.phase_out.rate[3].amount": {
-                "2025-01-01.2100-12-31": 0.1
-            },
-            "gov.irs.credits.ctc.phase_out.threshold.SINGLE": {
-                "2025-01-01.2100-12-31": 100000
-            },
-            "gov.irs.credits.eitc.phase_out.start[0].amount": {
-                "2025-01-01.2100-12-31": 20000
-            },
-            "gov.irs.credits.eitc.phase_out.start[1].amount": {
-                "2025-01-01.2100-12-31": 20000
-            },
-            "gov.irs.credits.eitc.phase_out.start[2].amount": {
-                "2025-01-01.2100-12-31": 20000
-            },
-            "gov.irs.credits.eitc.phase_out.start[3].amount": {
-                "2025-01-01.2100-12-31": 20000
-            },
-            "gov.irs.credits.ctc.phase_out.threshold.SEPARATE": {
-                "2025-01-01.2100-12-31": 100000
-            },
-            "gov.contrib.ctc.per_child_phase_out.avoid_overlap": {
-                "2025-01-01.2100-12-31": True
-            },
-            "gov.irs.credits.ctc.refundable.phase_in.threshold": {
-                "2025-01-01.2100-12-31": 0
-            },
-            "gov.irs.credits.ctc.phase_out.arpa.threshold.JOINT": {
-                "2025-01-01.2100-12-31": 35000
-            },
-            "gov.contrib.ctc.minimum_refundable.amount[0].amount": {
-                "2025-01-01.2100-12-31": 2400
-            },
-            "gov.contrib.ctc.minimum_refundable.amount[1].amount": {
-                "2025-01-01.2100-12-31": 2400
-            },
-            "gov.irs.credits.ctc.phase_out.arpa.threshold.SINGLE": {
-                "2025-01-01.2100-12-31": 25000
-            },
-            "gov.irs.credits.eitc.phase_out.joint_bonus[0].amount": {
-                "2025-01-01.2100-12-31": 7000
-            },
-            "gov.irs.credits.eitc.phase_out.joint_bonus[1].amount": {
-                "2025-01-01.2100-12-31": 7000
-            },
-            "gov.irs.credits.ctc.phase_out.arpa.threshold.SEPARATE": {
-                "2025-01-01.2100-12-31": 25000
-            },
-            "gov.irs.credits.ctc.phase_out.threshold.SURVIVING_SPOUSE": {
-                "2025-01-01.2100-12-31": 100000
-            },
-            "gov.irs.credits.ctc.phase_out.threshold.HEAD_OF_HOUSEHOLD": {
-                "2025-01-01.2100-12-31": 100000
-            },
-            "gov.irs.credits.ctc.phase_out.arpa.threshold.SURVIVING_SPOUSE": {
-                "2025-01-01.2100-12-31": 25000
-            },
-            "gov.irs.credits.ctc.phase_out.arpa.threshold.HEAD_OF_HOUSEHOLD": {
-                "2025-01-01.2100-12-31": 25000
-            },
-        },
-        country_id="us",
-    )
+    from policyengine_core.reforms import Reform
+
+    return Reform.from_dict(REFORM_DICT, country_id="us")
 
 
 def parse_args() -> argparse.Namespace:
@@ -182,15 +65,26 @@ def parse_args() -> argparse.Namespace:
         default="us",
         help="Region argument passed to the old macro simulation.",
     )
+    add_profile_argument(parser)
     return parser.parse_args()
 
 
+@recorded("reproduce_legacy_webapp_path")
 def main() -> None:
     args = parse_args()
+    manifest = current_manifest()
+    manifest.describe(
+        arguments=vars(args),
+        datasets=[args.dataset],
+        reforms={REFORM_FILE.stem: REFORM_DICT},
+    )
     dataset_path = Path(args.dataset).expanduser()
     if not dataset_path.exists():
         raise FileNotFoundError(f"Dataset not found: {dataset_path}")
 
+    manifest.begin("simulate")
+    from policyengine import Simulation
+
     simulation = Simulation(
         country="us",
         scope="macro",
@@ -199,7 +93,8 @@ def main() -> None:
         region=args.region,
         data=str(dataset_path),
     )
-    impact = simulation.calculate_economy_comparison().model_dump()
+    with profiling(args.profile):
+        impact = simulation.calculate_economy_comparison().model_dump()
 
     poverty_all = impact["poverty"]["poverty"]["all"]
     winners_losers = impact["intra_decile"]["all"]
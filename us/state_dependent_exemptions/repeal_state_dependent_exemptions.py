@@ -2,22 +2,35 @@
 Repeal State Dependent Exemptions - State Impact Analysis
 
 Uses the same methodology as the PolicyEngine API (budget.py / compare.py).
-sim.calc() returns MicroSeries with embedded weights, so .sum() gives
-the weighted population total without manual weight multiplication.
+sim.calc() returns MicroSeries with embedded weights. The state table is
+built by analysis_tools.aggregation.aggregate_by_region, which groups the
+households by state once and derives the national row from the same
+per-state sums.
 """
 
+import argparse
 import os
+import sys
+from pathlib import Path
 
+import numpy as np
 import pandas as pd
-from microdf import MicroSeries
-from policyengine_core.reforms import Reform
-from policyengine_us import Microsimulation
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from analysis_tools.aggregation import aggregate_by_region
+from analysis_tools.manifest import begin_stage, run_manifest
+from analysis_tools.profiling import add_profile_argument, profiling
+from analysis_tools.reforms import load_reform_file, reform_hash
+from analysis_tools.warehouse import to_long, write
 
 PERIOD = 2026
+DATASET = "enhanced_cps_2024"
 
-REFORM_PARAM = (
-    "gov.contrib.repeal_state_dependent_exemptions.in_effect"
-)
+REFORM_FILE = Path(__file__).with_name("repeal_state_dependent_exemptions.json")
+REFORM = load_reform_file(REFORM_FILE)
 
 
 def calc_change(baseline, reformed, variable, period, **kwargs):
@@ -27,11 +40,12 @@ def calc_change(baseline, reformed, variable, period, **kwargs):
     return b, r, r - b
 
 
-def run_analysis():
-    reform = Reform.from_dict(
-        {REFORM_PARAM: {"2024-01-01.2100-12-31": True}},
-        country_id="us",
-    )
+def run_analysis(warehouse: bool = False):
+    from policyengine_core.reforms import Reform
+    from policyengine_us import Microsimulation
+
+    reform = Reform.from_dict(REFORM, country_id="us")
+    begin_stage("simulate")
     baseline = Microsimulation()
     reformed = Microsimulation(reform=reform)
 
@@ -51,17 +65,35 @@ def run_analysis():
         baseline, reformed, "household_benefits", PERIOD
     )
 
-    # --- National totals ---
-    total_households = hh_income_change.count()
-    net_income_impact = hh_income_change.sum()
-    tax_revenue_impact = hh_tax_change.sum()
-    state_tax_revenue_impact = hh_state_tax_change.sum()
-    benefit_spending_impact = hh_benefits_change.sum()
+    # --- State table + national totals in one grouped pass ---
+    begin_stage("aggregate")
+    state_code = baseline.calc("state_code", period=PERIOD)
+    household_weight = baseline.calc(
+        "household_weight", period=PERIOD
+    )
+    by_state = aggregate_by_region(
+        state_code.values,
+        household_weight.values,
+        {
+            "income_change": hh_income_change.values,
+            "tax_change": hh_tax_change.values,
+            "state_tax_change": hh_state_tax_change.values,
+            "benefits_change": hh_benefits_change.values,
+        },
+        affected=np.abs(hh_income_change.values) > 0.01,
+    )
+    national = by_state.loc["TOTAL"]
+
+    total_households = national["count"]
+    net_income_impact = national["income_change_sum"]
+    tax_revenue_impact = national["tax_change_sum"]
+    state_tax_revenue_impact = national["state_tax_change_sum"]
+    benefit_spending_impact = national["benefits_change_sum"]
     budgetary_impact = tax_revenue_impact - benefit_spending_impact
 
     print(f"\n=== Repeal State Dependent Exemptions ===")
-    print(f"Dataset: enhanced_cps_2024 | Period: {PERIOD}")
-    print(f"Reform: {REFORM_PARAM}")
+    print(f"Dataset: {DATASET} | Period: {PERIOD}")
+    print(f"Reform: {', '.join(REFORM)}")
     print(f"Total households: {total_households:,.0f}\n")
     print("National Budgetary Impact (API pattern):")
     for label, value in [
@@ -73,72 +105,32 @@ def run_analysis():
     ]:
         print(f"  {label + ':':<28s}${value:>15,.0f}")
 
-    # --- State-level groupby ---
-    state_code = baseline.calc("state_code", period=PERIOD)
-    household_weight = baseline.calc(
-        "household_weight", period=PERIOD
-    )
-
-    by_state = {
-        "income_change": hh_income_change.groupby(state_code),
-        "state_tax_change": hh_state_tax_change.groupby(
-            state_code
+    # --- Build results table ---
+    table = pd.DataFrame({
+        "state_code": by_state.index,
+        "total_households": by_state["count"].round(),
+        "avg_net_income_change": by_state["income_change_mean"].round(2),
+        "total_net_income_impact": by_state["income_change_sum"].round(),
+        "total_state_tax_revenue_change": (
+            by_state["state_tax_change_sum"].round()
         ),
-    }
-
-    affected = MicroSeries(
-        (hh_income_change.abs() > 0.01).astype(float).values,
-        weights=household_weight.values,
-    )
-
-    income_sum = by_state["income_change"].sum()
-    income_mean = by_state["income_change"].mean()
-    income_count = by_state["income_change"].count()
-    tax_sum = by_state["state_tax_change"].sum()
-    affected_sum = affected.groupby(state_code).sum()
+        "households_affected": by_state["affected"].round(),
+        "pct_households_affected": by_state["pct_affected"].round(2),
+    }).reset_index(drop=True)
+    int_columns = [
+        "total_households",
+        "total_net_income_impact",
+        "total_state_tax_revenue_change",
+        "households_affected",
+    ]
+    table[int_columns] = table[int_columns].astype("int64")
 
-    # --- Build results table ---
-    state_results = []
-    for state in income_sum.index:
-        total_hh = income_count[state]
-        affected_hh = affected_sum[state]
-        state_results.append({
-            "state_code": state,
-            "total_households": round(total_hh),
-            "avg_net_income_change": round(income_mean[state], 2),
-            "total_net_income_impact": round(income_sum[state]),
-            "total_state_tax_revenue_change": round(tax_sum[state]),
-            "households_affected": round(affected_hh),
-            "pct_households_affected": (
-                round(affected_hh / total_hh * 100, 2)
-                if total_hh > 0
-                else 0
-            ),
-        })
-
-    state_impacts = pd.DataFrame(state_results).sort_values(
+    is_total = table["state_code"] == "TOTAL"
+    state_impacts = table[~is_total].sort_values(
         "total_net_income_impact"
     )
-
-    total_affected = state_impacts["households_affected"].sum()
-    national = pd.DataFrame([{
-        "state_code": "TOTAL",
-        "total_households": round(total_households),
-        "avg_net_income_change": round(
-            net_income_impact / total_households, 2
-        ),
-        "total_net_income_impact": round(net_income_impact),
-        "total_state_tax_revenue_change": round(
-            state_tax_revenue_impact
-        ),
-        "households_affected": total_affected,
-        "pct_households_affected": round(
-            total_affected / total_households * 100, 2
-        ),
-    }])
-
     final = pd.concat(
-        [state_impacts, national], ignore_index=True
+        [state_impacts, table[is_total]], ignore_index=True
     )
 
     # --- Print state results ---
@@ -157,15 +149,41 @@ def run_analysis():
     )
 
     # --- Save CSV ---
+    begin_stage("write")
     script_dir = os.path.dirname(os.path.abspath(__file__))
     output_path = os.path.join(
         script_dir, "state_impacts_detailed.csv"
     )
     final.to_csv(output_path, index=False)
     print(f"\nResults saved to {output_path}")
+    if warehouse:
+        long = to_long(
+            final.replace({"state_code": {"TOTAL": "us"}}),
+            region="state_code",
+            reform_hash=reform_hash(REFORM),
+            dataset=DATASET,
+            period=PERIOD,
+        )
+        paths = write(long, "state_dependent_exemptions")
+        print(f"Wrote: {len(paths)} warehouse file(s)")
 
     return final
 
 
 if __name__ == "__main__":
-    results = run_analysis()
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--warehouse",
+        action="store_true",
+        help="Also write the state table to the results warehouse.",
+    )
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    with run_manifest("repeal_state_dependent_exemptions") as manifest:
+        manifest.describe(
+            arguments=vars(args),
+            datasets=[DATASET],
+            reforms={REFORM_FILE.stem: REFORM},
+        )
+        with profiling(args.profile):
+            results = run_analysis(warehouse=args.warehouse)